@@ -25,7 +25,11 @@ Authors:
 
 import numpy
 
+from scipy.sparse import csr_matrix
+
 from packman.molecule import Protein, Model, Atom
+from ..utilities import rigid_body_modes
+from ..enm import CrossCorrelation, get_network
 
 '''
 ##################################################################################################
@@ -51,13 +55,15 @@ class ANM:
             dr (float, optional)   : Distance Cutoff.                                            Defaults to 15.0.
             power (int, optional)  : Power of distance (mainly useful in non-parametric mode).   Defaults to 0.
             pf (None, optional)    : Parameter free model. (Check the dr and power params)       Defaults to None.
+            share (bool, optional) : Share the contacts, matrices and eigenbases with the other models of the same coordinates and cutoff (See packman.enm.get_network); shared arrays are read-only. Defaults to False.
         """
     
-    def __init__(self, atoms, gamma=1.0, dr=15.0, power=0, pf=None):
+    def __init__(self, atoms, gamma=1.0, dr=15.0, power=0, pf=None, share=False):
         self.gamma   = gamma
         self.dr      = dr
         self.power   = power
         self.pf      = pf
+        self.share   = share
         self.atoms   = [i for i in atoms]
         self.coords  = numpy.array([i.get_location() for i in self.atoms])
         if self.pf != None and self.pf <= 0:
@@ -68,6 +74,7 @@ class ANM:
             raise Exception("distance cutoff value cannot be zero or negative")
 
         self.fluctuations       = None
+        self.anisotropic_fluctuations = None
         self.stiffness_map      = None
         self.compliance_map     = None
         self.stiffness_profile  = None
@@ -80,9 +87,10 @@ class ANM:
 
         Notes:
             * Make sure that the ANM().calculate_hessian() is called before calling this function. (will return None otherwise)
+            * The matrix is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
         
         Returns:
-            numpy.ndarray: Hessian matrix if successful; None otherwise
+            scipy.sparse.bsr_matrix/numpy.ndarray: Hessian matrix (See ANM().calculate_hessian()) if successful; None otherwise
         """
         return self.hessian
     
@@ -91,6 +99,7 @@ class ANM:
         
         Notes:
             * Make sure that the ANM().calculate_hessian() and ANM().calculate_decomposition() is called before calling this function. (will return None otherwise)
+            * The array is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
 
         Returns:
             numpy.ndarray: Eigenvalues if successful; None otherwise
@@ -102,6 +111,7 @@ class ANM:
         
         Notes:
             * Make sure that the ANM().calculate_hessian() and ANM().calculate_decomposition() is called before calling this function. (will return None otherwise)
+            * The array is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
 
         Returns:
             numpy.ndarray: Eigenvectors if successful; None otherwise
@@ -119,6 +129,17 @@ class ANM:
         """
         return self.fluctuations
     
+    def get_anisotropic_fluctuations(self):
+        """Get the anisotropic displacement tensors (3x3 diagonal blocks of the Hessian pseudoinverse) of the atoms.
+        
+        Notes:
+            * Make sure that the ANM().calculate_hessian(), ANM().calculate_decomposition() and ANM().calculate_fluctuations() is called before calling this function. (will return None otherwise)
+
+        Returns:
+            numpy.ndarray: N x 3 x 3 tensors if successful; None otherwise
+        """
+        return self.anisotropic_fluctuations
+    
     def get_stiffness_map(self):
         """Get the Stiffness Map obtained from Stiffness and Compliance Analysis
         
@@ -162,80 +183,88 @@ class ANM:
             numpy.ndarray: Compliance profile if successful; None otherwise
         """
         return self.compliance_profile
+
+    def get_crosscorrelation_operator(self, n_modes=None, dtype=numpy.float32):
+        """Get the cross-correlation (trace of the 3x3 blocks) as a lazy operator (rows, blocks and top partners on demand) without the N x N matrix.
+
+        Notes:
+            * Make sure that the ANM().calculate_hessian() and ANM().calculate_decomposition() is called before calling this function.
+
+        Args:
+            n_modes (int, optional)       : Number of the slowest non-trivial modes to be used. Defaults to None (All the calculated modes).
+            dtype (numpy.dtype, optional) : Storage type. Defaults to numpy.float32.
+
+        Returns:
+            packman.enm.CrossCorrelation: Cross-correlation operator.
+        """
+        stop = len(self.eigen_values) if n_modes is None else 6+int(n_modes)
+        return CrossCorrelation(self.eigen_vectors[:,6:stop], self.eigen_values[6:stop], dim=3, dtype=dtype)
     
 
     '''Calculate Functions'''
-    def calculate_hessian(self):
+    def calculate_hessian(self, sparse=True):
         """Build the Hessian Matrix of the ANM model.
 
         This is the most essential step for ANM/ Compliance analysis.
+
+        The contacts within the distance cutoff are obtained from the KD-tree pair query and all the 3x3 super-elements are calculated at once; only the contacts cost memory. The contacts and the matrix are shared with the other models of the same coordinates and cutoff if the model is created with share=True (See packman.enm.get_network)
         
         Notes:
             * Hessian matrix is built; use ANM().get_hessian() to obtain the hessian matrix.
+            * The sparse block matrix (scipy.sparse.bsr_matrix with 3x3 blocks) is stored by default. Use sparse=False for the dense matrix (numpy.ndarray)
+            * Spring constant of the contact is gamma/d^power; additionally divided by d in the parameter free (pf) model.
+
+        Args:
+            sparse (bool, optional) : Store the hessian matrix as scipy.sparse.bsr_matrix. Defaults to True.
         """
-        n_atoms=len(self.coords)
-        hessian=numpy.zeros((n_atoms*3, n_atoms*3), float)
-        distance_mat=numpy.ones((n_atoms*3, n_atoms*3), float)
-        for i in range(len(self.coords)):
-            diff = self.coords[i+1:, :] - self.coords[i] 
-            squared_diff = diff**2
-            for j, s_ij in enumerate(squared_diff.sum(1)):
-                if s_ij <= self.dr**2:
-                    diff_coords = diff[j]
-                    j = j + i + 1
-                    derivative = numpy.outer(diff_coords, diff_coords)*(float(-self.gamma)/numpy.sqrt(s_ij)**(2+self.power))
-                    hessian[i*3:i*3+3, j*3:j*3+3] = derivative
-                    hessian[j*3:j*3+3, i*3:i*3+3] = derivative
-                    hessian[i*3:i*3+3, i*3:i*3+3] = hessian[i*3:i*3+3, i*3:i*3+3] - derivative
-                    hessian[j*3:j*3+3, j*3:j*3+3] = hessian[j*3:j*3+3, j*3:j*3+3] - derivative
-                    #abs added to avoid negative numbers
-                    d = numpy.sqrt(s_ij)
-                    lobj = [[d,d,d],[d,d,d], [d,d,d]]
-                    dmat = numpy.array(lobj)
-                    distance_mat[i*3:i*3+3, j*3:j*3+3] = dmat
-
-        if self.pf != None:
-            hessian = numpy.divide(hessian, distance_mat)
-        
-        self.hessian=hessian
+        self.network = get_network(self.coords, self.dr, share=self.share)
+        self.hessian = self.network.get_hessian(gamma=self.gamma, power=self.power, pf=self.pf, sparse=sparse)
         return True
     
-    def calculate_decomposition(self):
+    def calculate_decomposition(self, n_modes=None, method='eigsh', cache=None):
         """Decompose the Hessian Matrix of the ANM model.
+
+        All the modes are calculated by default. If n_modes is provided, only the six rigid body (zero) modes and the n_modes slowest non-trivial modes are calculated; the rigid body modes are still the first six, so the mode indices are the same as for the full decomposition.
         
         Note:
             Eigen values and Eigen Vectors are calculated. use ANM().get_eigenvalues() and ANM().get_eigenvectors() to obtain them.
+
+        Args:
+            n_modes (int, optional): Number of the slowest non-trivial modes to be calculated. Defaults to None (All the modes).
+            method (str, optional) : Partial eigensolver; 'eigsh', 'lobpcg' or 'lapack' (See packman.utilities.partial_eigh). Defaults to 'eigsh'.
+            cache (packman.enm.ModeCache/str, optional): Disk cache of the eigenvalues and eigenvectors (or its directory); read from the cache if available, stored otherwise. Defaults to None (No disk cache).
         """
-        self.eigen_values,self.eigen_vectors=numpy.linalg.eigh(self.hessian)
+        trivial_modes = rigid_body_modes(self.coords) if n_modes is not None else 6
+        self.eigen_values,self.eigen_vectors=self.network.get_decomposition(self.hessian, n_modes=n_modes, method=method, trivial_modes=trivial_modes, cache=cache)
         return True
 
     def calculate_fluctuations(self,endmode=None):
         """Calculate the Fluctuations of the ANM model.
 
-        The fluctualtions/ theoretical b-factors are calculated using this method.
+        The fluctualtions/ theoretical b-factors are calculated using this method. The anisotropic displacement tensors (3x3 diagonal blocks of the Hessian pseudoinverse) of the atoms are calculated in the same pass; the fluctuations are their traces.
         
         Note:
-            - Fluctuations are calculated. use ANM().get_fluctuations() to obtain the fluctuations.
-            - Endmode needs to be put in the code if and when required.
+            - Fluctuations are calculated. use ANM().get_fluctuations() and ANM().get_anisotropic_fluctuations() to obtain the fluctuations.
+            - Modes 6 to endmode-1 are used (All the non-rigid modes by default).
+
+        Args:
+            endmode (int, optional): Mode number (exclusive) up to which the fluctuations are calculated. Defaults to None (All the calculated modes).
         """
-        EVec=self.eigen_vectors.T
-        mode_bfactors=[]
-        for numi,i in enumerate(self.eigen_values[6:]):
-            evec_row=EVec[numi+6]
-            mode_bfactors.append([ float(evec_row[j]**2 + evec_row[j+1]**2 + evec_row[j+2]**2)/i for j in range(0,len(self.eigen_values),3)])
-            
-        mode_bfactors=numpy.array(mode_bfactors)
-        self.fluctuations=[numpy.sum(i) for i in mode_bfactors.T]
+        stop = len(self.eigen_values) if endmode is None else int(endmode)
+        W = ( self.eigen_vectors[:,6:stop] / numpy.sqrt(self.eigen_values[6:stop]) ).reshape(len(self.coords), 3, -1)
+        self.anisotropic_fluctuations = numpy.einsum('ixk,iyk->ixy', W, W)
+        self.fluctuations = numpy.einsum('ixx->i', self.anisotropic_fluctuations)
         return True
     
-    
-    def calculate_stiffness_compliance(self):
+    def calculate_stiffness_compliance(self, n_modes=None, pairs=None, chunk_size=256):
         """Carry out the Stiffness and Compliance analysis of the ANM model.
 
         Citation:
         Scaramozzino, D., Khade, P.M., Jernigan, R.L., Lacidogna, G. and Carpinteri, A.
         (2020), Structural Compliance ‐ A New Metric for Protein Flexibility. Proteins. Accepted Author Manuscript.
         doi:10.1002/prot.25968
+
+        The compliance of the pair (i,j) under the unit pulling forces along the unit vector e_ij is e_ij^T (G_ii + G_jj - G_ij - G_ji) e_ij, where G_ij are the 3x3 blocks of the Hessian pseudoinverse from the non-rigid modes. The blocks are contracted in batches of rows (upper triangle only; the maps are symmetric) without the 3N x 3N pseudoinverse.
         
         Note:
             * Obtain the following properties by using functions followed by it:
@@ -243,29 +272,54 @@ class ANM:
                 Compliance Map    : ANM().get_compliance_map()
                 Stiffness Profile : ANM().get_stiffness_profile()
                 Compliance Profile: ANM().get_compliance_profile()
-                
+            * If the pairs are provided, only those pairs are calculated; the maps are scipy.sparse.csr_matrix (symmetric) and the profiles are not calculated (None).
+
+        Args:
+            n_modes (int, optional)       : Number of the slowest non-rigid modes to be used. Defaults to None (All the calculated modes).
+            pairs ([[int,int]], optional) : Atom index pairs to be calculated. Defaults to None (All the pairs).
+            chunk_size (int, optional)    : Number of rows calculated at once. Defaults to 256.
         """
-        EVec=self.eigen_vectors.T
-        hessian_inv= numpy.matmul(  numpy.matmul( EVec[6:].transpose() , numpy.diag(1/self.get_eigenvalues()[6:]) )  , EVec[6:]  )
-        compliance_map=numpy.zeros((len(self.coords),len(self.coords)))
-        stiffness_map=numpy.zeros((len(self.coords),len(self.coords)))
-
-        for numi,i in enumerate(self.coords):
-            for numj,j in enumerate(self.coords):
-                if(numi!=numj):
-                    FMAT=numpy.zeros((len(self.coords),3))
-                    Fij=(j-i)/numpy.linalg.norm(i-j)
-                    FMAT[numi]=-Fij
-                    FMAT[numj]=Fij
-                    FMAT=FMAT.flatten()
-                    
-                    d=numpy.matmul(hessian_inv,FMAT)
-                    
-                    compliance= (d[(numj*3)+0]-d[(numi*3)+0])*Fij[0] + (d[(numj*3)+1]-d[(numi*3)+1])*Fij[1] + (d[(numj*3)+2]-d[(numi*3)+2])*Fij[2]
-                    stiffness= 1/ compliance
-
-                    compliance_map[numi][numj]= compliance
-                    stiffness_map[numi][numj] = stiffness
+        stop = len(self.eigen_values) if n_modes is None else 6+int(n_modes)
+        n = len(self.coords)
+        #G = W W^T; W is N x 3 x K
+        W = ( self.eigen_vectors[:,6:stop] / numpy.sqrt(self.eigen_values[6:stop]) ).reshape(n, 3, -1)
+
+        if(pairs is not None):
+            pairs = numpy.asarray(pairs, dtype=int).reshape(-1, 2)
+            pairs = pairs[pairs[:,0] != pairs[:,1]]
+            F = self.coords[pairs[:,1]] - self.coords[pairs[:,0]]
+            F = F / numpy.linalg.norm(F, axis=1)[:,None]
+            compliance = numpy.sum( numpy.einsum('px,pxk->pk', F, W[pairs[:,1]]-W[pairs[:,0]])**2, axis=1 )
+            rows, cols = numpy.concatenate((pairs[:,0], pairs[:,1])), numpy.concatenate((pairs[:,1], pairs[:,0]))
+            #Duplicate pairs are summed by the sparse matrix; keep the first occurrence only
+            _, first = numpy.unique( numpy.stack((rows, cols), axis=1), axis=0, return_index=True )
+            rows, cols, values = rows[first], cols[first], numpy.concatenate((compliance, compliance))[first]
+            self.compliance_map     = csr_matrix( (values, (rows, cols)), shape=(n, n) )
+            self.stiffness_map      = csr_matrix( (1.0/values, (rows, cols)), shape=(n, n) )
+            self.stiffness_profile  = None
+            self.compliance_profile = None
+            return True
+
+        diagonal_blocks = numpy.einsum('ixk,iyk->ixy', W, W)
+        compliance_map = numpy.zeros((n, n))
+        for start in range(0, n, int(chunk_size)):
+            stop_row = min(start+int(chunk_size), n)
+            #Unit vectors from i (rows) to j (columns >= start)
+            F = self.coords[None,start:,:] - self.coords[start:stop_row,None,:]
+            norm = numpy.linalg.norm(F, axis=2)
+            norm[norm == 0] = numpy.inf
+            F = F / norm[:,:,None]
+            cross = numpy.einsum( 'anx,axk,nyk,any->an', F, W[start:stop_row], W[start:], F, optimize=True )
+            self_i = numpy.einsum( 'anx,axy,any->an', F, diagonal_blocks[start:stop_row], F, optimize=True )
+            self_j = numpy.einsum( 'anx,nxy,any->an', F, diagonal_blocks[start:], F, optimize=True )
+            block = self_i + self_j - 2*cross
+            compliance_map[start:stop_row, start:] = block
+            compliance_map[start:, start:stop_row] = block.T
+        numpy.fill_diagonal(compliance_map, 0)
+
+        with numpy.errstate(divide='ignore'):
+            stiffness_map = 1.0/compliance_map
+        numpy.fill_diagonal(stiffness_map, 0)
         
         self.stiffness_map      = stiffness_map
         self.compliance_map     = compliance_map
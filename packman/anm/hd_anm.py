@@ -44,12 +44,14 @@ import logging
 from .. import molecule, Atom, Model, Protein
 from ..constants import amino_acid_molecular_weight
 from ..constants import atomic_weight
-from ..utilities import load_hinge
+from ..utilities import load_hinge, get_hinge_index, get_domain_labels
+from ..enm import CrossCorrelation, get_network
+from ..enm.cache import get_mode_cache
 
 import numpy
-import itertools
 
-from scipy.linalg import eig as scipy_eig
+from scipy.linalg import eigh
+from scipy.sparse import csr_matrix, block_diag, diags, issparse
 '''
 ##################################################################################################
 #                                            hd-ANM                                              #
@@ -68,11 +70,12 @@ class hdANM:
         
         Args:
             atoms ([packman.molecule.Atom]) : Two dimentional array of atoms.
-            hng_file (string)               : .hng filename and path. (Contains the information about hinge and domains on the protein)
+            hng_file (string/dictionary)    : .hng filename and path (Contains the information about hinge and domains on the protein) or the loaded information. (See packman.utilities.load_hinge and packman.utilities.load_hinges)
             gamma (float, optional)         : Spring Constant Value.                                      Defaults to 1.0.
             dr (float, optional)            : Distance Cutoff.                                            Defaults to 15.0.
             power (int, optional)           : Power of distance (mainly useful in non-parametric mode).   Defaults to 0.
             pf (None, optional)             : Parameter free model?.                                      Defaults to None.
+            share (bool, optional)          : Share the contacts and the hessian matrix with the other models of the same coordinates and cutoff (See packman.enm.get_network); the shared matrix is read-only. Defaults to False.
         
         Raises:
             Exception: [description]
@@ -80,14 +83,17 @@ class hdANM:
             Exception: [description]
         """
     
-    def __init__(self, atoms , hng_file , gamma=1.0, dr=15.0, power=0, pf=None):
+    def __init__(self, atoms , hng_file , gamma=1.0, dr=15.0, power=0, pf=None, share=False):
         self.gamma   = gamma
         self.dr      = dr
         self.power   = power
         self.pf      = pf
+        self.share   = share
         self.atoms   = atoms
-        self.HNGinfo = load_hinge(hng_file)
+        self.HNGinfo = load_hinge(hng_file) if isinstance(hng_file, str) else hng_file
+        self.HNGindex = get_hinge_index(self.HNGinfo)
         self.RT_eigen_vectors = None
+        self.RT_matrix = None
 
         #Coords are in the same order as the atoms
         self.coords  = numpy.array([i.get_location() for i in atoms])
@@ -98,9 +104,6 @@ class hdANM:
         if self.dr <= 0:
             raise Exception("distance cutoff value cannot be zero or negative")
         
-        ##To Verify that the hessian is same as ANM (Part 1/2)
-        #self.calculate_hessian()
-
 
     '''Get Functions'''
     def get_hessian(self):
@@ -108,6 +111,7 @@ class hdANM:
 
         Notes:
             * Make sure that the hdANM().calculate_hessian() is called before calling this function. (will return None otherwise)
+            * The matrix is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
         
         Returns:
             numpy.ndarray: Hessian matrix if successful; None otherwise
@@ -149,6 +153,14 @@ class hdANM:
         """
         return self.RT_eigen_vectors
     
+    def get_RT_matrix(self):
+        """Get the reverse transformation matrix (3N x 6D+3H) of the hdANM model. (See hdANM().calculate_RT_matrix())
+
+        Returns:
+            scipy.sparse.csr_matrix: Reverse transformation matrix if successful; None otherwise
+        """
+        return self.RT_matrix
+    
     def get_fluctuations(self):
         """Get the Fluctuations obtained from Eigenvectors and Eigenvalues
         
@@ -179,6 +191,25 @@ class hdANM:
             self.calculate_cross_correlation(n_modes=n_modes)
             return self.crosscorrelation_matrix
     
+    def get_crosscorrelation_operator(self, n_modes="all", dtype=numpy.float32):
+        """Get the cross-correlation (trace of the 3x3 blocks) as a lazy operator (rows, blocks and top partners on demand) without the N x N matrix.
+
+        Notes:
+            * Make sure that the hdANM().calculate_hessian() and hdANM().calculate_decomposition() is called before calling this function.
+            * The reverse transformed eigenvectors are used (See hdANM().calculate_RT_eigen_vectors())
+
+        Args:
+            n_modes (int, optional)       : Number of the non-rigid modes to be used. Defaults to "all".
+            dtype (numpy.dtype, optional) : Storage type. Defaults to numpy.float32.
+
+        Returns:
+            packman.enm.CrossCorrelation: Cross-correlation operator.
+        """
+        if(self.RT_eigen_vectors is None or self.RT_eigen_vectors.shape[1] != len(self.eigen_values)):
+            self.calculate_RT_eigen_vectors()
+        stop = len(self.eigen_values) if n_modes == "all" else 6+int(n_modes)
+        return CrossCorrelation(self.RT_eigen_vectors[:,6:stop], self.eigen_values[6:stop].real, dim=3, dtype=dtype)
+
     def get_hessian_block(self,Index1,Index2):
         """Calculate Hij (Hessian matrix component) using equation . ()
 
@@ -213,104 +244,80 @@ class hdANM:
                     )
             return -diag
 
-        #To Verify that the hessian is same as ANM (Part 2/2)
-        #print(Index1,Index2,dist_ij,'\n',self.get_hessian()[Index1*3:Index1*3+3,Index2*3:Index2*3+3],"\n####\n")
-        #return self.get_hessian()[Index1*3:Index1*3+3,Index2*3:Index2*3+3]
-
 
     '''Calculate Functions'''
-    #Discontinued (But kept for testing)
-    '''
-    def calculate_hessian(self):
-        """Build the Hessian Matrix of the ANM model.
-
-        This is an essential step for hdANM
-        
-        Notes:
-            * Hessian matrix is built; use ANM().get_hessian() to obtain the hessian matrix.
-        """
-        n_atoms=len(self.coords)
-        hessian=numpy.zeros((n_atoms*3, n_atoms*3), float)
-        distance_mat=numpy.ones((n_atoms*3, n_atoms*3), float)
-        for i in range(len(self.coords)):
-            diff = self.coords[i+1:, :] - self.coords[i] 
-            squared_diff = diff**2
-            for j, s_ij in enumerate(squared_diff.sum(1)):
-                if s_ij <= self.dr**2:
-                    diff_coords = diff[j]
-                    j = j + i + 1
-                    derivative = numpy.outer(diff_coords, diff_coords)*(float(-self.gamma)/numpy.sqrt(s_ij)**(2+self.power))
-                    hessian[i*3:i*3+3, j*3:j*3+3] = derivative
-                    hessian[j*3:j*3+3, i*3:i*3+3] = derivative
-                    hessian[i*3:i*3+3, i*3:i*3+3] = hessian[i*3:i*3+3, i*3:i*3+3] - derivative
-                    hessian[j*3:j*3+3, j*3:j*3+3] = hessian[j*3:j*3+3, j*3:j*3+3] - derivative
-                    #abs added to avoid negative numbers
-                    d = numpy.sqrt(s_ij)
-                    lobj = [[d,d,d],[d,d,d], [d,d,d]]
-                    dmat = numpy.array(lobj)
-                    distance_mat[i*3:i*3+3, j*3:j*3+3] = dmat
-
-        if self.pf != None:
-            hessian = numpy.divide(hessian, distance_mat)
-        
-        #Class Change
-        self.hessian=hessian
-        return True
-    '''
-    
-    def calculate_decomposition(self, include_mass=True):
+    def calculate_decomposition(self, include_mass=True, n_modes=None, cache=None):
         """Decompose the Hessian Matrix of the hdANM model.
 
+        The hessian matrix is symmetric and the mass matrix is positive definite (block diagonal), therefore the symmetric generalized eigenvalue problem is solved; eigenvalues are real and sorted in the ascending order.
+
         Args:
-            include_mass (bool): Amino Acid Residue mass/Atomic mass should be (True) or shouldn't be (False) included for the decomposition. Defaults to True
+            include_mass (bool)     : Amino Acid Residue mass/Atomic mass should be (True) or shouldn't be (False) included for the decomposition. Defaults to True
+            n_modes (int, optional) : Number of the slowest non-trivial modes to be calculated (in addition to the six rigid body modes). Defaults to None (All the modes).
+            cache (packman.enm.ModeCache/str, optional): Disk cache of the eigenvalues and eigenvectors (or its directory); read from the cache if available, stored otherwise. Defaults to None (No disk cache).
         
         Note:
             - Eigen values and Eigen Vectors are calculated. use hdANM().get_eigenvalues() and hdANM().get_eigenvectors() to obtain them.
+            - Eigenvectors are normalized to the unit length (same as the general eigensolver, scipy.linalg.eig).
             - Currently only molecular weight is included in case of Amino Acid Residue(coarse grained) mass.
             - Mass of the Amino Acid Residues/Atoms can be found in /packman/constants/Constants.py 
             ie...
             from packman.constants import amino_acid_molecular_weight
             from packman.constants import atomic_weigh
         """
+        cache = get_mode_cache(cache)
+        if(cache is not None):
+            #Domain/hinge assignment of the atoms and the mass type determine the hdANM matrices besides the ENM parameters
+            cache_key = cache.get_key(self.coords, model='hdANM', cutoff=self.dr, gamma=self.gamma, power=self.power, pf=self.pf, mass_type=self.mass_type, include_mass=include_mass, domains=[i.get_domain_id() for i in self.atoms], n_modes=n_modes)
+            modes = cache.load(cache_key)
+            if(modes is not None):
+                self.eigen_values, self.eigen_vectors = modes
+                self.RT_eigen_vectors = None
+                return True
+
+        subset = None if n_modes is None else [0, min(6+int(n_modes), len(self.domain_hessian))-1]
         if(include_mass):
-            self.eigen_values, self.eigen_vectors= scipy_eig(self.domain_hessian,self.domain_mass_matrix)
-
-            idx                = self.eigen_values.argsort()
-            self.eigen_values  = self.eigen_values[idx]
-            self.eigen_vectors = self.eigen_vectors[:,idx]
+            mass_matrix = self.domain_mass_matrix.toarray() if issparse(self.domain_mass_matrix) else self.domain_mass_matrix
+            self.eigen_values, self.eigen_vectors = eigh(self.domain_hessian, mass_matrix, subset_by_index=subset)
+            self.eigen_vectors = self.eigen_vectors / numpy.linalg.norm(self.eigen_vectors, axis=0)
         else:
-            self.eigen_values, self.eigen_vectors = numpy.linalg.eigh(self.domain_hessian)
+            self.eigen_values, self.eigen_vectors = eigh(self.domain_hessian, subset_by_index=subset)
+        if(cache is not None):
+            cache.save(cache_key, self.eigen_values, self.eigen_vectors)
+        self.RT_eigen_vectors = None
         return True
     
     
     def calculate_hessian(self,mass_type='unit'):
         """Build the Hessian Matrix of the hdANM model.
 
-        This is the most essential step for hdANM. It picks up blocks from ANM hessian matrix and puts it in the format described in the paper.
+        This is the most essential step for hdANM. The sparse ANM hessian matrix (H) is built once and projected on the rigid-body motions of the domains and the hinge atoms (P) as Pᵀ H P to obtain the format described in the paper.
 
         Args:
             mass_type (unit/atom/residue): Whether to use unit (1), atomic weights or residue mass for the mass matrix.
         
         Notes:
             * Possible argument removal for the decomposition function
+            * The sparse ANM hessian matrix is stored as hdANM().hessian (See hdANM().get_hessian())
+            * The mass matrix is stored as the block diagonal scipy.sparse.csr_matrix
             * use hdANM().domain_hessian, hdANM().domain_mass_matrix and hdANM().domain_info to access output of this function
             * Mass of the Amino Acid Residues/Atoms can be found in /packman/constants/Constants.py
             ie...
             from packman.constants import amino_acid_molecular_weight
             from packman.constants import atomic_weigh
         """
+        self.mass_type = mass_type
         all_mass_types=['unit','atom','residue']
         #Error Handling
         if(mass_type not in all_mass_types):
             print('Provide correct \'mass_type\' parameter. See help for more details')
 
 
-        for i in self.atoms:
-            for j in self.HNGinfo:
-                HNGrange = self.HNGinfo[j]
-                IDs  = j.split('_')
-                if( HNGrange[0] <= i.get_parent().get_id() <= HNGrange[1] and IDs[1] == i.get_parent().get_parent().get_id() ):
-                    i.get_parent().set_domain_id( IDs[-1].strip() )
+        #Domain/hinge IDs from the interval index; residues not in the .hng information keep their IDs
+        labels = get_domain_labels(self.HNGindex, [i.get_parent().get_parent().get_id() for i in self.atoms], [i.get_parent().get_id() for i in self.atoms])
+        for i,label in zip(self.atoms, labels):
+            if(label is not None):
+                i.get_parent().set_domain_id( label )
 
         #Domain groups stores the atom index(of self.atoms) with Domain ID as a key (D5: [1,2] domain 5 with atom index 1 and 2 )
         DomainGroups={}
@@ -321,198 +328,142 @@ class hdANM:
                 DomainGroups[i.get_domain_id()]=[]
                 DomainGroups[i.get_domain_id()].append(numi)
         
-        #HHH
-        HingeAtoms=[]
-        Domains=[]   #Used in HHD
-        for i in DomainGroups.keys():
-            if(i[0]=='H'):
-                HingeAtoms.extend(DomainGroups[i])
-            if(i[0]=='D'):
-                Domains.append(i)
-        HHH=numpy.zeros((len(HingeAtoms)*3,len(HingeAtoms)*3))
-        for numi,i in enumerate(HingeAtoms):
-            for numj,j in enumerate(HingeAtoms):
-                HHH[numi*3:numi*3+3,numj*3:numj*3+3]=self.get_hessian_block(i,j)
-        
-        
-        #HHD (Scheduled to be paralalysed)
-        DomainInfo={}
-        HHD=numpy.zeros((len(HingeAtoms)*3,len(Domains)*6))
-        for numd,d in enumerate(Domains):
-            COM=numpy.average([self.coords[i] for i in DomainGroups[d]] , 0)
-            DomainInfo[d]=(numd,COM)
-            for numi,i in enumerate(HingeAtoms):
-                HHDijd_sum=HHDijd=numpy.zeros((3,6))
-                for j in DomainGroups[d]:
-                    HHDijd=numpy.zeros((3,6))
-                    HHDijd[0:3,0:3]=self.get_hessian_block(i,j)
-
-                    HHDijd[0,3:]= [  -HHDijd[0][1]*(self.coords[j][2]-COM[2]) + HHDijd[0][2]*(self.coords[j][1]-COM[1])  ,  HHDijd[0][0]*(self.coords[j][2]-COM[2]) - HHDijd[0][2]*(self.coords[j][0]-COM[0])  ,  -HHDijd[0][0]*(self.coords[j][1]-COM[1]) + HHDijd[0][1]*(self.coords[j][0]-COM[0])]
-                    HHDijd[1,3:]= [  -HHDijd[1][1]*(self.coords[j][2]-COM[2]) + HHDijd[1][2]*(self.coords[j][1]-COM[1])  ,  HHDijd[1][0]*(self.coords[j][2]-COM[2]) - HHDijd[1][2]*(self.coords[j][0]-COM[0])  ,  -HHDijd[1][0]*(self.coords[j][1]-COM[1]) + HHDijd[1][1]*(self.coords[j][0]-COM[0])]
-                    HHDijd[2,3:]= [  -HHDijd[2][1]*(self.coords[j][2]-COM[2]) + HHDijd[2][2]*(self.coords[j][1]-COM[1])  ,  HHDijd[2][0]*(self.coords[j][2]-COM[2]) - HHDijd[2][2]*(self.coords[j][0]-COM[0])  ,  -HHDijd[2][0]*(self.coords[j][1]-COM[1]) + HHDijd[2][1]*(self.coords[j][0]-COM[0])]
-                    HHDijd_sum=numpy.add(HHDijd_sum,HHDijd)
-                HHD[numi*3:(numi*3)+3,numd*6:((numd*6)+6)]=HHDijd_sum
-        
+        Domains=[i for i in DomainGroups.keys() if i[0]=='D']
 
-        #HDH
-        HDH=HHD.T
-
-        #HDD
-        HDD=numpy.zeros((6*len(Domains),6*len(Domains)))
-        for numd,Dd in enumerate(Domains):
-            for nume,De in enumerate(Domains):
-                HDdDe=numpy.zeros((6,6))
-                Dd_COM=numpy.average([self.coords[i] for i in DomainGroups[Dd]] , 0)
-                De_COM=numpy.average([self.coords[i] for i in DomainGroups[De]] , 0)
-                for i in DomainGroups[Dd]:
-                    for j in DomainGroups[De]:
-                        HDDij=self.get_hessian_block(i,j)
-                        HDdDe_iter=numpy.zeros((6,6))
-                        #F_Delta
-                        HDdDe_iter[0:3,0:3]=HDDij
-                        #F_Phi
-                        HDdDe_iter[0,3:]= [  -HDDij[0][1]*(self.coords[j][2]-De_COM[2]) + HDDij[0][2]*(self.coords[j][1]-De_COM[1])  ,  HDDij[0][0]*(self.coords[j][2]-De_COM[2]) - HDDij[0][2]*(self.coords[j][0]-De_COM[0])  ,  -HDDij[0][0]*(self.coords[j][1]-De_COM[1]) + HDDij[0][1]*(self.coords[j][0]-De_COM[0])]
-                        HDdDe_iter[1,3:]= [  -HDDij[1][1]*(self.coords[j][2]-De_COM[2]) + HDDij[1][2]*(self.coords[j][1]-De_COM[1])  ,  HDDij[1][0]*(self.coords[j][2]-De_COM[2]) - HDDij[1][2]*(self.coords[j][0]-De_COM[0])  ,  -HDDij[1][0]*(self.coords[j][1]-De_COM[1]) + HDDij[1][1]*(self.coords[j][0]-De_COM[0])]
-                        HDdDe_iter[2,3:]= [  -HDDij[2][1]*(self.coords[j][2]-De_COM[2]) + HDDij[2][2]*(self.coords[j][1]-De_COM[1])  ,  HDDij[2][0]*(self.coords[j][2]-De_COM[2]) - HDDij[2][2]*(self.coords[j][0]-De_COM[0])  ,  -HDDij[2][0]*(self.coords[j][1]-De_COM[1]) + HDDij[2][1]*(self.coords[j][0]-De_COM[0])]
-                        #Torque_Delta
-                        HDdDe_iter[3,0:3]= [  -HDDij[1][0]*(self.coords[i][2]-Dd_COM[2]) + HDDij[2][0]*(self.coords[i][1]-Dd_COM[1])  ,  -HDDij[1][1]*(self.coords[i][2]-Dd_COM[2]) + HDDij[2][1]*(self.coords[i][1]-Dd_COM[1])  ,  -HDDij[1][2]*(self.coords[i][2]-Dd_COM[2]) + HDDij[2][2]*(self.coords[i][1]-Dd_COM[1])]
-                        HDdDe_iter[4,0:3]= [   HDDij[0][0]*(self.coords[i][2]-Dd_COM[2]) - HDDij[2][0]*(self.coords[i][0]-Dd_COM[0])  ,   HDDij[0][1]*(self.coords[i][2]-Dd_COM[2]) - HDDij[2][1]*(self.coords[i][0]-Dd_COM[0])  ,   HDDij[0][2]*(self.coords[i][2]-Dd_COM[2]) - HDDij[2][2]*(self.coords[i][0]-Dd_COM[0])]
-                        HDdDe_iter[5,0:3]= [  -HDDij[0][0]*(self.coords[i][1]-Dd_COM[1]) + HDDij[1][0]*(self.coords[i][0]-Dd_COM[0])  ,  -HDDij[0][1]*(self.coords[i][1]-Dd_COM[1]) + HDDij[1][1]*(self.coords[i][0]-Dd_COM[0])  ,  -HDDij[0][2]*(self.coords[i][1]-Dd_COM[1]) + HDDij[1][2]*(self.coords[i][0]-Dd_COM[0])]
-                        #Torque_Phi
-                        HDdDe_iter[3,3:]= [   HDDij[1][1]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][2]-De_COM[2]) - HDDij[1][2]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][1]-De_COM[1]) - HDDij[2][1]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][2]-De_COM[2]) + HDDij[2][2]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][1]-De_COM[1])  ,  -HDDij[1][0]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][2]-De_COM[2]) + HDDij[1][2]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][0]-De_COM[0]) + HDDij[2][0]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][2]-De_COM[2]) - HDDij[2][2]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][0]-De_COM[0])  ,   HDDij[1][0]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][1]-De_COM[1]) - HDDij[1][1]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][0]-De_COM[0]) - HDDij[2][0]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][1]-De_COM[1]) + HDDij[2][1]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][0]-De_COM[0])  ]
-                        HDdDe_iter[4,3:]=[  -HDDij[0][1]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][2]-De_COM[2]) + HDDij[0][2]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][1]-De_COM[1]) + HDDij[2][1]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][2]-De_COM[2]) - HDDij[2][2]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][1]-De_COM[1])  ,   HDDij[0][0]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][2]-De_COM[2]) - HDDij[0][2]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][0]-De_COM[0]) - HDDij[2][0]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][2]-De_COM[2]) + HDDij[2][2]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][0]-De_COM[0])  ,  -HDDij[0][0]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][1]-De_COM[1]) + HDDij[0][1]*(self.coords[i][2]-Dd_COM[2])*(self.coords[j][0]-De_COM[0]) + HDDij[2][0]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][1]-De_COM[1]) - HDDij[2][1]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][0]-De_COM[0])  ]
-                        HDdDe_iter[5,3:]=[   HDDij[0][1]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][2]-De_COM[2]) - HDDij[0][2]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][1]-De_COM[1]) - HDDij[1][1]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][2]-De_COM[2]) + HDDij[1][2]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][1]-De_COM[1])  ,  -HDDij[0][0]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][2]-De_COM[2]) + HDDij[0][2]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][0]-De_COM[0]) + HDDij[1][0]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][2]-De_COM[2]) - HDDij[1][2]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][0]-De_COM[0])  ,   HDDij[0][0]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][1]-De_COM[1]) - HDDij[0][1]*(self.coords[i][1]-Dd_COM[1])*(self.coords[j][0]-De_COM[0]) - HDDij[1][0]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][1]-De_COM[1]) + HDDij[1][1]*(self.coords[i][0]-Dd_COM[0])*(self.coords[j][0]-De_COM[0])  ]
-                        HDdDe=numpy.add(HDdDe,HDdDe_iter)
-                HDD[numd*6:(numd*6)+6 , nume*6:(nume*6)+6]=HDdDe
-        
-        
-        #Reconstruction
-        new_dim=6*len(Domains)+3*len(HingeAtoms)
-        H_new=numpy.zeros((new_dim,new_dim))
-        H_new[0:6*len(Domains), 0:6*len(Domains)]=HDD
-        H_new[0:6*len(Domains), 6*len(Domains):]=HDH
-        H_new[6*len(Domains): ,0:6*len(Domains)]=HHD
-        H_new[6*len(Domains):,6*len(Domains):]=HHH
-        
-        #Mass Matrix
-        M=numpy.zeros((H_new.shape))
+        #ANM hessian of all the atoms (springs are gamma/d^2 within the cutoff; power and pf are not used)
+        self.hessian = get_network(self.coords, self.dr, share=self.share).get_hessian(gamma=self.gamma, power=0)
 
-        #MHH
-        if(mass_type == 'unit'):
-            M[6*len(Domains):,6*len(Domains):]=numpy.identity(len(HingeAtoms)*3)
-        elif(mass_type == 'atom'):
-            try:
-                lst= [atomic_weight[self.atoms[i].get_element()] for i in HingeAtoms]
-                lst= list(itertools.chain.from_iterable(itertools.repeat(x, 3) for x in lst))
-                numpy.fill_diagonal( M[6*len(Domains):,6*len(Domains):] , lst )
-            except:
+        #Projection matrix (3N x 6D+3H); also the reverse transformation matrix of the eigenvectors (See hdANM().calculate_RT_matrix())
+        DomainInfo={d:(numd, numpy.average(self.coords[DomainGroups[d]], 0)) for numd,d in enumerate(Domains)}
+        self.domain_info = DomainInfo
+        hinge_atoms = self._get_hinge_atoms()
+        P = self._get_projection_matrix(self.coords, numpy.arange(len(self.atoms)))
+
+        #Reconstruction ([[HDD, HDH], [HHD, HHH]])
+        H_new = (P.T @ (self.hessian @ P)).toarray()
+        
+        #Mass Matrix (Block diagonal; 6x6 block per domain followed by the hinge atom masses)
+        try:
+            if(mass_type == 'atom'):
+                masses = numpy.array([atomic_weight[i.get_element()] for i in self.atoms])
+            elif(mass_type == 'residue'):
+                masses = numpy.array([amino_acid_molecular_weight[i.get_parent().get_name()] for i in self.atoms])
+            else:
+                masses = numpy.ones(len(self.atoms))
+        except KeyError:
+            if(mass_type == 'atom'):
                 print('Unknown atom or the atomic weight not available in packman.constants')
-        elif(mass_type == 'residue'):
-            try:
-                lst= [amino_acid_molecular_weight[self.atoms[i].get_parent().get_name()] for i in HingeAtoms]
-                lst= list(itertools.chain.from_iterable(itertools.repeat(x, 3) for x in lst))
-                numpy.fill_diagonal( M[6*len(Domains):,6*len(Domains):] , lst )
-            except:
+            else:
                 print('Unknown Amino Acid encountered or molecular weight not available in packman.constants')
+            raise
 
-        #MDD (Scheduled to be paralalysed)
-        for numd,d in enumerate(Domains):
-            #F-Delta
+        #MDD: F-Delta is the domain mass; Torque_Phi is the inertia tensor about the domain COM
+        mass_blocks=[]
+        for d in Domains:
+            atoms_d = numpy.array(DomainGroups[d])
+            r = self.coords[atoms_d]-DomainInfo[d][1]
             domain_block=numpy.zeros((6,6))
-            if(mass_type == 'unit'):
-                numpy.fill_diagonal( domain_block[0:3,0:3] , len(DomainGroups[d]) )
-            elif(mass_type == 'atom'):
-                DomainMass = numpy.sum( [atomic_weight[self.atoms[i].get_element()] for i in DomainGroups[d]] )
-                numpy.fill_diagonal( domain_block[0:3,0:3] , DomainMass )
-            elif(mass_type == 'residue'):
-                DomainMass = numpy.sum( [amino_acid_molecular_weight[self.atoms[i].get_parent().get_name()] for i in DomainGroups[d]] )
-                numpy.fill_diagonal( domain_block[0:3,0:3] , DomainMass )
-
-            #Torque_Phi
-            COM=DomainInfo[d][1]
-            for numi,i in enumerate(DomainGroups[d]):
-                MDdDd_local=numpy.array(
-                    [   
-                        [  (self.coords[i][2]-COM[2])**2+(self.coords[i][1]-COM[1])**2  ,  -(self.coords[i][1]-COM[1])*(self.coords[i][0]-COM[0])        ,  -(self.coords[i][0]-COM[0])*(self.coords[i][2]-COM[2])        ],
-                        [ -(self.coords[i][1]-COM[1])*(self.coords[i][0]-COM[0])        ,   (self.coords[i][2]-COM[2])**2+(self.coords[i][0]-COM[0])**2  ,  -(self.coords[i][1]-COM[1])*(self.coords[i][2]-COM[2])        ],
-                        [ -(self.coords[i][0]-COM[0])*(self.coords[i][2]-COM[2])        ,  -(self.coords[i][1]-COM[1])*(self.coords[i][2]-COM[2])        ,   (self.coords[i][0]-COM[0])**2+(self.coords[i][1]-COM[1])**2  ],
-                    ])
-                
-                #Maybe remove if conditions later, create separate functions for improving the speed
-                if(mass_type == 'unit'):
-                    domain_block[3:,3:]=numpy.add(domain_block[3:,3:],MDdDd_local)
-                elif(mass_type == 'atom'):
-                    MDdDd_local = MDdDd_local * atomic_weight[self.atoms[i].get_element()]
-                    domain_block[3:,3:]=numpy.add(domain_block[3:,3:],MDdDd_local)
-                elif(mass_type == 'residue'):
-                    MDdDd_local = MDdDd_local * amino_acid_molecular_weight[self.atoms[i].get_parent().get_name()]
-                    domain_block[3:,3:]=numpy.add(domain_block[3:,3:],MDdDd_local)
-
-            M[numd*6:(numd*6)+6 , numd*6:(numd*6)+6]=domain_block
-
-        self.domain_hessian, self.domain_mass_matrix, self.domain_info = H_new, M, DomainInfo #DomainInfo is saved to check the sequence in which H_new is formed
+            numpy.fill_diagonal( domain_block[0:3,0:3] , numpy.sum(masses[atoms_d]) )
+            domain_block[3:,3:] = numpy.identity(3)*numpy.dot(masses[atoms_d], numpy.einsum('ij,ij->i', r, r)) - numpy.einsum('i,ij,ik->jk', masses[atoms_d], r, r)
+            mass_blocks.append(domain_block)
+
+        #MHH
+        mass_blocks.append( diags(numpy.repeat(masses[hinge_atoms], 3)) )
+        M = block_diag(mass_blocks, format='csr')
+
+        self.RT_matrix, self.RT_eigen_vectors = P, None
+        self.domain_hessian, self.domain_mass_matrix = H_new, M #DomainInfo is saved to check the sequence in which H_new is formed
         return True
     
-    def calculate_RT_eigen_vectors(self):
+    def calculate_RT_matrix(self):
+        """Calculate the reverse transformation matrix of the hdANM model.
+
+        The reverse transformation matrix (3N x 6D+3H; D: Number of domains; H: Number of hinge atoms; N: Number of atoms) maps the domain translations/rotations (about the domain COM) and the hinge atom displacements to the displacements of all the atoms. It is the projection matrix P of the hdANM Hessian (Pᵀ H P), so the eigenvectors are mapped back with the same matrix they were solved in; the linear extrapolation of the hdANM().calculate_movie() uses it as well.
+
+        Note:
+            - Make sure that the hdANM().calculate_hessian() is called before calling this function.
+            - hdANM().calculate_hessian() already stores the matrix; this function rebuilds it only if it is missing.
+            - Atoms that are neither domain nor hinge atoms are not displaced (rows are zero).
+            - hdANM().RT_matrix stores the output (scipy.sparse.csr_matrix) of this function.
+        """
+        if(self.RT_matrix is None):
+            self.RT_matrix = self._get_projection_matrix(self.coords, numpy.arange(len(self.atoms)))
+        return True
+
+    def _get_hinge_atoms(self):
+        """Indices of the hinge atoms (in the same order as the atoms; also the order of their columns in the hdANM matrices)."""
+        return numpy.array([numi for numi,i in enumerate(self.atoms) if i.get_domain_id() is not None and i.get_domain_id()[0]=='H'], dtype=int)
+
+    def _get_projection_matrix(self, locations, owners):
+        """Map (L*3 x 6D+3H) from the domain translations/rotations and the hinge atom displacements to the displacements of the coordinates.
+
+        A coordinate r moved with a domain atom is displaced by delta + phi x (r-COM); a coordinate moved with a hinge atom is displaced by that hinge atom's displacement. Other coordinates are not displaced (rows are zero).
+
+        Args:
+            locations (numpy.ndarray) : L x 3 coordinates.
+            owners (numpy.ndarray)    : Index of the model atom (self.atoms) each coordinate moves with.
+
+        Returns:
+            scipy.sparse.csr_matrix: Projection matrix.
+        """
+        d0 = numpy.array([i.get_domain_id() for i in self.atoms], dtype=object)[owners]
+        n_domains = len(self.domain_info)
+
+        rows, cols, data = [], [], []
+        for d,(numd,COM) in self.domain_info.items():
+            idx = numpy.flatnonzero(d0 == d)
+            x, y, z = (locations[idx]-COM).T
+            one = numpy.ones(len(idx))
+            for row, col, value in [(0,0,one), (1,1,one), (2,2,one), (0,4,z), (0,5,-y), (1,3,-z), (1,5,x), (2,3,y), (2,4,-x)]:
+                rows.append(idx*3+row)
+                cols.append(numpy.full(len(idx), numd*6+col))
+                data.append(value)
+
+        hinge_atoms = self._get_hinge_atoms()
+        slot = numpy.full(len(self.atoms), -1)
+        slot[hinge_atoms] = numpy.arange(len(hinge_atoms))
+        idx = numpy.flatnonzero(slot[owners] >= 0)
+        for c in range(3):
+            rows.append(idx*3+c)
+            cols.append(6*n_domains+slot[owners[idx]]*3+c)
+            data.append(numpy.ones(len(idx)))
+
+        return csr_matrix( (numpy.concatenate(data), (numpy.concatenate(rows), numpy.concatenate(cols))), shape=(len(locations)*3, 6*n_domains+3*len(hinge_atoms)) )
+
+    def calculate_RT_eigen_vectors(self, start_mode=0, end_mode=None):
         """Calculate the reverse transformed vectors from the hdANM eigenvectors. 
     
         Reverse transformed means that the hdANM eigenvector of dimension: 6D+3H x 6D+3H  (D: Number of domains; H: Number of hinge atoms) are converted to 3N x 6D+3H (N: Number of atoms)
 
+        Args:
+            start_mode (int, optional) : First mode to be transformed. Defaults to 0.
+            end_mode (int, optional)   : Mode after the last mode to be transformed. Defaults to None (Till the last mode).
+
         Note:
             - It was refered as 'exploded vector' utill version 1.3.3
+            - The reverse transformation matrix (See hdANM().calculate_RT_matrix()) is built once and applied to all the requested modes at once.
+            - Column k of the output is the mode start_mode+k.
         """
-        x0 = numpy.array([i.get_location() for i in self.atoms])
-        d0 = [i.get_domain_id() for i in self.atoms]
-        
-        exploded_vectors=numpy.zeros((len(x0)*3, len(self.eigen_values) ))
-
-        for mode_number in range(0,self.eigen_vectors.shape[1],1):
-            new_column=[]
-            HingeResidue=0
-            for numi,i in enumerate(x0):
-                if(d0[numi][0]=='D'):
-                    D_delta_phi= self.eigen_vectors[:,mode_number][self.domain_info[d0[numi]][0]*6 : (self.domain_info[d0[numi]][0]*6)+6]
-                    D_COM=self.domain_info[d0[numi]][1]
-                    new_x= ( D_delta_phi[0] + (D_delta_phi[4]*(i[2]-D_COM[2])) - (D_delta_phi[5]*(i[1]-D_COM[1])) )
-                    new_y= ( D_delta_phi[1] + (D_delta_phi[3]*(i[2]-D_COM[2])) - (D_delta_phi[5]*(i[0]-D_COM[0])) )
-                    new_z= ( D_delta_phi[2] + (D_delta_phi[3]*(i[1]-D_COM[1])) - (D_delta_phi[4]*(i[0]-D_COM[0])) )
-                if(d0[numi][0]=='H'):
-                    delta=self.eigen_vectors[:,mode_number][6*len(self.domain_info):][HingeResidue*3:(HingeResidue*3)+3]
-                    new_x=delta[0]
-                    new_y=delta[1]
-                    new_z=delta[2]
-                    HingeResidue+=1
-                new_column.extend([new_x,new_y,new_z])
-            exploded_vectors[:,mode_number]=numpy.array(new_column)
-        
-        self.RT_eigen_vectors = exploded_vectors
+        if(self.RT_matrix is None):
+            self.calculate_RT_matrix()
+        self.RT_eigen_vectors = numpy.asarray( self.RT_matrix @ self.eigen_vectors[:,start_mode:end_mode] )
         return True
 
     def calculate_fluctuations(self):
         """Calculate the Fluctuations of the hd-ANM model.
 
-        The fluctualtions/ theoretical b-factors are calculated using this method.
+        The fluctualtions/ theoretical b-factors are calculated using this method; sum of |v_ik|^2/lambda_k over the non-rigid modes (traces of the diagonal 3x3 blocks of the pseudoinverse without forming it).
         
         Note:
             - Fluctuations are calculated. use hdANM().get_fluctuations() to obtain the fluctuations.
             - Endmode needs to be put in the code if and when required.
             - hdANM().fluctuations stores the output of this function.
         """
-        x0 = numpy.array([i.get_location() for i in self.atoms])
-
-        if(self.RT_eigen_vectors == None):
+        if(self.RT_eigen_vectors is None or self.RT_eigen_vectors.shape[1] != len(self.eigen_values)):
             self.calculate_RT_eigen_vectors()
         
-        exploded_vectors = self.RT_eigen_vectors
-        exploded_vectors = exploded_vectors.T
-
-        mode_bfactors=[]
-        for numi,i in enumerate(self.eigen_values[6:]):
-            evec_row=exploded_vectors[numi+6]
-            mode_bfactors.append([ float(evec_row[j]**2 + evec_row[j+1]**2 + evec_row[j+2]**2)/i for j in range(0,len(x0)*3,3)])
-        
-        mode_bfactors=numpy.array(mode_bfactors)
-        self.fluctuations = [numpy.sum(i) for i in mode_bfactors.T]
+        EVec = self.RT_eigen_vectors[:,6:].reshape(len(self.atoms), 3, -1)
+        self.fluctuations = numpy.einsum('iam,iam,m->i', EVec, EVec, 1.0/self.eigen_values[6:])
         return True
     
     def calculate_hessian_pseudoinverse(self, n_modes="all"):
@@ -523,40 +474,109 @@ class hdANM:
         Note:
             - Can be called on demand or can be called from get method automatically (Needs thinking)
         """
-        
-            
-        if(self.RT_eigen_vectors == None):
+        if(self.RT_eigen_vectors is None or self.RT_eigen_vectors.shape[1] != len(self.eigen_values)):
             self.calculate_RT_eigen_vectors()
-        EVec=self.get_RT_eigen_vectors().T
-        if(n_modes=="all"):
-            self.hessian_pseudoinverse = numpy.matmul(  numpy.matmul( EVec[6:].transpose() , numpy.diag(1/self.get_eigenvalues()[6:]) )  , EVec[6:]  )
-        else:
-            self.hessian_pseudoinverse = numpy.matmul(  numpy.matmul( EVec[6:6+n_modes].transpose() , numpy.diag(1/self.get_eigenvalues()[6:6+n_modes]) )  , EVec[6:6+n_modes]  )
+        stop = len(self.eigen_values) if n_modes == "all" else 6+int(n_modes)
+        EVec = self.RT_eigen_vectors[:,6:stop]
+        self.hessian_pseudoinverse = numpy.dot( EVec / self.eigen_values[6:stop] , EVec.T )
+        return True
     
-    def calculate_cross_correlation( self, n_modes = "all" ):
+    def calculate_cross_correlation( self, n_modes = "all", chunk_size=None, out=None ):
         """Calculate the cross correlation matrix for the hdANM modes.
 
         Crosscorrelation matrix is generated for all modes by default. Please change the n_modes parameter to restrict modes.
+        The cross-correlation is the trace of the 3x3 block of the pseudoinverse normalized by the traces of the diagonal blocks; C_ij = tr(P_ij)/sqrt(tr(P_ii)*tr(P_jj)).
+
+        Notes:
+            * If chunk_size is provided, the matrix is calculated in the blocks of chunk_size rows directly from the modes, so the working memory besides the output is bounded by chunk_size x N. The pseudoinverse is not calculated in that case.
+            * The output can be preallocated by the user (eg... numpy.memmap for very large N)
 
         Args:
             -   n_modes (int): Number of modes that need to be considered to calculate the cross correlation matrix. 
+            -   chunk_size (int, optional)  : Number of rows calculated at once. Defaults to None (Whole matrix at once).
+            -   out (numpy.ndarray, optional): N x N array to write the cross-correlation into. Defaults to None (New array).
         """
-        self.calculate_hessian_pseudoinverse(n_modes=n_modes)
-        
-        self.crosscorrelation_matrix = numpy.zeros( (len(self.atoms), len(self.atoms)) )
-        for i in range(0,len(self.atoms)):
-            for j in range(0,len(self.atoms)):
-                trace_H_inv_ij = numpy.trace( self.get_hessian_pseudoinverse()[i*3:i*3+3,j*3:j*3+3] )
-                trace_H_inv_ii = numpy.trace( self.get_hessian_pseudoinverse()[i*3:i*3+3,i*3:i*3+3] )
-                trace_H_inv_jj = numpy.trace( self.get_hessian_pseudoinverse()[j*3:j*3+3,j*3:j*3+3] )
+        n = len(self.atoms)
+        if(out is None):
+            out = numpy.empty((n, n))
+
+        if(chunk_size is None):
+            self.calculate_hessian_pseudoinverse(n_modes=n_modes)
+            traces = numpy.einsum('iaja->ij', self.hessian_pseudoinverse.reshape(n, 3, n, 3))
+            norm = 1.0 / numpy.sqrt( numpy.diag(traces) )
+            numpy.multiply( traces, numpy.outer(norm, norm), out=out )
+        else:
+            if(self.RT_eigen_vectors is None or self.RT_eigen_vectors.shape[1] != len(self.eigen_values)):
+                self.calculate_RT_eigen_vectors()
+            stop = len(self.eigen_values) if n_modes == "all" else 6+int(n_modes)
+            #Trace of the 3x3 block is the dot product of the (3 x modes) rows of the atoms
+            EVec = self.RT_eigen_vectors[:,6:stop].reshape(n, 3, -1)
+            scaled = (EVec / self.eigen_values[6:stop]).reshape(n, -1)
+            EVec = EVec.reshape(n, -1)
+            norm = 1.0 / numpy.sqrt( numpy.einsum('ij,ij->i', scaled, EVec) )
+            for start in range(0, n, int(chunk_size)):
+                end = min(start+int(chunk_size), n)
+                out[start:end] = numpy.dot(scaled[start:end], EVec.T) * norm[start:end,None] * norm[None,:]
+
+        self.crosscorrelation_matrix = out
+        return True
+
+    def _get_movie_frames(self, mode_number, scale, n, extrapolation, locations, owners):
+        """Coordinates of all the frames of the mode projection (Used by hdANM().calculate_movie())
+
+        One rotation/translation per domain per frame is applied to all the coordinates of the domain at once (curvilinear); the linear extrapolation and the hinge displacements use the reverse transformation matrix (See hdANM().calculate_RT_matrix()).
+
+        Args:
+            mode_number (int)                  : Mode number.
+            scale (float)                      : See hdANM().calculate_movie()
+            n (int)                            : See hdANM().calculate_movie()
+            extrapolation (linear/curvilinear) : See hdANM().calculate_movie()
+            locations (numpy.ndarray)          : L x 3 coordinates to be moved.
+            owners (numpy.ndarray)             : Index of the model atom (self.atoms) each coordinate moves with.
+
+        Returns:
+            numpy.ndarray: (n+1) x L x 3 coordinates.
+        """
+        vector = self.eigen_vectors[:,mode_number].real
+        steps = scale * numpy.sin( numpy.arange(n+1) * (1.0/float(n)) * 2 * numpy.pi )
+
+        frames = numpy.repeat( locations[None,:,:], n+1, axis=0 )
+
+        #Same mapping as the reverse transformation of the eigenvectors (See hdANM().calculate_RT_matrix())
+        if(len(owners) == len(self.atoms) and self.RT_matrix is not None):
+            projection = self.RT_matrix
+        else:
+            projection = self._get_projection_matrix(locations, owners)
 
-                self.crosscorrelation_matrix[i][j] = trace_H_inv_ij / numpy.sqrt( trace_H_inv_ii*trace_H_inv_jj )
+        if(extrapolation=="linear"):
+            frames += steps[:,None,None] * (projection @ vector).reshape(-1, 3)[None,:,:]
+            return frames
+
+        d0 = numpy.array([i.get_domain_id() for i in self.atoms], dtype=object)[owners]
+        for d,(numd,D_COM) in self.domain_info.items():
+            #Rodrigues rotation about the axis D_mu by the angle scale*j*|phi| (one matrix per frame)
+            idx = numpy.flatnonzero(d0 == d)
+            D_delta_phi = vector[numd*6:(numd*6)+6]
+            r = locations[idx] - D_COM
+            Q_D_n = numpy.linalg.norm(D_delta_phi[3:])
+            D_mu = D_delta_phi[3:] / Q_D_n
+            cos, sin = numpy.cos(steps*Q_D_n), numpy.sin(steps*Q_D_n)
+            cross = numpy.array([ [0, -D_mu[2], D_mu[1]], [D_mu[2], 0, -D_mu[0]], [-D_mu[1], D_mu[0], 0] ])
+            R = cos[:,None,None]*numpy.identity(3) + (1-cos)[:,None,None]*numpy.outer(D_mu, D_mu) + sin[:,None,None]*cross
+            frames[:,idx] = D_COM + steps[:,None,None]*D_delta_phi[:3] + numpy.einsum('fab,nb->fna', R, r)
+
+        #Hinge displacements are linear (domain components are left out)
+        hinge_vector = vector.copy()
+        hinge_vector[:6*len(self.domain_info)] = 0
+        frames += steps[:,None,None] * (projection @ hinge_vector).reshape(-1, 3)[None,:,:]
+
+        return frames
 
     def calculate_movie(self, mode_number, scale=1.5, n=20, extrapolation="curvilinear", ftype='cif', ca_to_aa=False):
         """This function generates the dynamic 3D projection of the normal modes obtained using hd-ANM. The 3D projection can be linearly extrapolated or curvilinearly extrapolated depending on the choices. The first frame is the original structure and the projection progresses in positive (+) direction, returning to original structure and then in negative direction (-) again returning to the original structure.
 
         Args:
-            mode_number (int)                   : Mode number. (first non-rigid mode is 6th)
+            mode_number (int/[int])             : Mode number or the list of the mode numbers (one file per mode). (first non-rigid mode is 6th)
             scale (float)                       : Multiplier; extent to which mode will be extrapolated.                 Defaults to 1.5
             n (int)                             : Number of frames in output (should be =>8 and ideally multiple of 4)   Defaults to 20
             extrapolation (linear/curvilinear)  : Extrapolation method                                                   Defaults to "curvilinear"
@@ -566,6 +586,7 @@ class hdANM:
         Note:
             - Scale and n parameters should be redesigned.
             - direction is the variable which be allow user to explore only positive or only negative direction of the modes.
+            - Each domain is moved by one rotation and translation per frame (curvilinear) and atoms that are neither domain nor hinge atoms are not moved.
 
         Returns:
             True if successful; false otherwise.
@@ -576,139 +597,36 @@ class hdANM:
         else:
           if(len(list(set([i.get_name() for i in self.atoms]))) == 1 ): logging.info('A single type of atom is detected. Try enabling the "ca_to_aa" parameter. See the function description for more details.')
 
+        if(extrapolation not in ["linear", "curvilinear"]):
+            logging.warning('Please provide valid input for the "extrapolation" parameter.')
+            return False
+
         x0=numpy.array([i.get_location() for i in self.atoms])
         d0=[i.get_domain_id() for i in self.atoms]
-        new_coords=[]
 
-        if(extrapolation=="linear"):
-            movement = [ numpy.sin(k*(1.0/float(n))*2*numpy.pi) for k in range(0,n+1,1) ]
-            ModelsOfTheProtein = []
-            for j in movement:
-                HingeResidue=0
-                AtomsOfTheFrame = {}
-                non_model_atoms = 0 #Only when ca_to_aa option is enabled.
-                for numi,i in enumerate(x0):
-                    if(d0[numi][0]=='D'):
-                        D_delta_phi= self.eigen_vectors[:,mode_number][self.domain_info[d0[numi]][0]*6 : (self.domain_info[d0[numi]][0]*6)+6]
-                        D_COM=self.domain_info[d0[numi]][1]
-                        new_x=i[0]+scale*j* ( D_delta_phi[0] + (D_delta_phi[4]*(i[2]-D_COM[2])) - (D_delta_phi[5]*(i[1]-D_COM[1])) )
-                        new_y=i[1]+scale*j* ( D_delta_phi[1] + (D_delta_phi[3]*(i[2]-D_COM[2])) - (D_delta_phi[5]*(i[0]-D_COM[0])) )
-                        new_z=i[2]+scale*j* ( D_delta_phi[2] + (D_delta_phi[3]*(i[1]-D_COM[1])) - (D_delta_phi[4]*(i[0]-D_COM[0])) )
-                        if(ca_to_aa):
-                            for x in self.atoms[numi].get_parent().get_atoms():
-                                temp_new_x=x.get_location()[0]+scale*j* ( D_delta_phi[0] + (D_delta_phi[4]*(x.get_location()[2]-D_COM[2])) - (D_delta_phi[5]*(x.get_location()[1]-D_COM[1])) )
-                                temp_new_y=x.get_location()[1]+scale*j* ( D_delta_phi[1] + (D_delta_phi[3]*(x.get_location()[2]-D_COM[2])) - (D_delta_phi[5]*(x.get_location()[0]-D_COM[0])) )
-                                temp_new_z=x.get_location()[2]+scale*j* ( D_delta_phi[2] + (D_delta_phi[3]*(x.get_location()[1]-D_COM[1])) - (D_delta_phi[4]*(x.get_location()[0]-D_COM[0])) )
-
-                                non_model_atoms+=1
-                                AtomsOfTheFrame[len(x0)+non_model_atoms] = Atom(x.get_id() , x.get_name(), numpy.array([temp_new_x,temp_new_y,temp_new_z]), x.get_occupancy(), x.get_bfactor(), x.get_element(), x.get_charge(), x.get_parent() )
-                                
-                    if(d0[numi][0]=='H'):
-                        delta=self.eigen_vectors[:,mode_number][6*len(self.domain_info):][HingeResidue*3:(HingeResidue*3)+3]
-                        new_x=i[0]+scale*j*delta[0]
-                        new_y=i[1]+scale*j*delta[1]
-                        new_z=i[2]+scale*j*delta[2]
-                        HingeResidue+=1
-                        if(ca_to_aa):
-                            for x in self.atoms[numi].get_parent().get_atoms():
-                                temp_new_x=x.get_location()[0]+scale*j*delta[0]
-                                temp_new_y=x.get_location()[1]+scale*j*delta[1]
-                                temp_new_z=x.get_location()[2]+scale*j*delta[2]
-
-                                non_model_atoms+=1
-                                AtomsOfTheFrame[len(x0)+non_model_atoms] = Atom(x.get_id() , x.get_name(), numpy.array([temp_new_x,temp_new_y,temp_new_z]), x.get_occupancy(), x.get_bfactor(), x.get_element(), x.get_charge(), x.get_parent() )
-                                
-                    #All the atoms in the models (CA or all atom); Atoms from ca_to_aa option are not included.
-                    new_x , new_y, new_z = new_x.real , new_y.real , new_z.real
-                    new_coords.append([new_x,new_y,new_z])
-                    currentatm = Atom(self.atoms[numi].get_id() , self.atoms[numi].get_name(), numpy.array([new_x,new_y,new_z]), self.atoms[numi].get_occupancy(), self.atoms[numi].get_bfactor(), self.atoms[numi].get_element(),self.atoms[numi].get_charge(), self.atoms[numi].get_parent() )
-                    AtomsOfTheFrame[numi] = currentatm
-                
-                ModelsOfTheProtein.append( Model(j, AtomsOfTheFrame, None, None, None, None) )
-            
-            Annotations = self.atoms[0].get_parent().get_parent().get_parent().get_parent().get_data()
-            prot = Protein(str(mode_number), ModelsOfTheProtein)
-            prot.set_data(Annotations)
-            prot.write_structure( str(mode_number)+'.'+ftype )
-            
+        #All the atoms in the models (CA or all atom) followed by the atoms from the ca_to_aa option (moved with their model atom)
+        extra_atoms = []
+        if(ca_to_aa):
+            extra_atoms = [ (numi, x) for numi in range(len(x0)) if d0[numi] is not None and d0[numi][0] in ['D','H'] for x in self.atoms[numi].get_parent().get_atoms() ]
+        owners = numpy.concatenate( (numpy.arange(len(x0)), numpy.array([i[0] for i in extra_atoms], dtype=int)) )
+        locations = numpy.concatenate( (x0, numpy.array([i[1].get_location() for i in extra_atoms]).reshape(-1,3)) )
+
+        movement = [ numpy.sin(k*(1.0/float(n))*2*numpy.pi) for k in range(0,n+1,1) ]
+        Annotations = self.atoms[0].get_parent().get_parent().get_parent().get_parent().get_data()
+        for mode in numpy.atleast_1d(mode_number):
+            frames = self._get_movie_frames(int(mode), scale, n, extrapolation, locations, owners)
 
-        elif(extrapolation=="curvilinear"):
-            movement = [ numpy.sin(k*(1.0/float(n))*2*numpy.pi) for k in range(0,n+1,1) ]
             ModelsOfTheProtein = []
-            for j in movement:
-                HingeResidue=0
+            for numj,j in enumerate(movement):
                 AtomsOfTheFrame = {}
-                non_model_atoms = 0 #Only when ca_to_aa option is enabled.
-                for numi,i in enumerate(x0):
-                    if(d0[numi][0]=='D'):
-                        D_delta_phi= self.eigen_vectors[:,mode_number][self.domain_info[d0[numi]][0]*6 : (self.domain_info[d0[numi]][0]*6)+6]
-                        #D_mu= D_delta_phi[3:]
-                        Q_D_n=numpy.linalg.norm(D_delta_phi[3:])
-                        D_mu=D_delta_phi[3:] / Q_D_n
-                        D_COM=self.domain_info[d0[numi]][1]
-                        #D_delta_phi[0] is questionable ; D_delta_phi[3:] is also questionable
-                        new_x= D_COM[0]+ scale*j*D_delta_phi[0] \
-                        + ( numpy.cos(scale*j*Q_D_n)+ D_mu[0]**2 * (1-numpy.cos(scale*j*Q_D_n)) )             * (i[0] -D_COM[0]) \
-                        + ( D_mu[0]*D_mu[1]*(1-numpy.cos(scale*j*Q_D_n)) - D_mu[2]*numpy.sin(scale*j*Q_D_n) ) * (i[1] -D_COM[1]) \
-                        + ( D_mu[0]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) + D_mu[1]*numpy.sin(scale*j*Q_D_n) ) * (i[2] -D_COM[2])
-                        
-                        new_y= D_COM[1]+ scale*j*D_delta_phi[1] \
-                        + ( D_mu[0]*D_mu[1]*(1-numpy.cos(scale*j*Q_D_n)) + D_mu[2]*numpy.sin(scale*j*Q_D_n) ) * (i[0] -D_COM[0]) \
-                        + ( numpy.cos(scale*j*Q_D_n)+D_mu[1]**2 * (1-numpy.cos(scale*j*Q_D_n)) )              * (i[1] -D_COM[1]) \
-                        + ( D_mu[1]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) - D_mu[0]*numpy.sin(scale*j*Q_D_n) ) * (i[2] -D_COM[2])
-
-                        new_z= D_COM[2]+ scale*j*D_delta_phi[2] \
-                        + ( D_mu[0]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) - D_mu[1]*numpy.sin(scale*j*Q_D_n) ) * (i[0] -D_COM[0]) \
-                        + ( D_mu[1]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) + D_mu[0]*numpy.sin(scale*j*Q_D_n) ) * (i[1] -D_COM[1]) \
-                        + ( numpy.cos(scale*j*Q_D_n)+ D_mu[2]**2 * (1-numpy.cos(scale*j*Q_D_n)) )             * (i[2] -D_COM[2])
-
-                        if(ca_to_aa):
-                            for x in self.atoms[numi].get_parent().get_atoms():
-                                temp_new_x= D_COM[0]+ scale*j*D_delta_phi[0] \
-                                + ( numpy.cos(scale*j*Q_D_n)+ D_mu[0]**2 * (1-numpy.cos(scale*j*Q_D_n)) )             * (x.get_location()[0] -D_COM[0]) \
-                                + ( D_mu[0]*D_mu[1]*(1-numpy.cos(scale*j*Q_D_n)) - D_mu[2]*numpy.sin(scale*j*Q_D_n) ) * (x.get_location()[1] -D_COM[1]) \
-                                + ( D_mu[0]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) + D_mu[1]*numpy.sin(scale*j*Q_D_n) ) * (x.get_location()[2] -D_COM[2])
-                                
-                                temp_new_y= D_COM[1]+ scale*j*D_delta_phi[1] \
-                                + ( D_mu[0]*D_mu[1]*(1-numpy.cos(scale*j*Q_D_n)) + D_mu[2]*numpy.sin(scale*j*Q_D_n) ) * (x.get_location()[0] -D_COM[0]) \
-                                + ( numpy.cos(scale*j*Q_D_n)+D_mu[1]**2 * (1-numpy.cos(scale*j*Q_D_n)) )              * (x.get_location()[1] -D_COM[1]) \
-                                + ( D_mu[1]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) - D_mu[0]*numpy.sin(scale*j*Q_D_n) ) * (x.get_location()[2] -D_COM[2])
-
-                                temp_new_z= D_COM[2]+ scale*j*D_delta_phi[2] \
-                                + ( D_mu[0]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) - D_mu[1]*numpy.sin(scale*j*Q_D_n) ) * (x.get_location()[0] -D_COM[0]) \
-                                + ( D_mu[1]*D_mu[2]*(1-numpy.cos(scale*j*Q_D_n)) + D_mu[0]*numpy.sin(scale*j*Q_D_n) ) * (x.get_location()[1] -D_COM[1]) \
-                                + ( numpy.cos(scale*j*Q_D_n)+ D_mu[2]**2 * (1-numpy.cos(scale*j*Q_D_n)) )             * (x.get_location()[2] -D_COM[2])
-
-                                non_model_atoms+=1
-                                AtomsOfTheFrame[len(x0)+non_model_atoms] = Atom(x.get_id() , x.get_name(), numpy.array([temp_new_x,temp_new_y,temp_new_z]), x.get_occupancy(), x.get_bfactor(), x.get_element(), x.get_charge(), x.get_parent() )
-
-
-                    if(d0[numi][0]=='H'):
-                        delta=self.eigen_vectors[:,mode_number][6*len(self.domain_info):][HingeResidue*3:(HingeResidue*3)+3]
-                        new_x=i[0]+scale*j*delta[0]
-                        new_y=i[1]+scale*j*delta[1]
-                        new_z=i[2]+scale*j*delta[2]
-                        HingeResidue+=1
-
-                        if(ca_to_aa):
-                            for x in self.atoms[numi].get_parent().get_atoms():
-                                temp_new_x=x.get_location()[0]+scale*j*delta[0]
-                                temp_new_y=x.get_location()[1]+scale*j*delta[1]
-                                temp_new_z=x.get_location()[2]+scale*j*delta[2]
-                                
-                                non_model_atoms+=1
-                                AtomsOfTheFrame[len(x0)+non_model_atoms] = Atom(x.get_id() , x.get_name(), numpy.array([temp_new_x,temp_new_y,temp_new_z]), x.get_occupancy(), x.get_bfactor(), x.get_element(), x.get_charge(), x.get_parent() )
-
-                    new_x , new_y, new_z = new_x.real , new_y.real , new_z.real
-                    new_coords.append([new_x,new_y,new_z])
-                    currentatm = Atom(self.atoms[numi].get_id() , self.atoms[numi].get_name(), numpy.array([new_x,new_y,new_z]), self.atoms[numi].get_occupancy(), self.atoms[numi].get_bfactor(), self.atoms[numi].get_element(),self.atoms[numi].get_charge(), self.atoms[numi].get_parent() )
-                    AtomsOfTheFrame[numi] = currentatm
-                    
+                for numi,i in enumerate(self.atoms):
+                    AtomsOfTheFrame[numi] = Atom(i.get_id() , i.get_name(), frames[numj][numi], i.get_occupancy(), i.get_bfactor(), i.get_element(), i.get_charge(), i.get_parent() )
+                for numx,(numi,x) in enumerate(extra_atoms):
+                    AtomsOfTheFrame[len(x0)+numx+1] = Atom(x.get_id() , x.get_name(), frames[numj][len(x0)+numx], x.get_occupancy(), x.get_bfactor(), x.get_element(), x.get_charge(), x.get_parent() )
                 ModelsOfTheProtein.append( Model(j, AtomsOfTheFrame, None, None, None, None) )
 
-            Annotations = self.atoms[0].get_parent().get_parent().get_parent().get_parent().get_data()
-            prot = Protein(str(mode_number), ModelsOfTheProtein)
+            prot = Protein(str(int(mode)), ModelsOfTheProtein)
             prot.set_data(Annotations)
-            prot.write_structure( str(mode_number)+'.'+ftype )
+            prot.write_structure( str(int(mode))+'.'+ftype )
             
-        return True
\ No newline at end of file
+        return True
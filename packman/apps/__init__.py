@@ -6,6 +6,7 @@
 
 Notes:
     * Current apps list: - predict_hinge : A program to predict the hinge on the molecule given the atoms and relevent parameters
+                         - scan_hinges   : A program to predict the conclusive hinges by scanning many alpha values
 
 Example::
     * Review the packman.bin.PACKMAN.py file for the app use.
@@ -20,6 +21,7 @@ Todo:
 """
 
 from .predict_hinge import predict_hinge, hinge_cli
+from .scan_hinges import scan_hinges, merge_hinges, hinge_scan_cli
 from .hdanm import hdanm_cli
 from .calculate_entropy import entropy_cli
 from .dci import DCI, dci_cli
\ No newline at end of file
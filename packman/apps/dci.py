@@ -19,11 +19,12 @@ Authors:
 import logging
 
 import numpy
-from sklearn.metrics import calinski_harabasz_score as chs
 from scipy.cluster.hierarchy import ward, fcluster
 
 from ..anm import ANM
 from ..molecule import Protein
+from ..enm import CrossCorrelation, get_network
+from ..utilities import cut_dendrogram, calinski_harabasz_scores
 
 class DCI():
     """This class contains the code for DCI analysis.
@@ -38,9 +39,11 @@ class DCI():
         cutoff (float)                 : GNM distance cutoff. Default set to 7.5
         chain (string)                 : Protein chain id. Default is set to using all chains.
         n_com (int)                    : Number of communities to generate. Default the program will explore best possible cluster numbers for the given data.
+        cache (packman.enm.ModeCache/str) : Disk cache of the eigenvalues and eigenvectors (or its directory). Default is no disk cache.
+        share (bool)                   : Share the contacts, Kirchoff matrix and eigenbasis with the other models of the same coordinates and cutoff (See packman.enm.get_network); shared arrays (self.GNM_MAT, self.eigen_values and self.eigen_vectors) are read-only. Default is False.
     """
         
-    def __init__(self, mol, cutoff = 7.0, chain = None, n_com = None):
+    def __init__(self, mol, cutoff = 7.0, chain = None, n_com = None, cache = None, share = False):
         self.molObj = mol
         assert type( self.molObj ) == Protein, "mol should be a packman.molecule.Protein object."
 
@@ -59,12 +62,13 @@ class DCI():
             raise ValueError("Value of cutoff can only be a positive integer")
 
         self.cutoff = cutoff
+        self.share = share
         self.coords = numpy.array([x.get_location() for x in self.atoms])
         self.pdbid = mol.get_id()
 
         
         self.calculate_kirchoff()
-        self.calculate_decomposition()
+        self.calculate_decomposition(cache=cache)
         self.calculate_crosscorrelation()
         dist_mat = 1-self.C
 
@@ -146,6 +150,19 @@ class DCI():
             C (numpy.array) : Cross-correlation matrix.
         """
         return self.C
+
+    def get_crosscorrelation_operator(self, n_modes=None, dtype=numpy.float32):
+        """Get the cross-correlation as a lazy operator (rows, blocks and top partners on demand) without the N x N matrix.
+
+        Args:
+            n_modes (int, optional)       : Number of the slowest non-trivial modes to be used. Defaults to None (All the modes).
+            dtype (numpy.dtype, optional) : Storage type. Defaults to numpy.float32.
+
+        Returns:
+            packman.enm.CrossCorrelation: Cross-correlation operator.
+        """
+        stop = len(self.eigen_values) if n_modes is None else 1+int(n_modes)
+        return CrossCorrelation(self.eigen_vectors[:,1:stop], self.eigen_values[1:stop], dim=1, dtype=dtype)
     
     def get_communities(self):
         """Get all the communities generated using DCI.
@@ -159,51 +176,41 @@ class DCI():
     def calculate_kirchoff(self, gamma = 1.0):
         """Calculate the Gaussian Network Model (GNM) Kirchoff Matrix.
 
-        The matrix is stored in the self.GNM_MAT variable.
+        The matrix is stored in the self.GNM_MAT variable. The contacts and the matrix are shared with the other models of the same coordinates and cutoff if the object is created with share=True (See packman.enm.get_network)
 
         Returns:
             True if successful; None otherwise.
         """
-        n_atoms=len(self.coords)
-        self.GNM_MAT=numpy.zeros((n_atoms, n_atoms), float)
-        for i in range(len(self.coords)):
-            diff = self.coords[i+1:, :] - self.coords[i]
-            squared_diff = diff**2
-            for j, s_ij in enumerate(squared_diff.sum(1)):
-                if s_ij <= self.cutoff**2:
-                    diff_coords = diff[j]
-                    j = j + i + 1
-                    self.GNM_MAT[i, j] = -gamma
-                    self.GNM_MAT[j, i] = -gamma
-                    self.GNM_MAT[i, i] = self.GNM_MAT[i, i] + gamma
-                    self.GNM_MAT[j, j] = self.GNM_MAT[j, j] + gamma
+        self.network = get_network(self.coords, self.cutoff, share=self.share)
+        self.GNM_MAT = self.network.get_kirchhoff(gamma=gamma, sparse=False)
         return True
     
-    def calculate_decomposition(self):
+    def calculate_decomposition(self, cache = None):
         """Eigen decomposition calculation.
 
         Access the eigen values and eigen vectors with self.eigen_values and self.eigen_vectors
 
+        Args:
+            cache (packman.enm.ModeCache/str) : Disk cache of the eigenvalues and eigenvectors (or its directory); read from the cache if available, stored otherwise. Default is no disk cache.
+
         Returns:
             True if successful; None otherwise.
         """
-        self.eigen_values, self.eigen_vectors = numpy.linalg.eigh(self.GNM_MAT)
+        self.eigen_values, self.eigen_vectors = self.network.get_decomposition(self.GNM_MAT, cache=cache)
         return True
     
     def calculate_crosscorrelation(self):
         """Calculate the cross-correlation. (Read the paper for more details)
 
+        C_ij = P_ij/sqrt(P_ii*P_jj); P is the pseudoinverse of the Kirchoff matrix from the non-trivial modes.
+
         Returns:
             True if successful; None otherwise.
         """
-        n = len(self.atoms)
-        EVec=self.eigen_vectors.T
-        self.hessian_inv= numpy.matmul( numpy.matmul( EVec[1:].transpose() , numpy.diag(1/self.eigen_values[1:]) ) , EVec[1:] )
-        self.C = numpy.zeros((n , n))
-        for i in range(n):
-            for j in range(n):
-                self.C[i, j] = float(self.hessian_inv[i, j])/numpy.sqrt(self.hessian_inv[i, i]*self.hessian_inv[j, j])
-                
+        EVec = self.eigen_vectors[:,1:]
+        self.hessian_inv = numpy.dot( EVec / self.eigen_values[1:], EVec.T )
+        diagonal = numpy.diag(self.hessian_inv)
+        self.C = self.hessian_inv / numpy.sqrt( numpy.outer(diagonal, diagonal) )
         return True
 
     def calculate_windows(self, iterable):
@@ -229,6 +236,7 @@ class DCI():
         """Calculates the best possible communities/clusters.
 
         self.store_score calculated CH score for every clustering number. (Read the paper for more details)
+        The dendrogram is cut for all the cluster numbers at once and the CH scores are calculated from the centroids of its merges (See packman.utilities.cut_dendrogram and packman.utilities.calinski_harabasz_scores), so large max_iter is cheap.
 
         Args:
             dist_mat (numpy.array) : 1 - cross-correlation matrix.
@@ -241,15 +249,13 @@ class DCI():
         dist_mat = numpy.sqrt(2*(dist_mat))
         Data = numpy.triu(dist_mat)
         Z = ward(Data)
-        self.store_score = dict()
-        for i in range(2, max_iter):
-            label = fcluster(Z, i, criterion='maxclust')
-            self.store_communities[i] = label
-            score = chs(dist_mat, label)
-            self.store_score[i] = score
-            if score > best_score:
-                self.best_community = label
-                best_score = score
+        counts = range(2, max_iter)
+        self.store_communities.update( cut_dendrogram(Z, counts) )
+        self.store_score = calinski_harabasz_scores(dist_mat, Z, counts)
+        for i in counts:
+            if self.store_score[i] > best_score:
+                self.best_community = self.store_communities[i]
+                best_score = self.store_score[i]
         
         self.store_score = dict(sorted(self.store_score.items(), key=lambda item: item[1])[::-1])
         return True
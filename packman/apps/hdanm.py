@@ -25,8 +25,7 @@ def hdanm_cli(args,mol):
         numpy.savetxt("eigenvalues.csv", Model.get_eigenvalues(), delimiter=",")
         numpy.savetxt("eigenvectors.csv", Model.get_eigenvectors(), delimiter=",")
 
-        for i in range(6,6+args.modes,1):
-            Model.calculate_movie(i,scale=args.scale,n=args.frames,ca_to_aa=args.ca_to_aa)
+        Model.calculate_movie(list(range(6,6+args.modes,1)),scale=args.scale,n=args.frames,ca_to_aa=args.ca_to_aa)
 
     if args.make_tar:
 
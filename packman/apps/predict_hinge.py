@@ -22,25 +22,27 @@ Authors:
     * Pranav Khade(https://github.com/Pranavkhade)
 """
 
+import io
 import numpy
-import functools
+import hashlib
 import logging
 
-from networkx import eccentricity
-
 from scipy.stats import mode
-from scipy.optimize import minimize
+from multiprocessing import Pool
+from networkx import NetworkXError
 
-from sklearn.cluster import KMeans
-from mlxtend.evaluate import permutation_test
 from itertools import groupby, count
+from collections import OrderedDict
 
-from ..molecule import Hinge
-from ..utilities import WriteOBJ
-from ..geometry import AlphaShape
+from ..molecule import Hinge, Chain, Residue, Atom
+from ..utilities import WriteOBJ, permutation_test, kmeans_1d
+from ..geometry import AlphaShape, AlphaFiltration, Eccentricity, LeastSquarePlanes
 
+#p-values of the hinges keyed by (hinge residues, hash of the B-factors, early stopping); the least recently used p-value is dropped when the cache is full
+PermutationTestCache = OrderedDict()
+PERMUTATION_TEST_CACHE_SIZE = 1024
 
-def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',filename='Output.pdb',MinimumHingeLength=5,nclusters=4):
+def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',filename='Output.pdb',MinimumHingeLength=5,nclusters=4,filtration=None,eccentricity=None,early_stop=False,clustering='exact'):
     """This function is used to carry out hinge prediction given the parameters.
 
     Notes:
@@ -68,13 +70,17 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
         filename (str, optional)          : Please refer to the paper for this parameter. Defaults to 'Output.pdb'.
         MinimumHingeLength (int, optional): Please refer to the paper for this parameter. Defaults to 5.
         nclusters (int, optional)         : Please refer to the paper for this parameter. Defaults to 4.
+        filtration (packman.geometry.AlphaFiltration, optional): Precalculated alpha filtration of the same atoms; avoids recalculating the tessellations when many alpha values are used. Defaults to None.
+        eccentricity (dict, optional)     : Precalculated eccentricity of the alpha shape graph nodes (atom index as a key); eg... from packman.geometry.Eccentricity. Defaults to None.
+        early_stop (bool, optional)       : Stop the permutation test as soon as the p-value is decided with respect to 0.05 (See packman.utilities.permutation_test). Defaults to False.
+        clustering (str, optional)        : Eccentricity clustering backend; 'exact' (packman.utilities.kmeans_1d) or 'sklearn' (sklearn.cluster.KMeans; requires scikit-learn). Defaults to 'exact'.
     
     Returns:
         alpha_shape              : The Alpha Shape (Subset of Delaunay Tesselations) 
     """
     if(method=='alpha_shape'):
 
-        def get_statistics(atoms,SelectedHingeResidues,filename='Output'):
+        def get_statistics(atoms,SelectedHingeResidues,HingeAtomIndices,filename='Output'):
             """This sub-method is used to get the statistical data on the hinges and print it into a file.
             
             Notes:
@@ -84,34 +90,46 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
             Args:
                 atoms ([packman.molecule.Atom])                   : Set of atoms. (Read parent method description)
                 SelectedHingeResidues ([packman.molecule.Residue]): Predicted hinge residues. 
+                HingeAtomIndices (numpy.ndarray)                  : Indices (in atoms) of the backbone atoms of the predicted hinge residues.
                 filename (str, optional)                          : Output file name. Defaults to 'Output'.
             
             Returns:
                 [p-value, stats] (float): p-value of the predicted hinge, statistics of the hinge (in that order)
             """
-            hinge_atoms=[i.get_backbone() for i in SelectedHingeResidues]
-            hinge_atoms=[item for sublist in hinge_atoms for item in sublist]
-            non_hinge_atoms=list(set([i for i in atoms])-set(hinge_atoms))
-            all_atoms_bfactor=[i.get_bfactor() for i in atoms]
-            hinge_atoms_bfactor=[i.get_bfactor() for i in hinge_atoms]
-            non_hinge_atoms_bfactor=[i.get_bfactor() for i in non_hinge_atoms]
+            all_atoms_bfactor=numpy.array([i.get_bfactor() for i in atoms],dtype=float)
+            hinge_mask=numpy.zeros(len(atoms),dtype=bool)
+            hinge_mask[HingeAtomIndices]=True
+            hinge_atoms_bfactor=all_atoms_bfactor[HingeAtomIndices]
+            non_hinge_atoms_bfactor=all_atoms_bfactor[~hinge_mask]
+
+            #scipy.stats.mode returns scalars in the newer scipy versions
+            def get_mode(values):
+                return numpy.atleast_1d(mode(values)[0])[0]
 
             return_stats=[]
 
             outputfile.write('\nSTATISTICS\n\t\tN\tMin\tMax\tMean\tMode\tMedian\tSTDDev\n')
             return_stats.append(['','N','Min','Max','Mean','Mode','Median','STDDev'])
-            outputfile.write('Total   '+'\t'+str(len(all_atoms_bfactor))+'\t'+str(numpy.min(all_atoms_bfactor))+'\t'+str(numpy.max(all_atoms_bfactor))+'\t'+str(numpy.mean(all_atoms_bfactor))+'\t'+str(mode(all_atoms_bfactor)[0][0])+'\t'+str(numpy.median(all_atoms_bfactor))+'\t'+str(numpy.std(all_atoms_bfactor))+'\n')
-            return_stats.append(['Total',len(all_atoms_bfactor),numpy.min(all_atoms_bfactor),numpy.max(all_atoms_bfactor),numpy.mean(all_atoms_bfactor),mode(all_atoms_bfactor)[0][0],numpy.median(all_atoms_bfactor),numpy.std(all_atoms_bfactor)])
-            outputfile.write('Hinge   '+'\t'+str(len(hinge_atoms_bfactor))+'\t'+str(numpy.min(hinge_atoms_bfactor))+'\t'+str(numpy.max(hinge_atoms_bfactor))+'\t'+str(numpy.mean(hinge_atoms_bfactor))+'\t'+str(mode(hinge_atoms_bfactor)[0][0])+'\t'+str(numpy.median(hinge_atoms_bfactor))+'\t'+str(numpy.std(hinge_atoms_bfactor))+'\n')
-            return_stats.append(['Hinge',len(hinge_atoms_bfactor),numpy.min(hinge_atoms_bfactor),numpy.max(hinge_atoms_bfactor),numpy.mean(hinge_atoms_bfactor),mode(hinge_atoms_bfactor)[0][0],numpy.median(hinge_atoms_bfactor),numpy.std(hinge_atoms_bfactor)])
-            outputfile.write('NonHinge'+'\t'+str(len(non_hinge_atoms_bfactor))+'\t'+str(numpy.min(non_hinge_atoms_bfactor))+'\t'+str(numpy.max(non_hinge_atoms_bfactor))+'\t'+str(numpy.mean(non_hinge_atoms_bfactor))+'\t'+str(mode(non_hinge_atoms_bfactor)[0][0])+'\t'+str(numpy.median(non_hinge_atoms_bfactor))+'\t'+str(numpy.std(non_hinge_atoms_bfactor))+'\n')
-            return_stats.append(['NonHinge',len(non_hinge_atoms_bfactor),numpy.min(non_hinge_atoms_bfactor),numpy.max(non_hinge_atoms_bfactor),numpy.mean(non_hinge_atoms_bfactor),mode(non_hinge_atoms_bfactor)[0][0],numpy.median(non_hinge_atoms_bfactor),numpy.std(non_hinge_atoms_bfactor)])
+            outputfile.write('Total   '+'\t'+str(len(all_atoms_bfactor))+'\t'+str(numpy.min(all_atoms_bfactor))+'\t'+str(numpy.max(all_atoms_bfactor))+'\t'+str(numpy.mean(all_atoms_bfactor))+'\t'+str(get_mode(all_atoms_bfactor))+'\t'+str(numpy.median(all_atoms_bfactor))+'\t'+str(numpy.std(all_atoms_bfactor))+'\n')
+            return_stats.append(['Total',len(all_atoms_bfactor),numpy.min(all_atoms_bfactor),numpy.max(all_atoms_bfactor),numpy.mean(all_atoms_bfactor),get_mode(all_atoms_bfactor),numpy.median(all_atoms_bfactor),numpy.std(all_atoms_bfactor)])
+            outputfile.write('Hinge   '+'\t'+str(len(hinge_atoms_bfactor))+'\t'+str(numpy.min(hinge_atoms_bfactor))+'\t'+str(numpy.max(hinge_atoms_bfactor))+'\t'+str(numpy.mean(hinge_atoms_bfactor))+'\t'+str(get_mode(hinge_atoms_bfactor))+'\t'+str(numpy.median(hinge_atoms_bfactor))+'\t'+str(numpy.std(hinge_atoms_bfactor))+'\n')
+            return_stats.append(['Hinge',len(hinge_atoms_bfactor),numpy.min(hinge_atoms_bfactor),numpy.max(hinge_atoms_bfactor),numpy.mean(hinge_atoms_bfactor),get_mode(hinge_atoms_bfactor),numpy.median(hinge_atoms_bfactor),numpy.std(hinge_atoms_bfactor)])
+            outputfile.write('NonHinge'+'\t'+str(len(non_hinge_atoms_bfactor))+'\t'+str(numpy.min(non_hinge_atoms_bfactor))+'\t'+str(numpy.max(non_hinge_atoms_bfactor))+'\t'+str(numpy.mean(non_hinge_atoms_bfactor))+'\t'+str(get_mode(non_hinge_atoms_bfactor))+'\t'+str(numpy.median(non_hinge_atoms_bfactor))+'\t'+str(numpy.std(non_hinge_atoms_bfactor))+'\n')
+            return_stats.append(['NonHinge',len(non_hinge_atoms_bfactor),numpy.min(non_hinge_atoms_bfactor),numpy.max(non_hinge_atoms_bfactor),numpy.mean(non_hinge_atoms_bfactor),get_mode(non_hinge_atoms_bfactor),numpy.median(non_hinge_atoms_bfactor),numpy.std(non_hinge_atoms_bfactor)])
             
-            p_value = permutation_test(hinge_atoms_bfactor, non_hinge_atoms_bfactor,method='approximate',num_rounds=10000,seed=0)
+            #Same hinge with the same B-factors (eg... alpha value scan) is tested only once
+            cache_key=(frozenset((i.get_parent().get_id(),i.get_id()) for i in SelectedHingeResidues), hashlib.sha1(all_atoms_bfactor.tobytes()).hexdigest(), early_stop)
+            if(cache_key in PermutationTestCache):
+                PermutationTestCache.move_to_end(cache_key)
+            else:
+                PermutationTestCache[cache_key] = permutation_test(hinge_atoms_bfactor, non_hinge_atoms_bfactor, num_rounds=10000, seed=0, early_stop=early_stop)
+                while(len(PermutationTestCache) > PERMUTATION_TEST_CACHE_SIZE):
+                    PermutationTestCache.popitem(last=False)
+            p_value = PermutationTestCache[cache_key]
             outputfile.write('\np-value:\t'+str(p_value)+'\n')
             return p_value,return_stats
         
-        def get_leastsquareplane(atoms,HingeResidues,HingePlane):
+        def get_leastsquareplane(hinge_points,HingePlane,PlaneParams):
             """This sub-function gives the Least Square Plane equation of the given atoms.
 
             This plane is currently gives us an idea about the possible direction of the movement of the hinge residues (See figures in the publication)
@@ -121,24 +139,19 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
 
             Notes:
                 * Function level: 1 (1 being top)
-                * Possibly will be moved to geometry module later.
+                * The plane itself is fitted for all the hinges at once with packman.geometry.LeastSquarePlanes
                 * Check the output file for this equation. The instructions to visualize this plane are given at the end of the file.
 
             Args:
-                atoms ([packman.molecule.Atom])           : Set of atoms. (Read parent method description)
-                HingeResidues ([packman.molecule.Residue]): Predicted hinge residues. 
-                HingePlane (int)                          : Index of the HingePlane
+                hinge_points (numpy.ndarray) : Coordinates of the backbone atoms of the predicted hinge residues.
+                HingePlane (int)             : Index of the HingePlane
+                PlaneParams ([float])        : Least Square Plane (a,b,c) in z = a*x + b*y + c form. (See packman.geometry.LeastSquarePlanes)
             
             Returns:
                 [a,b,c,d]: Four coefficients essential to define the plane in 3D space.
             """
-            hinge_points=[item.get_location() for sublist in [i.get_backbone() for i in HingeResidues] for item in sublist]
-            HingeAtoms=[item for sublist in [i.get_backbone() for i in HingeResidues] for item in sublist]
-            NonHingeAtoms=[i.get_location() for i in atoms if i not in HingeAtoms]
-            
             #Zipping the values
-            hinge_xs,hinge_ys,hinge_zs = zip(*hinge_points)
-            XS,YS,ZS=zip(*NonHingeAtoms)
+            hinge_xs,hinge_ys,hinge_zs = hinge_points.T
 
             def project_points(x, y, z, a, b, c):
                 """Project the points on a given plane
@@ -173,7 +186,7 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
                 proj_onto_plane = (points_from_point_in_plane - proj_onto_normal_vector[:, None]*normal_vector)
                 return point_in_plane + proj_onto_plane
             
-            def FitPlane(points):
+            def FitPlane(points,params):
                 """Plane fitting algorithm given the points.
 
                 Notes:
@@ -181,69 +194,16 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
                 
                 Args:
                     points ([float]): Two dimentional array of 3D points
+                    params ([float]): Least Square Plane (a,b,c) in z = a*x + b*y + c form.
                 
                 Returns:
                     [a,b,c,d] (float) : Numbers essential to define the Least Square Plane equation
                 """
-                xs,ys,zs = zip(*points)
-                def plane(x, y, params):
-                    """Plane Object
-                    
-                    Args:
-                        x ([type]): [description]
-                        y ([type]): [description]
-                        params ([type]): [description]
-                    
-                    Returns:
-                        [float]: Equation of the plane
-                    """
-                    a = params[0]
-                    b = params[1]
-                    c = params[2]
-                    z = a*x + b*y + c
-                    return z
-
-                def error(params, points):
-                    """Get the error
-                    
-                    Args:
-                        params ([type]): [description]
-                        points ([type]): [description]
-                    
-                    Returns:
-                        [type]: [description]
-                    """
-                    result = 0
-                    for (x,y,z) in points:
-                        plane_z = plane(x, y, params)
-                        diff = abs(plane_z - z)
-                        result += diff**2
-                    return result
-
-                def cross(a, b):
-                    """Get cross
-                    
-                    Args:
-                        a ([type]): [description]
-                        b ([type]): [description]
-                    
-                    Returns:
-                        [type]: [description]
-                    """
-                    return [a[1]*b[2] - a[2]*b[1],
-                            a[2]*b[0] - a[0]*b[2],
-                            a[0]*b[1] - a[1]*b[0]]
-
-                fun = functools.partial(error, points=points)
-                params0 = [0, 0, 0]
-                res = minimize(fun, params0)
-
-                a = res.x[0]
-                b = res.x[1]
-                c = res.x[2]
+                xs,ys,zs = points.T
+                a, b, c = params
 
                 point  = numpy.array([0.0, 0.0, c])
-                normal = numpy.array(cross([1,0,a], [0,1,b]))
+                normal = numpy.cross([1,0,a], [0,1,b])
                 d = -point.dot(normal)
 
                 xx, yy = numpy.meshgrid([min(xs),max(xs)], [min(ys),max(ys)])
@@ -270,24 +230,42 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
 
                 #Plane in PyMol
                 outputfile.write('import plane\n')
-                outputfile.write('plane.make_plane_points(name=\'HingePlane'+ str(HingePlane) +'\', l1='+str(list(p4))+', l2='+str(list(p2))+', l3='+str(list(p3))+', center=False, makepseudo=False)'+'\n')
+                outputfile.write('plane.make_plane_points(name=\'HingePlane'+ str(HingePlane) +'\', l1='+str(p4.tolist())+', l2='+str(p2.tolist())+', l3='+str(p3.tolist())+', center=False, makepseudo=False)'+'\n')
                 outputfile.write('set cgo_transparency, 0.35, HingePlane'+str(HingePlane)+'\n')
                 return a,b,c,d
             
-            a,b,c,d=FitPlane(hinge_points)
+            a,b,c,d=FitPlane(hinge_points,PlaneParams)
             projected=project_points(hinge_xs,hinge_ys,hinge_zs,a,b,c)
             return projected
         
+        coords = numpy.array([i.get_location() for i in atoms])
+
         #Alpha shape bit
-        alpha_shape, ProteinGraph = AlphaShape( atoms, Alpha, get_graph = True )
+        if(filtration is None and eccentricity is None):
+            alpha_shape, ProteinGraph = AlphaShape( atoms, Alpha, get_graph = True )
+        elif(filtration is None):
+            alpha_shape = AlphaShape( atoms, Alpha )
+        elif(eccentricity is None):
+            alpha_shape, ProteinGraph = filtration.get_alpha_shape(Alpha), filtration.get_graph(Alpha)
+        else:
+            alpha_shape = filtration.get_alpha_shape(Alpha)
 
-        centrality = eccentricity(ProteinGraph)
-        centrality_sorted_with_keys = numpy.array([float(centrality[j]) for j in sorted([i for i in centrality.keys()])]).reshape(-1, 1)
+        centrality = Eccentricity(ProteinGraph) if eccentricity is None else eccentricity
+        nodes = numpy.array(sorted(centrality.keys()),dtype=int)
+        centrality_sorted_with_keys = numpy.array([float(centrality[j]) for j in nodes])
         
         #Cluster (4 is like a resolution here)
-        km=KMeans(n_clusters=nclusters)
-        km.fit(centrality_sorted_with_keys)
-        central_nodes=numpy.argwhere(km.labels_==numpy.argmin(km.cluster_centers_)).T[0]
+        if(clustering=='exact'):
+            labels, centres = kmeans_1d(centrality_sorted_with_keys, nclusters)
+        elif(clustering=='sklearn'):
+            from sklearn.cluster import KMeans
+            km=KMeans(n_clusters=nclusters)
+            km.fit(centrality_sorted_with_keys.reshape(-1, 1))
+            labels, centres = km.labels_, km.cluster_centers_[:,0]
+        else:
+            raise ValueError("clustering should be either 'exact' or 'sklearn'")
+        #Graph nodes are the atom indices
+        central_nodes=nodes[labels==numpy.argmin(centres)]
         HingeResidues=list(set([atoms[i].get_parent() for i in central_nodes]))
         HingeResiduesID=[i.get_id() for i in HingeResidues]
         SortedHingeResidues=[x for _,x in sorted(zip(HingeResiduesID,HingeResidues))]
@@ -299,6 +277,11 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
             if(len(Local_Hinge)>MinimumHingeLength):
                 PredictedHinges.append(SortedHingeResidues[HingeResiduesID.index(Local_Hinge[0]):HingeResiduesID.index(Local_Hinge[-1])+1])
 
+        #Least Square Planes of all the hinges at once
+        AtomIndex={j:numj for numj,j in enumerate(atoms)}
+        HingeAtomIndices=[numpy.array([AtomIndex[k] for j in i for k in j.get_backbone() if k in AtomIndex],dtype=int) for i in PredictedHinges]
+        HingePlanes=LeastSquarePlanes([coords[j] for j in HingeAtomIndices])
+
         #Print part
         Hinges=[]
         Chains=','.join(list(set([i.get_parent().get_id() for i in SortedHingeResidues])))
@@ -309,9 +292,9 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
             for _ in i:_.set_domain_id('FL'+str(numi))
             #Molecule.Hinge(numi,elements,stats,p)
             outputfile.write('\nHinge #'+str(numi+1)+'\nResidues: '+i[0].get_name()+'-'+str(i[0].get_id()) +' to '+i[-1].get_name()+'-'+str(i[-1].get_id())+'\n')
-            p_value,hstats=get_statistics(atoms,i,filename=filename)
+            p_value,hstats=get_statistics(atoms,i,HingeAtomIndices[numi],filename=filename)
             outputfile.write('\nPymol Terminal Commands for Visualizing:\ncolor blue, resi '+str(i[0].get_id())+':'+str(i[-1].get_id())+'\n')
-            get_leastsquareplane(atoms,i,numi+1)
+            get_leastsquareplane(coords[HingeAtomIndices[numi]],numi+1,HingePlanes[numi])
             outputfile.write("#--------------------------------------------------#\n")
             #HingeObject
             Hinges.append( Hinge(numi,Alpha,i,hstats,p_value))
@@ -331,6 +314,117 @@ def predict_hinge(atoms, outputfile, Alpha=float('Inf'),method='alpha_shape',fil
         AllChainResidues[0].get_parent().set_hinges(Hinges)
         return alpha_shape
 
+def _predict_chain_hinges(backbones, Alpha, filename, nclusters, MinimumHingeLength):
+    """Hinge prediction of a chain and its identical chains (hinge_cli); the alpha shape is tessellated once and its graph eccentricity is shared by all the chains.
+
+    Args:
+        backbones ([[packman.molecule.Atom]]): Backbone atoms of the chain followed by its identical chains. (See find_identical_chains)
+        Alpha (float)                        : See predict_hinge.
+        filename (str)                       : See predict_hinge.
+        nclusters (int)                      : See predict_hinge.
+        MinimumHingeLength (int)             : See predict_hinge.
+
+    Returns:
+        [(str, str)]: Report and error message (None if successful) of each chain.
+    """
+    filtration = AlphaFiltration(backbones[0])
+    edges = filtration.get_edges(Alpha)
+    try:
+        if(len(edges) == 0):
+            raise NetworkXError('Graph is empty.')
+        eccentricity = Eccentricity(edges)
+    except NetworkXError:
+        return [(None, 'alpha shape graph is empty or disconnected at the alpha value '+str(Alpha)+'; no hinges are predicted.')]*len(backbones)
+
+    results = []
+    for i in backbones:
+        report = io.StringIO()
+        try:
+            #Filtration of the first chain is used by the identical chains only for the returned alpha shape (not for the report)
+            predict_hinge(i, report, Alpha=Alpha, filename=filename, nclusters=nclusters, MinimumHingeLength=MinimumHingeLength, filtration=filtration, eccentricity=eccentricity)
+            results.append((report.getvalue(), None))
+        except Exception as error:
+            results.append((None, 'hinge prediction failed ('+repr(error)+').'))
+    return results
+
+def _get_chain_data(chain):
+    """Picklable copy (IDs, names and atom records of the residues) of the chain for the process pool of the hinge_cli."""
+    return ( chain.get_id(), [ (i.get_id(), i.get_name(), i.get_domain_id(), [ (j.get_id(), j.get_name(), j.get_location(), j.get_occupancy(), j.get_bfactor(), j.get_element(), j.get_charge()) for j in i.get_atoms() ]) for i in chain.get_residues() ] )
+
+def _chain_hinges(arguments):
+    """Complete hinge prediction (alpha shape, eccentricity, clustering and statistics) of a chain and its identical chains (Process pool worker of the hinge_cli)
+
+    The chains are rebuilt from their copies (See _get_chain_data); the predicted hinges and domain IDs are returned to be set on the original chains.
+
+    Args:
+        arguments (([tuple], tuple)): Copies of the chains and the parameters of _predict_chain_hinges (Alpha, filename, nclusters, MinimumHingeLength)
+
+    Returns:
+        [(str, str, [tuple], [tuple])]: Report, error message, hinges (ID, alpha value, residue IDs, stats, p-value) and domain IDs (residue ID, domain ID) of each chain.
+    """
+    chain_data, parameters = arguments
+    chains = []
+    for ChainID, residues in chain_data:
+        chain = Chain(ChainID)
+        for ResidueID, ResidueName, DomainID, atoms in residues:
+            residue = Residue(ResidueID, ResidueName, chain)
+            residue.set_domain_id(DomainID)
+            for AtomID, AtomName, Coordinates, Occupancy, bfactor, Element, Charge in atoms:
+                residue[AtomID] = Atom(AtomID, AtomName, Coordinates, Occupancy, bfactor, Element, Charge, residue)
+            chain.__setitem__(ResidueID, residue, Type='Residue')
+        chains.append(chain)
+
+    backbones = [ [k for j in i.get_backbone() for k in j] for i in chains ]
+    results = []
+    for chain, (report, error) in zip(chains, _predict_chain_hinges(backbones, *parameters)):
+        hinges = [ (i.get_id(), i.get_alpha_value(), [j.get_id() for j in i.get_elements()], i.get_stats(), i.get_pvalue()) for i in chain.get_hinges() ]
+        domains = [ (i.get_id(), i.get_domain_id()) for i in chain.get_residues() ]
+        results.append( (report, error, hinges, domains) )
+    return results
+
+def _set_chain_hinges(chain, hinges, domains):
+    """Set the hinges and domain IDs predicted by the process pool worker (See _chain_hinges) on the original chain."""
+    residues = {i.get_id(): i for i in chain.get_residues()}
+    for ResidueID, DomainID in domains:
+        residues[ResidueID].set_domain_id(DomainID)
+    chain.set_hinges( [ Hinge(hid, alpha_value, [residues[j] for j in elements], stats, p) for hid, alpha_value, elements, stats, p in hinges ] )
+    return True
+
+def find_identical_chains(backbones, rmsd_cutoff=0.1):
+    """Find the identical chains (eg... in the homo-oligomers) for the hinge prediction.
+
+    Two chains are identical if their backbone atoms are the same (residue IDs, residue names and atom names in the same order) and the RMSD of the backbone atoms after the superposition is below the cutoff.
+
+    Notes:
+        * The default cutoff (0.1 Angstrom) only finds the near-exact copies (eg... chains generated by the symmetry operators). Crystallographic NCS copies usually differ by 0.2-0.5 Angstrom; a larger cutoff reuses the alpha shape of the first copy for them, so their hinges are predicted from slightly different coordinates.
+
+    Args:
+        backbones ([[packman.molecule.Atom]]): Backbone atoms of the chains.
+        rmsd_cutoff (float, optional)        : RMSD (Angstrom) cutoff after the superposition. Defaults to 0.1.
+
+    Returns:
+        [int]: Index of the first chain identical to each chain (Index of the chain itself if there is none)
+    """
+    references, seen = [], {}
+    for numi,i in enumerate(backbones):
+        sequence = tuple( (j.get_parent().get_id(), j.get_parent().get_name(), j.get_name()) for j in i )
+        coords = numpy.array([j.get_location() for j in i],dtype=float)
+        coords = coords-coords.mean(0)
+        reference = numi
+        for numj,j in seen.get(sequence, []):
+            #Kabsch superposition
+            U, S, Vt = numpy.linalg.svd( numpy.dot(coords.T, j) )
+            if(numpy.linalg.det(U)*numpy.linalg.det(Vt) < 0):
+                S[-1] = -S[-1]
+            rmsd = numpy.sqrt( max( (numpy.sum(coords*coords) + numpy.sum(j*j) - 2*numpy.sum(S))/len(coords), 0.0 ) )
+            if(rmsd < rmsd_cutoff):
+                reference = numj
+                break
+        if(reference == numi):
+            seen.setdefault(sequence, []).append((numi, coords))
+        references.append(reference)
+    return references
+
 def hinge_cli(args,mol):
     """Command-line Interface for the 'hinge' command. Please check the packman.bin.PACKMAN file for more details.
 
@@ -358,12 +452,43 @@ def hinge_cli(args,mol):
             if(args.generateobj is not None):
                 WriteOBJ(Backbone, alpha_shape, args.generateobj)
         else:
+            Chains, Backbones = [], []
             for i in mol[0].get_chains():
-                try:
-                    Backbone = [item for sublist in mol[0][i.get_id()].get_backbone() for item in sublist]
-                    alpha_shape = predict_hinge(Backbone, args.outputfile, Alpha=float(args.alpha), filename=args.filename,nclusters=args.e_clusters,MinimumHingeLength=args.minhnglen)
-                except:
+                Backbone = [item for sublist in i.get_backbone() for item in sublist]
+                if(len(Backbone) < 4 or None in Backbone):
                     logging.warning('Chain '+str(i.get_id())+' has none/missing backbone atoms to calculate the hinge.')
+                    continue
+                Chains.append(i)
+                Backbones.append(Backbone)
+
+            #Whole hinge prediction of the chains in parallel; identical chains share one alpha shape if requested
+            References = find_identical_chains(Backbones, rmsd_cutoff=args.identical_rmsd) if args.reuse_identical else list(range(len(Backbones)))
+            Groups = OrderedDict()
+            for numi,i in enumerate(References):
+                Groups.setdefault(i, []).append(numi)
+            Parameters = (float(args.alpha), args.filename, args.e_clusters, args.minhnglen)
+
+            Reports = {}
+            if(args.workers > 1):
+                Tasks = [ ([_get_chain_data(Chains[j]) for j in i], Parameters) for i in Groups.values() ]
+                with Pool(args.workers) as pool:
+                    Results = pool.map(_chain_hinges, Tasks)
+                for group, results in zip(Groups.values(), Results):
+                    for j, (report, error, hinges, domains) in zip(group, results):
+                        if(error is None):
+                            _set_chain_hinges(Chains[j], hinges, domains)
+                        Reports[j] = (report, error)
+            else:
+                for group in Groups.values():
+                    Reports.update( zip(group, _predict_chain_hinges([Backbones[j] for j in group], *Parameters)) )
+
+            #Reports in the chain order
+            for numi,i in enumerate(Chains):
+                report, error = Reports[numi]
+                if(error is None):
+                    args.outputfile.write(report)
+                else:
+                    logging.warning('Chain '+str(i.get_id())+': '+error)
     finally:
         print_footnotes(args.outputfile)
         args.outputfile.flush()
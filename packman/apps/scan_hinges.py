@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""The 'scan_hinges' object host file.
+
+This is file information, not the class information. This information is only for the API developers.
+Please read the 'scan_hinges' object documentation for details.
+
+Example::
+
+    from packman.apps import scan_hinges
+    help( scan_hinges )
+
+Authors:
+    * Pranav Khade(https://github.com/Pranavkhade)
+"""
+
+import io
+import os
+import numpy
+import logging
+
+from multiprocessing import Pool
+from networkx import NetworkXError
+
+from .predict_hinge import predict_hinge
+from ..geometry import AlphaFiltration, Eccentricity
+
+
+def _scan_eccentricity(edges):
+    """Eccentricity of the alpha shape graph given as an edge array (Process pool worker of the scan_hinges)
+
+    Args:
+        edges (numpy.ndarray): E x 2 array of the atom indices.
+
+    Returns:
+        dict: Eccentricity with atom index as a key; None if the graph is empty or disconnected.
+    """
+    try:
+        return Eccentricity(edges) if len(edges) > 0 else None
+    except NetworkXError:
+        return None
+
+
+def merge_hinges(hinges, significance=0.05):
+    """Merge the overlapping significant hinges (eg... predicted with different alpha values) into the conclusive hinges.
+
+    The hinges are treated as the intervals of the residue IDs. The intervals are sorted by their start and merged in a single sweep (interval union); merged hinge is kept only if at least two significant hinges overlap in it.
+
+    Args:
+        hinges ([packman.molecule.Hinge]): Predicted hinges.
+        significance (float, optional)   : p-value cutoff for the hinge to be considered. Defaults to 0.05.
+
+    Returns:
+        [[int, int]]: Sorted [first, last] residue IDs of the merged hinges.
+    """
+    intervals = sorted( [ [min(j.get_id() for j in i.get_elements()), max(j.get_id() for j in i.get_elements())] for i in hinges if i.get_pvalue() <= significance ] )
+
+    merged, members = [], []
+    for start, end in intervals:
+        if(len(merged) > 0 and start <= merged[-1][1]):
+            merged[-1][1] = max(merged[-1][1], end)
+            members[-1] += 1
+        else:
+            merged.append([start, end])
+            members.append(1)
+    return [i for numi, i in enumerate(merged) if members[numi] > 1]
+
+
+def scan_hinges(atoms, alphas, workers=1, MinimumHingeLength=5, nclusters=4, significance=0.05, outputfile=None):
+    """Predict the hinges over many alpha values and merge the overlapping significant ones into the conclusive hinges.
+
+    Notes:
+        * One alpha filtration (single Delaunay tessellation) of the atoms is shared by all the alpha values.
+        * The eccentricity of the alpha shape graph of each alpha value is calculated in a process pool of the given size.
+        * Alpha values giving empty or disconnected alpha shape graph are skipped.
+        * All the predicted hinges are added to the chain as packman.molecule.Hinge objects (same as packman.apps.predict_hinge).
+        * Please refer to the following paper for the details on the algorithm and citation:
+            Pranav M. Khade, Ambuj Kumar, Robert L. Jernigan, Characterizing and Predicting Protein Hinges for Mechanistic Insight,
+            Journal of Molecular Biology, Volume 432, Issue 2, 2020, Pages 508-522, ISSN 0022-2836, https://doi.org/10.1016/j.jmb.2019.11.018.
+
+    Args:
+        atoms ([packman.molecule.Atom])    : Backbone atoms of a single chain. (See packman.apps.predict_hinge)
+        alphas ([float])                   : Alpha values to be scanned.
+        workers (int, optional)            : Number of processes for the eccentricity calculation. Defaults to 1.
+        MinimumHingeLength (int, optional) : See packman.apps.predict_hinge. Defaults to 5.
+        nclusters (int, optional)          : See packman.apps.predict_hinge. Defaults to 4.
+        significance (float, optional)     : p-value cutoff for the hinge to be considered. Defaults to 0.05.
+        outputfile (file, optional)        : Output file for the predict_hinge reports of all the alpha values. Defaults to None (Reports are discarded).
+
+    Returns:
+        [[int, int]]: Sorted [first, last] residue IDs of the merged hinges. (See merge_hinges)
+    """
+    if(outputfile is None):
+        outputfile = io.StringIO()
+
+    filtration = AlphaFiltration(atoms)
+    edges = [filtration.get_edges(i) for i in alphas]
+
+    if(workers > 1):
+        with Pool(workers) as pool:
+            eccentricities = pool.map(_scan_eccentricity, edges)
+    else:
+        eccentricities = [_scan_eccentricity(i) for i in edges]
+
+    hinges = []
+    chain = atoms[0].get_parent().get_parent()
+    for alpha, eccentricity in zip(alphas, eccentricities):
+        if(eccentricity is None):
+            logging.debug('Alpha value '+str(alpha)+' skipped; empty or disconnected alpha shape.')
+            continue
+        before = len(chain.get_hinges())
+        try:
+            predict_hinge(atoms, outputfile, Alpha=alpha, MinimumHingeLength=MinimumHingeLength, nclusters=nclusters, filtration=filtration, eccentricity=eccentricity, early_stop=True)
+        except Exception:
+            logging.debug('Alpha value '+str(alpha)+' skipped; hinge prediction failed.')
+            continue
+        hinges.extend( chain.get_hinges()[before:] )
+
+    return merge_hinges(hinges, significance=significance)
+
+
+def get_hng_lines(hinges, name):
+    """Domain and hinge records of the merged hinges in the .hng format. (See packman.utilities.load_hinge)
+
+    Args:
+        hinges ([[int, int]]): Sorted [first, last] residue IDs of the hinges. (See scan_hinges)
+        name (str)           : First column of the .hng file (Filename_ChainID)
+
+    Returns:
+        [str]: Lines of the .hng file.
+    """
+    lines = []
+    start, DomainNumber = 1, 1
+    for numi, (first, last) in enumerate(hinges):
+        #Hinge at the terminal does not leave a domain before it
+        if(start <= first-1):
+            lines.append(name+'\tD'+str(DomainNumber)+'\t'+str(start)+':'+str(first-1)+'\n')
+            DomainNumber += 1
+        lines.append(name+'\tH'+str(numi+1)+'\t'+str(first)+':'+str(last)+'\n')
+        start = last+1
+    if(len(hinges) > 0):
+        lines.append(name+'\tD'+str(DomainNumber)+'\t'+str(start)+':Inf\n')
+    return lines
+
+
+def hinge_scan_cli(args, mol):
+    """Command-line Interface for the 'hinge-scan' command. Please check the packman.bin.PACKMAN file for more details.
+
+    This function is for the CLI and not an integral function for the API.
+
+    Args:
+        args (parser.parse_args())     : The arguments that were passed by the user to the PACKMAN-hinge-scan app.
+        mol (packman.molecule.Protein) : The 'Protein' object for the anaylsis.
+    """
+    alphas = numpy.around( numpy.arange(float(args.begin), float(args.end), float(args.step_size)), decimals=1 ).tolist()
+    name = os.path.splitext(os.path.basename(args.filename))[0]
+
+    chains = [args.chain] if args.chain is not None else [i.get_id() for i in mol[0].get_chains()]
+    try:
+        for i in chains:
+            Backbone = [item for sublist in mol[0][i].get_backbone() for item in sublist if item is not None]
+            if(len(Backbone) == 0):
+                logging.warning('Chain '+str(i)+' has none/missing backbone atoms to calculate the hinge.')
+                continue
+            hinges = scan_hinges(Backbone, alphas, workers=args.workers, MinimumHingeLength=args.minhnglen, nclusters=args.e_clusters)
+            for j in get_hng_lines(hinges, name+'_'+str(i)):
+                args.outputfile.write(j)
+    finally:
+        args.outputfile.flush()
+        args.logfile.flush()
+
+    return True
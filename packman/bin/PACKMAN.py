@@ -14,7 +14,7 @@ import traceback
 import logging
 
 from .. import molecule
-from ..apps import hinge_cli, hdanm_cli, entropy_cli, dci_cli
+from ..apps import hinge_cli, hinge_scan_cli, hdanm_cli, entropy_cli, dci_cli
 
 import operator
 import argparse
@@ -36,7 +36,7 @@ def IO():
     Returns:
         Namespace: Various arguments in various formats
     """
-    parser=argparse.ArgumentParser(description='PACKMAN: PACKing and Motion ANalysis. (https://github.com/Pranavkhade/PACKMAN)\n\nFollowing Apps Available: \n1. hinge \n2. hdanm\n3. entropy\n4. dci\n\nHow to run an app: python -m packman <app name>\nExample: python -m packman hinge', formatter_class=argparse.RawTextHelpFormatter )
+    parser=argparse.ArgumentParser(description='PACKMAN: PACKing and Motion ANalysis. (https://github.com/Pranavkhade/PACKMAN)\n\nFollowing Apps Available: \n1. hinge \n2. hinge-scan\n3. hdanm\n4. entropy\n5. dci\n\nHow to run an app: python -m packman <app name>\nExample: python -m packman hinge', formatter_class=argparse.RawTextHelpFormatter )
     subparsers = parser.add_subparsers(dest='command')
 
     #Hinge Prediction
@@ -48,6 +48,21 @@ def IO():
     hinge_app_io.add_argument('--minhnglen',metavar='MinimumHingeLength',type=int,default=5,help='Recommended: 5, Please refer to the paper for more details')
     hinge_app_io.add_argument("--chain", help='Enter The Chain ID')
     hinge_app_io.add_argument('--generateobj', type=argparse.FileType('wb', 0), help='Path and filename to save the .obj file at. Ignored unless --chain is provided.')
+    hinge_app_io.add_argument('--workers', type=int, default=1, help='Number of processes for the chains. Ignored if --chain is provided.')
+    hinge_app_io.add_argument('--reuse_identical', action='store_true', help='Predict the hinges of the identical chains (same backbone atoms; RMSD < --identical_rmsd after superposition) from the alpha shape of the first one. Statistics are calculated for every chain.')
+    hinge_app_io.add_argument('--identical_rmsd', type=float, default=0.1, help='RMSD (Angstrom) cutoff of the identical chains for --reuse_identical. Default 0.1 reuses only the near-exact copies; NCS copies usually need 0.2-0.5.')
+
+    #Hinge Prediction (Alpha value scan)
+    hinge_scan_app_io = subparsers.add_parser('hinge-scan')
+    hinge_scan_app_io.add_argument('-pdbid','--pdbid', metavar='PDB_ID', type=str, help='If provided, the PBD with this ID will be downloaded and saved to FILENAME.')
+    hinge_scan_app_io.add_argument('filename', metavar='FILENAME', help='Path and filename of the PDB file.')
+    hinge_scan_app_io.add_argument('--begin', type=float, default=0.0, help='Starting Alpha Value (Recommended: 0.0)')
+    hinge_scan_app_io.add_argument('--end', type=float, default=10.0, help='Ending Alpha Value (Recommended: 10.0)')
+    hinge_scan_app_io.add_argument('--step_size', type=float, default=0.5, help='Progression amount from start alpha value to end alpha value')
+    hinge_scan_app_io.add_argument('--e_clusters',metavar='NumberOfEccentricityClusters',type=int,default=4,help='Recommended: 4, Please refer to the paper for more details')
+    hinge_scan_app_io.add_argument('--minhnglen',metavar='MinimumHingeLength',type=int,default=5,help='Recommended: 5, Please refer to the paper for more details')
+    hinge_scan_app_io.add_argument('--workers', type=int, default=1, help='Number of processes for the alpha value scan.')
+    hinge_scan_app_io.add_argument("--chain", help='Enter The Chain ID')
 
     #hdanm
     hd_anm_io = subparsers.add_parser('hdanm')
@@ -124,6 +139,8 @@ def load_cli():
     
     if(args.command == 'hinge'):
         hinge_cli(args,mol)
+    elif(args.command == 'hinge-scan'):
+        hinge_scan_cli(args,mol)
     elif(args.command == 'hdanm'):
         hdanm_cli(args,mol)
     elif(args.command == 'entropy'):
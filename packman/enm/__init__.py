@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Author: Pranav Khade, Iowa State University
+# Please read the project licence file for the Copyrights.
+
+"""The 'packman.enm' module is a collection of objects shared by the elastic network models (GNM, ANM, hd-ANM and DCI).
+
+Notes:
+    * Current objects list: - packman.enm.CrossCorrelation
+                            - packman.enm.ElasticNetwork (shared through packman.enm.get_network with share=True)
+                            - packman.enm.ModeCache
+                            - packman.enm.EnsembleENM
+
+Todo:
+    * Add new features
+    * Use ``sphinx.ext.todo`` extension
+    * Add Tutorial Link
+"""
+
+from .correlation import CrossCorrelation
+from .engine import ElasticNetwork, get_network, clear_networks
+from .cache import ModeCache
+from .ensemble import EnsembleENM
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""The 'ModeCache' object host file.
+
+This is file information, not the class information. This information is only for the API developers.
+Please read the 'ModeCache' object documentation for details.
+
+Example::
+
+    from packman.enm import ModeCache
+    help( ModeCache )
+
+Authors:
+    * Pranav Khade(https://github.com/Pranavkhade)
+"""
+
+import os
+import glob
+import hashlib
+import numpy
+
+
+class ModeCache():
+    """This class contains the disk cache of the eigenvalues and eigenvectors of the elastic network models.
+
+    Each decomposition is stored as two .npy files (eigenvalues and eigenvectors) named by the hash of the coordinates and the model parameters (model type, cutoff, gamma, power, pf, mass etc...). The files are read back memory-mapped, so only the used parts of the eigenvectors are loaded. When the total size exceeds the limit, the least recently used decompositions are removed.
+
+    Notes:
+        * Give the object (or the directory name) as 'cache' to calculate_decomposition() of GNM, ANM, hdANM and DCI for the read-through behavior.
+        * Loaded arrays are read-only memory maps.
+
+    Args:
+        directory (str)          : Directory of the cache files. (Created if missing)
+        max_size (int, optional) : Maximum total size of the cache in bytes. Defaults to 1 GiB.
+    """
+    def __init__(self, directory, max_size=2**30):
+        self.directory = directory
+        self.max_size  = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, coords, **parameters):
+        """Get the cache key of the coordinates and the model parameters.
+
+        Args:
+            coords (numpy.ndarray) : N x 3 coordinates.
+            parameters             : Model parameters (eg... model='ANM', cutoff=15.0, gamma=1.0). Values are compared by their repr().
+
+        Returns:
+            str: Cache key (sha1 hex digest).
+        """
+        coords = numpy.ascontiguousarray(coords, dtype=float)
+        digest = hashlib.sha1( coords.tobytes() )
+        digest.update( repr(coords.shape).encode() )
+        digest.update( repr(sorted(parameters.items())).encode() )
+        return digest.hexdigest()
+
+    def load(self, key):
+        """Get the cached eigenvalues and eigenvectors.
+
+        Args:
+            key (str): Cache key. (See ModeCache().get_key())
+
+        Returns:
+            (numpy.memmap, numpy.memmap): Eigenvalues and eigenvectors if cached; None otherwise.
+        """
+        files = self._get_files(key)
+        try:
+            modes = tuple( numpy.load(i, mmap_mode='r') for i in files )
+        except (OSError, ValueError):
+            return None
+        #Access time for the least recently used order
+        for i in files:
+            os.utime(i)
+        return modes
+
+    def save(self, key, eigen_values, eigen_vectors):
+        """Store the eigenvalues and eigenvectors and remove the least recently used decompositions if the cache is larger than the limit.
+
+        Args:
+            key (str)                     : Cache key. (See ModeCache().get_key())
+            eigen_values (numpy.ndarray)  : Eigenvalues.
+            eigen_vectors (numpy.ndarray) : Eigenvectors.
+
+        Returns:
+            True if successful; None otherwise.
+        """
+        for filename, array in zip(self._get_files(key), (eigen_values, eigen_vectors)):
+            #Written under a temporary name and renamed; partially written files are never read
+            temporary = filename+'.'+str(os.getpid())+'.tmp'
+            with open(temporary, 'wb') as fh:
+                numpy.save(fh, numpy.asarray(array))
+            os.replace(temporary, filename)
+        self.clean(keep=key)
+        return True
+
+    def clean(self, keep=None):
+        """Remove the least recently used decompositions till the total size is within the limit.
+
+        Args:
+            keep (str, optional): Cache key that is not removed (eg... the decomposition just stored). Defaults to None.
+
+        Returns:
+            True if successful; None otherwise.
+        """
+        entries = {}
+        for i in glob.glob( os.path.join(self.directory, '*.npy') ):
+            try:
+                stat = os.stat(i)
+            except OSError:
+                continue
+            key = os.path.basename(i).split('.')[0]
+            size, used = entries.get(key, (0, 0))
+            entries[key] = (size+stat.st_size, max(used, stat.st_mtime_ns))
+
+        total = sum(i[0] for i in entries.values())
+        for key in sorted(entries, key=lambda i: entries[i][1]):
+            if(total <= self.max_size):
+                break
+            if(key == keep):
+                continue
+            for i in self._get_files(key):
+                if(os.path.exists(i)):
+                    os.remove(i)
+            total -= entries[key][0]
+        return True
+
+    def _get_files(self, key):
+        """Eigenvalue and eigenvector filenames of the key."""
+        return [ os.path.join(self.directory, key+'.eigen_values.npy'), os.path.join(self.directory, key+'.eigen_vectors.npy') ]
+
+
+def get_mode_cache(cache):
+    """packman.enm.ModeCache of the directory name (or the given object itself; None if None)."""
+    if(cache is None or isinstance(cache, ModeCache)):
+        return cache
+    return ModeCache(cache)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""The 'CrossCorrelation' object host file.
+
+This is file information, not the class information. This information is only for the API developers.
+Please read the 'CrossCorrelation' object documentation for details.
+
+Example::
+
+    from packman.enm import CrossCorrelation
+    help( CrossCorrelation )
+
+Authors:
+    * Pranav Khade(https://github.com/Pranavkhade)
+"""
+
+import numpy
+
+
+class CrossCorrelation():
+    """This class contains the cross-correlation of the elastic network model as a lazy operator backed by its (truncated) eigenbasis.
+
+    The pseudoinverse of the Kirchhoff/Hessian matrix from the given modes is P = V diag(1/lambda) V^T. The cross-correlation C_ij = P_ij/sqrt(P_ii*P_jj) (trace of the 3x3 blocks for the 3D models) is stored as the N x (dim*K) row-normalized factor matrix G (C = G G^T), so the rows, blocks and strongest partners of any residue are calculated on demand without the N x N matrix.
+
+    Notes:
+        * Only the non-trivial modes should be provided (eg... eigen_vectors[:,1:] for GNM; eigen_vectors[:,6:] for ANM)
+        * Memory: N x dim*K values of the given dtype (float32 by default).
+
+    Args:
+        eigen_vectors (numpy.ndarray)  : dim*N x K eigenvectors (x,y,z of each atom are consecutive rows for dim=3).
+        eigen_values (numpy.ndarray)   : K eigenvalues (non-zero).
+        dim (int, optional)            : Degrees of freedom per atom; 1 for GNM/DCI, 3 for ANM/hd-ANM. Defaults to 1.
+        dtype (numpy.dtype, optional)  : Storage type of the factor matrix and the output. Defaults to numpy.float32.
+    """
+    def __init__(self, eigen_vectors, eigen_values, dim=1, dtype=numpy.float32):
+        eigen_vectors = numpy.asarray(eigen_vectors)
+        eigen_values  = numpy.asarray(eigen_values, dtype=float)
+        if(eigen_vectors.shape[0] % dim != 0):
+            raise ValueError("Number of the eigenvector rows should be a multiple of 'dim'")
+        if(numpy.any(eigen_values <= 0)):
+            raise ValueError("Eigenvalues should be positive; remove the trivial modes")
+
+        n = eigen_vectors.shape[0] // dim
+        factors = ( eigen_vectors.real / numpy.sqrt(eigen_values) ).reshape(n, dim*len(eigen_values))
+        #Diagonal (trace of the diagonal blocks) of the pseudoinverse
+        self.fluctuations = numpy.einsum('ij,ij->i', factors, factors)
+        self.factors = ( factors / numpy.sqrt(self.fluctuations)[:,None] ).astype(dtype)
+        self.dtype = numpy.dtype(dtype)
+        self.shape = (n, n)
+
+    '''Get Functions'''
+    def get_fluctuations(self):
+        """Get the diagonal of the pseudoinverse (trace of the 3x3 diagonal blocks for the 3D models) from the given modes.
+
+        Returns:
+            numpy.ndarray: Fluctuations of the atoms.
+        """
+        return self.fluctuations
+
+    def get_rows(self, rows):
+        """Get the rows of the cross-correlation matrix.
+
+        Args:
+            rows (int/[int]): Row index or indices.
+
+        Returns:
+            numpy.ndarray: N values for an index; len(rows) x N otherwise.
+        """
+        return numpy.dot(self.factors[rows], self.factors.T)
+
+    def get_block(self, rows, cols):
+        """Get the block of the cross-correlation matrix.
+
+        Args:
+            rows ([int]): Row indices.
+            cols ([int]): Column indices.
+
+        Returns:
+            numpy.ndarray: len(rows) x len(cols) block.
+        """
+        return numpy.dot(self.factors[rows], self.factors[cols].T)
+
+    def get_top_partners(self, k=10, absolute=True, chunk_size=1024):
+        """Get the k strongest cross-correlation partners (excluding itself) of every atom.
+
+        Args:
+            k (int, optional)          : Number of partners. Defaults to 10.
+            absolute (bool, optional)  : Rank by the absolute value (anti-correlations included); by the signed value otherwise. Defaults to True.
+            chunk_size (int, optional) : Number of rows calculated at once. Defaults to 1024.
+
+        Returns:
+            indices, values (numpy.ndarray): N x k partner indices and their cross-correlations (strongest first)
+        """
+        n = self.shape[0]
+        k = min(int(k), n-1)
+        indices = numpy.zeros((n, k), dtype=int)
+        values  = numpy.zeros((n, k), dtype=self.dtype)
+        for start in range(0, n, int(chunk_size)):
+            stop  = min(start+int(chunk_size), n)
+            block = numpy.dot(self.factors[start:stop], self.factors.T)
+            score = numpy.abs(block) if absolute else block.copy()
+            score[numpy.arange(stop-start), numpy.arange(start, stop)] = -numpy.inf
+            top = numpy.argpartition(-score, k-1, axis=1)[:, :k]
+            order = numpy.argsort(-numpy.take_along_axis(score, top, axis=1), axis=1, kind='stable')
+            indices[start:stop] = numpy.take_along_axis(top, order, axis=1)
+            values[start:stop]  = numpy.take_along_axis(block, indices[start:stop], axis=1)
+        return indices, values
+
+    def get_matrix(self, filename=None, chunk_size=1024):
+        """Get the full cross-correlation matrix.
+
+        Notes:
+            * If the filename is provided, the matrix is written block by block to the .npy file through numpy.memmap (spill to the disk) and the memmap is returned; numpy.load(filename, mmap_mode='r') opens it later.
+
+        Args:
+            filename (str, optional)   : Path of the .npy file. Defaults to None (In memory).
+            chunk_size (int, optional) : Number of rows calculated at once. Defaults to 1024.
+
+        Returns:
+            numpy.ndarray/numpy.memmap: N x N cross-correlation matrix.
+        """
+        n = self.shape[0]
+        if(filename is None):
+            out = numpy.empty((n, n), dtype=self.dtype)
+        else:
+            out = numpy.lib.format.open_memmap(filename, mode='w+', dtype=self.dtype, shape=(n, n))
+        for start in range(0, n, int(chunk_size)):
+            stop = min(start+int(chunk_size), n)
+            out[start:stop] = numpy.dot(self.factors[start:stop], self.factors.T)
+        if(filename is not None):
+            out.flush()
+        return out
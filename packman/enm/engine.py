@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""The 'ElasticNetwork' object host file.
+
+This is file information, not the class information. This information is only for the API developers.
+Please read the 'ElasticNetwork' object documentation for details.
+
+Example::
+
+    from packman.enm import ElasticNetwork, get_network
+    help( ElasticNetwork )
+
+Authors:
+    * Pranav Khade(https://github.com/Pranavkhade)
+"""
+
+import hashlib
+import numpy
+
+from collections import OrderedDict
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix, diags, bsr_matrix, issparse
+
+from ..utilities import partial_eigh
+from .cache import get_mode_cache
+
+
+class ElasticNetwork():
+    """This class contains the contact network of the points (eg... C-alpha atoms) within the distance cutoff and the matrices/eigenbases of the elastic network models built on it.
+
+    The contacts are calculated once (KD-tree pair query) and the Kirchhoff (GNM, DCI) and Hessian (ANM, hd-ANM) matrices are calculated once per parameter set and cached. The shared network (See packman.enm.get_network) also caches the decompositions, so several analyses of the same structure share them.
+
+    Notes:
+        * Use packman.enm.get_network() to obtain the shared network of the coordinates; creating the object directly does not share the cache.
+        * Cached matrices and eigenbases of the shared network are shared by all the models; they are read-only and should not be modified in place. Matrices of the private network (shared=False) are writable and its decompositions are not cached in the memory.
+
+    Args:
+        coords (numpy.ndarray)  : N x 3 coordinates.
+        cutoff (float)          : Distance cutoff (inclusive) of the contacts.
+        shared (bool, optional) : Network is shared by the models (read-only arrays; cached decompositions). Defaults to False.
+    """
+    def __init__(self, coords, cutoff, shared=False):
+        self.coords = numpy.array(coords, dtype=float)
+        self.cutoff = float(cutoff)
+        self.shared = shared
+        self.contacts = None
+        self.matrices = {}
+        self.decompositions = {}
+
+    def get_contacts(self):
+        """Get the contacts within the distance cutoff.
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray, numpy.ndarray): C x 2 atom index pairs (i<j), C x 3 difference vectors (j-i) and C distances.
+        """
+        if(self.contacts is None):
+            pairs = cKDTree(self.coords).query_pairs(self.cutoff, output_type='ndarray').reshape(-1, 2)
+            diff = self.coords[pairs[:,1]] - self.coords[pairs[:,0]]
+            distance = numpy.sqrt( numpy.einsum('ij,ij->i', diff, diff) )
+            self.contacts = tuple( _read_only(i) for i in (pairs, diff, distance) )
+            self._trim()
+        return self.contacts
+
+    def get_kirchhoff(self, gamma=1.0, sparse=True):
+        """Get the Kirchhoff matrix (GNM) of the network.
+
+        Args:
+            gamma (float, optional) : Spring Constant Value. Defaults to 1.0.
+            sparse (bool, optional) : scipy.sparse.csr_matrix (True) or numpy.ndarray (False). Defaults to True.
+
+        Returns:
+            scipy.sparse.csr_matrix/numpy.ndarray: Kirchhoff matrix.
+        """
+        key = ('kirchhoff', float(gamma))
+        if(key+(True,) not in self.matrices):
+            pairs, _, _ = self.get_contacts()
+            self.matrices[key+(True,)] = self._store( build_kirchhoff(pairs, len(self.coords), gamma) )
+            self._trim()
+        return self._get_matrix(key, sparse)
+
+    def get_hessian(self, gamma=1.0, power=0, pf=None, sparse=True):
+        """Get the Hessian matrix (ANM) of the network.
+
+        The 3x3 super-elements of all the contacts are calculated at once; spring constant of the contact is gamma/d^power, additionally divided by d in the parameter free (pf) model.
+
+        Args:
+            gamma (float, optional) : Spring Constant Value. Defaults to 1.0.
+            power (int, optional)   : Power of distance. Defaults to 0.
+            pf (None, optional)     : Parameter free model. Defaults to None.
+            sparse (bool, optional) : scipy.sparse.bsr_matrix with 3x3 blocks (True) or numpy.ndarray (False). Defaults to True.
+
+        Returns:
+            scipy.sparse.bsr_matrix/numpy.ndarray: Hessian matrix.
+        """
+        key = ('hessian', float(gamma), float(power), pf is not None)
+        if(key+(True,) not in self.matrices):
+            pairs, diff, distance = self.get_contacts()
+            self.matrices[key+(True,)] = self._store( build_hessian(pairs, diff, distance, len(self.coords), gamma, power, pf) )
+            self._trim()
+        return self._get_matrix(key, sparse)
+
+    def get_decomposition(self, matrix, n_modes=None, method='eigsh', trivial_modes=0, cache=None):
+        """Get the eigenvalues and eigenvectors of the Kirchhoff/Hessian matrix of the network.
+
+        Decompositions of the matrices obtained from the shared network are cached; the partial decomposition is taken from the full decomposition if it is already calculated. Other matrices (and the matrices of the private network) are decomposed without caching.
+        If the disk cache is given, the decomposition is read from it (memory-mapped) when available and stored in it otherwise.
+
+        Args:
+            matrix (scipy.sparse.spmatrix/numpy.ndarray) : Matrix from ElasticNetwork().get_kirchhoff() or ElasticNetwork().get_hessian()
+            n_modes (int, optional)                      : Number of the slowest non-trivial modes to be calculated. Defaults to None (All the modes).
+            method (str, optional)                       : Partial eigensolver (See packman.utilities.partial_eigh). Defaults to 'eigsh'.
+            trivial_modes (int/numpy.ndarray, optional)  : Trivial (zero) modes of the matrix (See packman.utilities.partial_eigh). Defaults to 0.
+            cache (packman.enm.ModeCache/str, optional)  : Disk cache of the decompositions (or its directory). Defaults to None (No disk cache).
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): Eigenvalues (ascending) and eigenvectors (columns).
+        """
+        key = self._get_key(matrix)
+        #Only the disk cache is used for the private network; its writable matrices may be modified in place
+        memory = key is not None and self.shared
+        n_trivial = trivial_modes if numpy.ndim(trivial_modes) == 0 else numpy.shape(trivial_modes)[1]
+
+        if(memory and (key, None, None) in self.decompositions):
+            values, vectors = self.decompositions[(key, None, None)]
+            if(n_modes is None):
+                return values, vectors
+            return values[:n_trivial+int(n_modes)], vectors[:,:n_trivial+int(n_modes)]
+        if(memory and (key, n_modes, method) in self.decompositions):
+            return self.decompositions[(key, n_modes, method)]
+
+        if(n_modes is None):
+            method = None
+        cache = get_mode_cache(cache) if key is not None else None
+        if(cache is not None):
+            full = cache.load( cache.get_key(self.coords, matrix=key, cutoff=self.cutoff, n_modes=None, method=None) )
+            if(full is not None):
+                if(n_modes is None):
+                    return full
+                if(memory):
+                    self.decompositions[(key, None, None)] = full
+                return full[0][:n_trivial+int(n_modes)], full[1][:,:n_trivial+int(n_modes)]
+            cache_key = cache.get_key(self.coords, matrix=key, cutoff=self.cutoff, n_modes=n_modes, method=method)
+            modes = cache.load(cache_key)
+            if(modes is not None):
+                if(memory):
+                    self.decompositions[(key, n_modes, method)] = modes
+                return modes
+
+        if(n_modes is None):
+            dense = matrix.toarray() if issparse(matrix) else matrix
+            values, vectors = numpy.linalg.eigh(dense)
+        else:
+            values, vectors = partial_eigh(matrix, n_modes, trivial_modes=trivial_modes, method=method)
+
+        if(cache is not None):
+            cache.save(cache_key, values, vectors)
+        if(memory):
+            self.decompositions[(key, n_modes, method)] = (_read_only(values), _read_only(vectors))
+            self._trim()
+        return values, vectors
+
+    def get_size(self):
+        """Get the memory used by the cached contacts, matrices and decompositions.
+
+        Returns:
+            int: Size in bytes (memory-mapped decompositions included)
+        """
+        arrays = list(self.contacts or ()) + [j for i in self.decompositions.values() for j in i]
+        for i in self.matrices.values():
+            arrays.extend( [i.data, i.indices, i.indptr] if issparse(i) else [i] )
+        #Same array can be cached under many keys (eg... partial and full decomposition)
+        return sum( {id(i): i.nbytes for i in arrays}.values() )
+
+    def _get_matrix(self, key, sparse):
+        """Cached sparse matrix or its (cached) dense copy."""
+        if(not sparse and key+(False,) not in self.matrices):
+            self.matrices[key+(False,)] = self._store( self.matrices[key+(True,)].toarray() )
+            self._trim()
+        return self.matrices[key+(bool(sparse),)]
+
+    def _store(self, matrix):
+        """Matrix to be cached; read-only if the network is shared."""
+        return _read_only(matrix) if self.shared else matrix
+
+    def _trim(self):
+        """Keep the shared networks within NETWORK_CACHE_BYTES after this network has grown."""
+        if(self.shared):
+            _trim_networks(keep=self)
+        return True
+
+    def _get_key(self, matrix):
+        """Parameter key of the cached matrix (same for the sparse and dense copy); None if the matrix is not from this network."""
+        for key, value in self.matrices.items():
+            if(value is matrix):
+                return key[:-1]
+        return None
+
+
+def build_kirchhoff(pairs, n_atoms, gamma=1.0):
+    """Kirchhoff matrix (GNM) of the contacts.
+
+    Args:
+        pairs (numpy.ndarray)   : C x 2 atom index pairs.
+        n_atoms (int)           : Number of atoms.
+        gamma (float, optional) : Spring Constant Value. Defaults to 1.0.
+
+    Returns:
+        scipy.sparse.csr_matrix: Kirchhoff matrix.
+    """
+    rows = numpy.concatenate((pairs[:,0], pairs[:,1]))
+    cols = numpy.concatenate((pairs[:,1], pairs[:,0]))
+    degree = numpy.bincount(pairs.ravel(), minlength=n_atoms) * float(gamma)
+    return ( coo_matrix( (numpy.full(len(rows), -float(gamma)), (rows, cols)), shape=(n_atoms, n_atoms) ) + diags(degree) ).tocsr()
+
+def build_hessian(pairs, diff, distance, n_atoms, gamma=1.0, power=0, pf=None):
+    """Hessian matrix (ANM) of the contacts. (See ElasticNetwork().get_hessian())
+
+    Args:
+        pairs (numpy.ndarray)    : C x 2 atom index pairs.
+        diff (numpy.ndarray)     : C x 3 difference vectors of the pairs.
+        distance (numpy.ndarray) : C distances of the pairs.
+        n_atoms (int)            : Number of atoms.
+        gamma (float, optional)  : Spring Constant Value. Defaults to 1.0.
+        power (int, optional)    : Power of distance. Defaults to 0.
+        pf (None, optional)      : Parameter free model. Defaults to None.
+
+    Returns:
+        scipy.sparse.bsr_matrix: Hessian matrix with 3x3 blocks.
+    """
+    #Per pair distance scaling
+    scale = float(-gamma) / distance**(2+power)
+    if pf != None:
+        scale = scale / distance
+    blocks = numpy.einsum('i,ij,ik->ijk', scale, diff, diff)
+
+    #Diagonal super-elements are the negative sums of the off-diagonal ones in the same row
+    ends = numpy.concatenate((pairs[:,0], pairs[:,1]))
+    diagonal = -numpy.stack( [numpy.bincount(ends, weights=numpy.concatenate((blocks[:,c//3,c%3], blocks[:,c//3,c%3])), minlength=n_atoms) for c in range(9)], axis=1 ).reshape(n_atoms, 3, 3)
+
+    rows = numpy.concatenate( (pairs[:,0], pairs[:,1], numpy.arange(n_atoms)) )
+    cols = numpy.concatenate( (pairs[:,1], pairs[:,0], numpy.arange(n_atoms)) )
+    data = numpy.concatenate( (blocks, blocks, diagonal) )
+    order = numpy.lexsort((cols, rows))
+    indptr = numpy.concatenate( ([0], numpy.cumsum(numpy.bincount(rows, minlength=n_atoms))) )
+    return bsr_matrix( (data[order], cols[order], indptr), shape=(3*n_atoms, 3*n_atoms) )
+
+def _read_only(array):
+    """Mark the array (or the data of the sparse matrix) as read-only and return it."""
+    (array.data if issparse(array) else array).flags.writeable = False
+    return array
+
+
+#Shared networks; the least recently used networks are dropped when their total size exceeds the limit
+_networks = OrderedDict()
+NETWORK_CACHE_BYTES = 2**28
+
+def get_network(coords, cutoff, share=True):
+    """Get the shared elastic network of the coordinates and the distance cutoff.
+
+    Models of the same coordinates (eg... GNM and DCI of the same chain) with the same cutoff obtain the same network and share its contacts, matrices and eigenbases.
+
+    Notes:
+        * Shared networks are kept till their total size (See ElasticNetwork().get_size()) exceeds NETWORK_CACHE_BYTES (256 MiB); the least recently used ones are dropped first. Use clear_networks() to release the memory.
+        * Arrays of the shared network are read-only.
+        * The models (GNM, ANM, hdANM and DCI) use the shared network only if they are created with share=True.
+
+    Args:
+        coords (numpy.ndarray)  : N x 3 coordinates.
+        cutoff (float)          : Distance cutoff (inclusive) of the contacts.
+        share (bool, optional)  : Shared network (True) or a new private network (False) that lives as long as its user. Defaults to True.
+
+    Returns:
+        packman.enm.ElasticNetwork: Shared (or private) network.
+    """
+    if(not share):
+        return ElasticNetwork(coords, cutoff)
+    coords = numpy.ascontiguousarray(coords, dtype=float)
+    key = ( hashlib.sha1(coords.tobytes()).hexdigest(), coords.shape, float(cutoff) )
+    if(key in _networks):
+        _networks.move_to_end(key)
+    else:
+        _networks[key] = ElasticNetwork(coords, cutoff, shared=True)
+    return _networks[key]
+
+def _trim_networks(keep=None):
+    """Drop the least recently used shared networks (except the given one) till their total size is within NETWORK_CACHE_BYTES."""
+    sizes = {key: value.get_size() for key, value in _networks.items()}
+    total = sum(sizes.values())
+    for key in list(_networks.keys()):
+        if(total <= NETWORK_CACHE_BYTES):
+            break
+        if(_networks[key] is keep):
+            continue
+        total -= sizes[key]
+        del _networks[key]
+    return True
+
+def clear_networks():
+    """Release all the shared elastic networks. (See get_network)"""
+    _networks.clear()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""The 'EnsembleENM' object host file.
+
+This is file information, not the class information. This information is only for the API developers.
+Please read the 'EnsembleENM' object documentation for details.
+
+Example::
+
+    from packman.enm import EnsembleENM
+    help( EnsembleENM )
+
+Authors:
+    * Pranav Khade(https://github.com/Pranavkhade)
+"""
+
+import numpy
+
+from scipy.spatial import cKDTree
+
+from ..utilities import partial_eigh, rigid_body_modes
+from .engine import build_kirchhoff, build_hessian
+
+
+class EnsembleENM():
+    """This class contains the slowest modes of the elastic network model (GNM/ANM) of every frame of the ensemble (eg... models of the NMR structure or MD snapshots).
+
+    Consecutive frames have nearly identical slow modes, so the modes of the previous frame are passed to the eigensolver of each frame as the starting guess (See packman.utilities.partial_eigh); with method='lobpcg' they fill the whole block (block warm start), while the default shift-invert ARPACK ('eigsh') only starts from their sum, which barely changes its cost. The contacts are taken from the neighbor list built with the extra distance (skin) that is rebuilt only when an atom has moved more than half of the skin since it was built. If the contacts (topology) of the frame are the same as of the previous frame, the GNM modes are reused as they are (identical Kirchhoff matrix).
+
+    Notes:
+        * All the frames should have the same atoms in the same order.
+        * Only the non-trivial modes are stored (trivial/rigid body modes are removed).
+
+    Args:
+        frames (packman.molecule.Protein/[numpy.ndarray]) : Ensemble; C-alpha atoms of each model of the 'Protein' object or N x 3 coordinates of each frame.
+        model (str, optional)                             : 'GNM' or 'ANM'. Defaults to 'GNM'.
+        n_modes (int, optional)                           : Number of the slowest non-trivial modes. Defaults to 10.
+        chain (str, optional)                             : Chain ID (only for the 'Protein' object). Defaults to None (All the chains).
+        dr (float, optional)                              : Distance Cutoff. Defaults to 7.3 (GNM) or 15.0 (ANM).
+        gamma (float, optional)                           : Spring Constant Value. Defaults to 1.0.
+        power (int, optional)                             : Power of distance (ANM). Defaults to 0.
+        pf (None, optional)                               : Parameter free model (ANM). Defaults to None.
+        skin (float, optional)                            : Extra distance of the neighbor list. Defaults to 2.0.
+    """
+    def __init__(self, frames, model='GNM', n_modes=10, chain=None, dr=None, gamma=1.0, power=0, pf=None, skin=2.0):
+        if(model not in ['GNM', 'ANM']):
+            raise ValueError("model should be 'GNM' or 'ANM'")
+        self.model   = model
+        self.n_modes = int(n_modes)
+        self.dr      = dr if dr is not None else (7.3 if model == 'GNM' else 15.0)
+        self.gamma   = gamma
+        self.power   = power
+        self.pf      = pf
+        self.skin    = skin
+
+        if(hasattr(frames, 'get_models')):
+            #Protein().get_models() yields the list of all the models
+            models = next(frames.get_models())
+            self.frames = [ numpy.array([j.get_location() for j in (i[chain].get_calpha() if chain is not None else i.get_calpha()) if j is not None]) for i in models ]
+        else:
+            self.frames = [ numpy.asarray(i, dtype=float) for i in frames ]
+        if(len(set(len(i) for i in self.frames)) > 1):
+            raise ValueError("All the frames should have the same number of atoms")
+
+        self.eigen_values     = None
+        self.eigen_vectors    = None
+        self.overlaps         = None
+        self.topology_changed = None
+
+    '''Get Functions'''
+    def get_eigenvalues(self):
+        """Get the eigenvalues of all the frames.
+
+        Returns:
+            numpy.ndarray: Frames x n_modes eigenvalues if successful; None otherwise
+        """
+        return self.eigen_values
+
+    def get_eigenvectors(self):
+        """Get the eigenvectors of all the frames.
+
+        Returns:
+            numpy.ndarray: Frames x N (3N for ANM) x n_modes eigenvectors if successful; None otherwise
+        """
+        return self.eigen_vectors
+
+    def get_overlaps(self):
+        """Get the overlaps (absolute cosine) of the modes of each frame with the modes of the previous frame.
+
+        Returns:
+            numpy.ndarray: Frames-1 x n_modes x n_modes overlaps (row: mode of the frame; column: mode of the previous frame) if successful; None otherwise
+        """
+        return self.overlaps
+
+    def get_topology_changes(self):
+        """Get whether the contacts of each frame are different from the previous frame (first frame is always True).
+
+        Returns:
+            numpy.ndarray: Frames booleans if successful; None otherwise
+        """
+        return self.topology_changed
+
+    '''Calculate Functions'''
+    def calculate_modes(self, method='eigsh'):
+        """Calculate the slowest modes of all the frames.
+
+        Args:
+            method (str, optional) : Partial eigensolver; 'eigsh' (shift-invert ARPACK; starts from the sum of the previous modes), 'lobpcg' (block warm start from the previous modes) or 'lapack' (no warm start). See packman.utilities.partial_eigh. Defaults to 'eigsh'; even without the block warm start it is 3-4 times faster than the warm-started LOBPCG for the 20 slowest modes of 200-3000 residues.
+
+        Returns:
+            True if successful; None otherwise.
+        """
+        eigen_values, eigen_vectors, topology_changed = [], [], []
+        neighbors, reference, previous_pairs, previous = None, None, None, None
+
+        for coords in self.frames:
+            n_atoms = len(coords)
+
+            #Neighbor list within the cutoff and the skin is valid till an atom moves by half of the skin
+            if(neighbors is None or numpy.max(numpy.linalg.norm(coords-reference, axis=1)) > self.skin/2.0):
+                neighbors = cKDTree(coords).query_pairs(self.dr+self.skin, output_type='ndarray').reshape(-1, 2)
+                reference = coords
+            diff = coords[neighbors[:,1]] - coords[neighbors[:,0]]
+            distance = numpy.sqrt( numpy.einsum('ij,ij->i', diff, diff) )
+            contacts = distance <= self.dr
+            pairs = neighbors[contacts]
+            changed = previous_pairs is None or not numpy.array_equal(pairs, previous_pairs)
+
+            if(self.model == 'GNM' and not changed):
+                values, vectors = previous
+            else:
+                if(self.model == 'GNM'):
+                    matrix = build_kirchhoff(pairs, n_atoms, self.gamma)
+                    basis = numpy.full((n_atoms, 1), 1.0/numpy.sqrt(n_atoms))
+                else:
+                    matrix = build_hessian(pairs, diff[contacts], distance[contacts], n_atoms, self.gamma, self.power, self.pf)
+                    basis = rigid_body_modes(coords)
+                initial = previous[1] if previous is not None else None
+                values, vectors = partial_eigh(matrix, self.n_modes, trivial_modes=basis, method=method, initial=initial)
+                values, vectors = values[basis.shape[1]:], vectors[:, basis.shape[1]:]
+
+            eigen_values.append(values)
+            eigen_vectors.append(vectors)
+            topology_changed.append(changed)
+            previous_pairs, previous = pairs, (values, vectors)
+
+        self.eigen_values     = numpy.array(eigen_values)
+        self.eigen_vectors    = numpy.array(eigen_vectors)
+        self.topology_changed = numpy.array(topology_changed)
+        self.overlaps         = numpy.abs( numpy.einsum('fik,fil->fkl', self.eigen_vectors[1:], self.eigen_vectors[:-1]) )
+        return True
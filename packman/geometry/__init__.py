@@ -14,4 +14,9 @@ Todo:
 """
 
 from .geometry import Circumsphere
-from .geometry import AlphaShape
\ No newline at end of file
+from .geometry import Circumspheres
+from .geometry import SimplexEdges
+from .geometry import Eccentricity
+from .geometry import LeastSquarePlanes
+from .geometry import AlphaShape
+from .geometry import AlphaFiltration
@@ -20,9 +20,14 @@ Authors:
 """
 import numpy
 
+from multiprocessing import Pool
+
 from scipy.spatial import Delaunay
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import shortest_path, connected_components
 
-from networkx import Graph
+from networkx import Graph, NetworkXError
+from networkx import eccentricity as networkx_eccentricity
 
 def Circumsphere(Tetrahydron):
     """Get the Circumsphere of the set of four points.
@@ -53,6 +58,90 @@ def Circumsphere(Tetrahydron):
     return Centre, Radius
 
 
+def Circumspheres(coords, simplices):
+    """Get the Circumspheres of the many tetrahedrons at once.
+
+    Vectorized counterpart of the 'Circumsphere' function. The centres and radii of all the given tetrahedrons (eg... Delaunay simplices) are calculated in a single closed-form pass instead of five determinants per tetrahedron.
+
+    Notes:
+        * Degenerate (flat) tetrahedrons get an infinite radius so that they never pass the alpha test.
+
+    Args:
+        coords (numpy.ndarray)    : N x 3 array of the 3D coordinates.
+        simplices (numpy.ndarray) : M x 4 array of the indices (of coords) of the tetrahedron vertices.
+
+    Returns:
+        [Centres, Radii] (numpy.ndarray): M x 3 array of the geometrical centres and array of M radii of the circumspheres (in that order).
+    """
+    coords    = numpy.asarray(coords, dtype=float)
+    simplices = numpy.asarray(simplices)
+    origin    = coords[simplices[:,0]]
+    u = coords[simplices[:,1]] - origin
+    v = coords[simplices[:,2]] - origin
+    w = coords[simplices[:,3]] - origin
+
+    vw, wu, uv = numpy.cross(v, w), numpy.cross(w, u), numpy.cross(u, v)
+    denominator = 2.0 * numpy.einsum('ij,ij->i', u, vw)
+    numerator = (u*u).sum(1)[:,None]*vw + (v*v).sum(1)[:,None]*wu + (w*w).sum(1)[:,None]*uv
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        offset = numerator / denominator[:,None]
+    Radii   = numpy.sqrt( (offset*offset).sum(1) )
+    Radii[~numpy.isfinite(Radii)] = float('Inf')
+    Centres = origin + offset
+    return Centres, Radii
+
+
+def SimplexEdges(simplices):
+    """Get the unique edges of the tetrahedrons.
+
+    Args:
+        simplices (numpy.ndarray) : M x 4 array of the tetrahedron vertex indices.
+
+    Returns:
+        numpy.ndarray: E x 2 array of the unique (sorted) edges; first column is always the smaller index.
+    """
+    simplices = numpy.asarray(simplices)
+    edges = simplices[:, [0,0,0,1,1,2]], simplices[:, [1,2,3,2,3,3]]
+    edges = numpy.stack( (numpy.minimum(*edges).ravel(), numpy.maximum(*edges).ravel()), axis=1 )
+    return numpy.unique(edges, axis=0).reshape(-1, 2)
+
+
+def LeastSquarePlanes(PointSets):
+    """Get the Least Square Planes of the many sets of points at once.
+
+    The plane z = a*x + b*y + c is fitted for every set of points by solving the normal equations (closed-form least squares) for all the sets in a single batch.
+
+    Notes:
+        * Normal equations are singular for the degenerate sets (eg... fewer than 3 points, collinear points or points in a plane parallel to the z axis); the minimum norm least squares solution (numpy.linalg.lstsq) is used for them, so every set gets a plane.
+
+    Args:
+        PointSets ([numpy.ndarray]) : List of K x 3 arrays of the 3D points. (eg... backbone atoms of every predicted hinge)
+    
+    Returns:
+        numpy.ndarray: H x 3 array of the plane parameters (a,b,c); one row per set of points.
+    """
+    PointSets = [numpy.asarray(i, dtype=float).reshape(-1, 3) for i in PointSets]
+    if(len(PointSets) == 0):
+        return numpy.zeros((0, 3))
+    points = numpy.concatenate(PointSets)
+    labels = numpy.repeat( numpy.arange(len(PointSets)), [len(i) for i in PointSets] )
+
+    #Design matrix [x, y, 1] and the target z
+    design = numpy.column_stack( (points[:,0], points[:,1], numpy.ones(len(points))) )
+    outer  = numpy.einsum('ni,nj->nij', design, design).reshape(-1, 9)
+    normal = numpy.stack( [numpy.bincount(labels, weights=outer[:,i], minlength=len(PointSets)) for i in range(9)], axis=1 ).reshape(-1, 3, 3)
+    target = numpy.stack( [numpy.bincount(labels, weights=design[:,i]*points[:,2], minlength=len(PointSets)) for i in range(3)], axis=1 )
+
+    planes = numpy.zeros((len(PointSets), 3))
+    regular = numpy.linalg.matrix_rank(normal) == 3
+    if(numpy.any(regular)):
+        planes[regular] = numpy.linalg.solve(normal[regular], target[regular][:,:,None])[:,:,0]
+    for i in numpy.flatnonzero(~regular):
+        planes[i] = numpy.linalg.lstsq(design[labels==i], points[labels==i,2], rcond=None)[0]
+    return planes
+
+
 def AlphaShape( atoms, alpha, get_graph=False, write_objfile=None ):
     """Get the Alpha Shape of the atoms.
 
@@ -60,6 +149,7 @@ def AlphaShape( atoms, alpha, get_graph=False, write_objfile=None ):
 
     Notes:
         * Tip: If you do not want to use the function multiple times to save computation, calculate it once with alpha = float('Inf') and then use the tessellations to calculate radius and save it as a dictionary to retrieve. Tessellations with any cutoff.
+        * The circumradii of all the Delaunay tetrahedrons are calculated at once (See 'Circumspheres') and the protein graph is only built when requested.
         * For more information on the alpha shape, read the following paper:
             EdelsbrunnerandE. P. M ̈ucke.Three-dimensional alpha shapes.
             Manuscript UIUCDCS-R-92-1734, Dept.Comput.Sci. ,Univ.Illinois, Urbana-Champaign, IL, 1992.
@@ -74,39 +164,209 @@ def AlphaShape( atoms, alpha, get_graph=False, write_objfile=None ):
         - Alpha Shape Tessellations                ; if 'get_graph' = False
         - Alpha Shape Tessellations, Protein Graph ; if 'get_graph' = True
     """
-    def calculate_alphafitness(alpha, circumradius):
-        """Alpha Test as per the paper.
+    atoms  = [i for i in atoms]
+    coords = numpy.array([i.get_location() for i in atoms])
+    DelaunayTesssellations = Delaunay( coords )
+
+    #Alpha Test
+    _, Radii = Circumspheres( coords, DelaunayTesssellations.simplices )
+    SelectedSimplices = DelaunayTesssellations.simplices[Radii < alpha]
+
+    AlphaShape = [ [atoms[a],atoms[b],atoms[c],atoms[d]] for a, b, c, d in SelectedSimplices ]
+
+    if(get_graph):
+        ProteinGraph = Graph()
+        ProteinGraph.add_nodes_from( numpy.unique(SelectedSimplices).tolist() )
+        ProteinGraph.add_edges_from( SimplexEdges(SelectedSimplices).tolist() )
+        return AlphaShape, ProteinGraph
+    else:
+        return AlphaShape
+
+def _bfs_eccentricity(csgraph, indices):
+    """Eccentricity of the given nodes by the breadth first search on the unweighted graph. (Internal function; picklable for the process pool)
+    """
+    return shortest_path(csgraph, method='D', directed=False, unweighted=True, indices=indices).max(1)
+
+
+def Eccentricity(graph, method='bounding', workers=1, chunk_size=256):
+    """Get the eccentricity (maximum shortest path length to any other node) of every node in the graph.
+
+    The output is identical to the networkx.eccentricity(graph) but the breadth first searches are done with scipy.sparse.csgraph.
+
+    Notes:
+        * method='bounding' : Exact BoundingDiameters algorithm (Takes and Kosters, Algorithms, 2013). The lower and upper bounds of all the nodes are updated after every breadth first search, and only a handful of searches are needed on the near-planar alpha shape graphs.
+        * method='bfs'      : Breadth first search from every node in the chunks of 'chunk_size' nodes; chunks are distributed over 'workers' processes.
+        * method='networkx' : networkx.eccentricity (Slowest; kept for the reference)
+    
+    Args:
+        graph (networkx.Graph or numpy.ndarray) : Protein graph or E x 2 array of the edges (eg... packman.geometry.AlphaFiltration().get_edges())
+        method (str, optional)                  : 'bounding', 'bfs' or 'networkx'. Defaults to 'bounding'.
+        workers (int, optional)                 : Number of processes for the 'bfs' method. Defaults to 1.
+        chunk_size (int, optional)              : Number of source nodes per breadth first search batch for the 'bfs' method. Defaults to 256.
+    
+    Raises:
+        networkx.NetworkXError: If the graph is not connected (Same as networkx.eccentricity)
+
+    Returns:
+        dict: Node as a key and its eccentricity (int) as a value.
+    """
+    if(isinstance(graph, Graph)):
+        if(method == 'networkx'):
+            return networkx_eccentricity(graph)
+        nodes = list(graph.nodes())
+        lookup = {j:numi for numi,j in enumerate(nodes)}
+        edges = numpy.array([ (lookup[i],lookup[j]) for i,j in graph.edges() ], dtype=int).reshape(-1, 2)
+    else:
+        nodes, edges = numpy.unique(graph, return_inverse=True)
+        nodes, edges = nodes.tolist(), edges.reshape(-1, 2)
+        if(method == 'networkx'):
+            ProteinGraph = Graph()
+            ProteinGraph.add_edges_from( numpy.asarray(graph).tolist() )
+            return networkx_eccentricity(ProteinGraph)
+
+    n = len(nodes)
+    if(n == 0):
+        return {}
+    csgraph = coo_matrix( (numpy.ones(len(edges)), (edges[:,0], edges[:,1])), shape=(n, n) ).tocsr()
+    if(connected_components(csgraph, directed=False, return_labels=False) > 1):
+        raise NetworkXError("Found infinite path length because the graph is not connected")
+
+    if(method == 'bfs'):
+        chunks = [numpy.arange(i, min(i+chunk_size, n)) for i in range(0, n, chunk_size)]
+        if(workers > 1):
+            with Pool(workers) as pool:
+                ecc = pool.starmap(_bfs_eccentricity, [(csgraph, i) for i in chunks])
+        else:
+            ecc = [_bfs_eccentricity(csgraph, i) for i in chunks]
+        ecc = numpy.concatenate(ecc)
+    elif(method == 'bounding'):
+        degree = numpy.diff( (csgraph + csgraph.T).tocsr().indptr )
+        lower, upper = numpy.zeros(n), numpy.full(n, numpy.inf)
+        candidates, high = numpy.ones(n, dtype=bool), True
+        while(candidates.any()):
+            #Alternate between the largest upper bound and the smallest lower bound (ties: highest degree)
+            index = numpy.flatnonzero(candidates)
+            if(high):
+                index = index[ upper[index] == upper[index].max() ]
+            else:
+                index = index[ lower[index] == lower[index].min() ]
+            source = index[ numpy.argmax(degree[index]) ]
+            high = not high
+
+            distance = shortest_path(csgraph, method='D', directed=False, unweighted=True, indices=source)
+            ecc_source = distance.max()
+            lower = numpy.maximum(lower, numpy.maximum(distance, ecc_source-distance))
+            upper = numpy.minimum(upper, ecc_source+distance)
+            lower[source] = upper[source] = ecc_source
+            candidates &= lower != upper
+        ecc = lower
+    else:
+        raise ValueError("Please provide appropriate 'method' argument. (bounding/bfs/networkx)")
+
+    return {j:int(ecc[numj]) for numj,j in enumerate(nodes)}
+
+
+class AlphaFiltration():
+    """This class contains the Alpha Filtration of the atoms; the Delaunay tessellations sorted by their circumradius.
+
+    The Delaunay tessellation and the circumspheres are calculated only once. The alpha shape (and the graph) for any alpha value is then obtained by the binary search over the sorted circumradii.
+    It is useful when the alpha shape is needed for many alpha values (eg... scanning the alpha values from 0 to 10 for the hinge prediction).
+
+    Notes:
+        * AlphaFiltration(atoms).get_alpha_shape(alpha) is same as AlphaShape(atoms, alpha)
+        * Each edge is born at the smallest circumradius of the tessellations it belongs to. Edges are stored in that order to grow the graph incrementally (See AlphaFiltration().sweep())
+    
+    Args:
+        atoms ([packman.molecule.Atom]) : Set of atoms. (PACKMAN uses backbone atoms for the hinge prediction)
+    """
+    def __init__(self, atoms):
+        self.atoms  = [i for i in atoms]
+        self.coords = numpy.array([i.get_location() for i in self.atoms])
+
+        DelaunayTesssellations = Delaunay( self.coords )
+        _, Radii = Circumspheres( self.coords, DelaunayTesssellations.simplices )
+        order = numpy.argsort(Radii, kind='stable')
+        self.simplices = DelaunayTesssellations.simplices[order]
+        self.radii     = Radii[order]
+
+        #First occurrence of the edge in the sorted simplices is its birth radius
+        edges = numpy.stack( ( self.simplices[:, [0,0,0,1,1,2]], self.simplices[:, [1,2,3,2,3,3]] ), axis=2 ).reshape(-1, 2)
+        edges.sort(axis=1)
+        edges, first = numpy.unique(edges, axis=0, return_index=True)
+        order = numpy.argsort(first, kind='stable')
+        self.edges       = edges[order].reshape(-1, 2)
+        self.edge_radii  = numpy.repeat(self.radii, 6)[first[order]]
+
+    #Get functions
+    def get_radii(self):
+        """Get the sorted circumradii of the Delaunay tessellations.
+
+        Returns:
+            numpy.ndarray: Circumradii in the ascending order.
+        """
+        return self.radii
+
+    def get_simplices(self, alpha):
+        """Get the indices (of the atoms) of the tessellations passing the alpha test.
+
+        Args:
+            alpha (float) : Alpha value.
         
-        Notes:
-            * Resides inside 'get_alphashape' function.
+        Returns:
+            numpy.ndarray: M x 4 array of the atom indices.
+        """
+        return self.simplices[ :numpy.searchsorted(self.radii, alpha, side='left') ]
+
+    def get_alpha_shape(self, alpha):
+        """Get the Alpha Shape tessellations for the given alpha value.
 
         Args:
-            alpha (float)                  : Alpha.                            (Read parent method description)
-            circumradius ([float])         : Circumradius of the circumsphere. (Read parent method description)
+            alpha (float) : Alpha value.
         
         Returns:
-            bool: True if alpha test is passed. False otherwise.
+            [[packman.molecule.Atom]]: Alpha Shape Tessellations (Same as packman.geometry.AlphaShape)
         """
-        if( circumradius < alpha ):
-            return True
-        else:
-            return False
-
-    #get_alphashape function commands.
-    DelaunayTesssellations = Delaunay( [i.get_location() for i in atoms] )
-    AlphaShape   = []
-    ProteinGraph = Graph()
-
-    for a, b, c, d in DelaunayTesssellations.vertices:
-        Tetrahydron = [atoms[a],atoms[b],atoms[c],atoms[d]]
-        Centre, Radius = Circumsphere(Tetrahydron)
-        #Alpha Test
-        if( calculate_alphafitness(alpha,Radius) ):
-            ProteinGraph.add_nodes_from( [a,b,c,d] )
-            ProteinGraph.add_edges_from( [(a,b),(a,c),(a,d),(b,c),(b,d),(c,d)] )
-            AlphaShape.append( [atoms[a],atoms[b],atoms[c],atoms[d]] )
+        return [ [self.atoms[a],self.atoms[b],self.atoms[c],self.atoms[d]] for a, b, c, d in self.get_simplices(alpha) ]
 
-    if(get_graph):
-        return AlphaShape, ProteinGraph
-    else:
-        return AlphaShape
\ No newline at end of file
+    def get_edges(self, alpha):
+        """Get the edges of the alpha shape for the given alpha value.
+
+        Args:
+            alpha (float) : Alpha value.
+        
+        Returns:
+            numpy.ndarray: E x 2 array of the atom indices; edges are in the order of their birth radius.
+        """
+        return self.edges[ :numpy.searchsorted(self.edge_radii, alpha, side='left') ]
+
+    def get_graph(self, alpha):
+        """Get the protein graph of the alpha shape for the given alpha value.
+
+        Args:
+            alpha (float) : Alpha value.
+        
+        Returns:
+            networkx.Graph: Protein Graph (Same as the packman.geometry.AlphaShape graph)
+        """
+        ProteinGraph = Graph()
+        ProteinGraph.add_edges_from( self.get_edges(alpha).tolist() )
+        return ProteinGraph
+
+    def sweep(self, alphas):
+        """Sweep the alpha values in the ascending order by adding the edges to the same graph in the order of their birth radius.
+
+        Notes:
+            * The same networkx.Graph object is updated and yielded for every alpha value; copy it if it needs to be stored.
+
+        Args:
+            alphas ([float]) : Alpha values.
+        
+        Yields:
+            alpha, networkx.Graph: Alpha value and the protein graph for that alpha value.
+        """
+        ProteinGraph, added = Graph(), 0
+        for alpha in sorted(alphas):
+            upto = numpy.searchsorted(self.edge_radii, alpha, side='left')
+            ProteinGraph.add_edges_from( self.edges[added:upto].tolist() )
+            added = max(added, upto)
+            yield alpha, ProteinGraph
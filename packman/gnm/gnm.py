@@ -24,6 +24,8 @@ Authors:
 import numpy
 import logging
 
+from ..enm import CrossCorrelation, get_network
+
 '''
 ##################################################################################################
 #                                              GNM                                              #
@@ -44,12 +46,14 @@ class GNM:
             gamma (float, optional): Spring Constant Value.                                      Defaults to 1.0.
             dr (float, optional)   : Distance Cutoff.                                            Defaults to 7.3 (Yang et. al., Protein elastic network models and the ranges of cooperativity. (2009))
             power (int, optional)  : Power of distance (mainly useful in non-parametric mode).   Defaults to 0.
+            share (bool, optional) : Share the contacts, matrices and eigenbases with the other models of the same coordinates and cutoff (See packman.enm.get_network); shared arrays are read-only. Defaults to False.
     """
     
-    def __init__(self, atoms, gamma=1.0, dr=7.3, power=0):
+    def __init__(self, atoms, gamma=1.0, dr=7.3, power=0, share=False):
         self.gamma   = gamma
         self.dr      = dr
         self.power   = power
+        self.share   = share
         self.atoms   = [i for i in atoms]
         self.coords  = numpy.array([i.get_location() for i in self.atoms])
         if self.gamma <= 0:
@@ -63,13 +67,14 @@ class GNM:
 
     '''Get Functions'''
     def get_kirchhoff(self):
-        """Get the Hessian Matrix of the ANM model.
+        """Get the Kirchhoff Matrix of the GNM model.
 
         Notes:
             * Make sure that the GNM().calculate_kirchhoff() is called before calling this function. (will return None otherwise)
+            * The matrix is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
         
         Returns:
-            numpy.ndarray: Hessian matrix if successful; None otherwise
+            scipy.sparse.csr_matrix/numpy.ndarray: Kirchhoff matrix (See GNM().calculate_kirchhoff()) if successful; None otherwise
         """
         return self.kirchhoff
     
@@ -78,6 +83,7 @@ class GNM:
         
         Notes:
             * Make sure that the ANM().calculate_hessian() and ANM().calculate_decomposition() is called before calling this function. (will return None otherwise)
+            * The array is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
 
         Returns:
             numpy.ndarray: Eigenvalues if successful; None otherwise
@@ -89,6 +95,7 @@ class GNM:
         
         Notes:
             * Make sure that the ANM().calculate_hessian() and ANM().calculate_decomposition() is called before calling this function. (will return None otherwise)
+            * The array is read-only (shared with the other models) if the model is created with share=True; use numpy.array() for a writable copy.
 
         Returns:
             numpy.ndarray: Eigenvectors if successful; None otherwise
@@ -121,61 +128,78 @@ class GNM:
         """Get the pseudoinverse of the Kirchhoff's matrix.
 
         Notes:
-            * Make sure that the GNM().calculate_kirchhoff(), GNM().calculate_decomposition() and GNM().calculate_fluctuations() is called before calling this function. (will return None otherwise)
+            * Make sure that the GNM().calculate_kirchhoff(), GNM().calculate_decomposition() and GNM().calculate_crosscorrelation() is called before calling this function. (will return None otherwise)
 
         Returns:
             numpy.ndarray: 2D array of pseudoinverse
         """
         return self.pseduinverse
 
+    def get_crosscorrelation_operator(self, n_modes=None, dtype=numpy.float32):
+        """Get the cross-correlation as a lazy operator (rows, blocks and top partners on demand) without the N x N matrix.
+
+        Notes:
+            * Make sure that the GNM().calculate_kirchhoff() and GNM().calculate_decomposition() is called before calling this function.
+
+        Args:
+            n_modes (int, optional)       : Number of the slowest non-trivial modes to be used. Defaults to None (All the calculated modes).
+            dtype (numpy.dtype, optional) : Storage type. Defaults to numpy.float32.
+
+        Returns:
+            packman.enm.CrossCorrelation: Cross-correlation operator.
+        """
+        stop = len(self.eigen_values) if n_modes is None else 1+int(n_modes)
+        return CrossCorrelation(self.eigen_vectors[:,1:stop], self.eigen_values[1:stop], dim=1, dtype=dtype)
+
     '''Calculate Functions'''
-    def calculate_kirchhoff(self, gamma = 1.0):
+    def calculate_kirchhoff(self, gamma = 1.0, sparse = True):
         """Calculate the Gaussian Network Model (GNM) kirchhoff Matrix.
 
-        The matrix is stored in the self.GNM_MAT variable.
+        The contacts within the distance cutoff are obtained from the KD-tree pair query; the construction time and memory are linear in the number of contacts. The contacts and the matrix are shared with the other models of the same coordinates and cutoff if the model is created with share=True (See packman.enm.get_network)
+
+        Notes:
+            * The sparse matrix (scipy.sparse.csr_matrix) is stored by default. Use sparse=False for the dense matrix (numpy.ndarray)
+        
+        Args:
+            gamma (float, optional) : Spring Constant Value. Defaults to 1.0.
+            sparse (bool, optional) : Store the kirchhoff matrix as scipy.sparse.csr_matrix. Defaults to True.
         
         Returns:
             True if successful; None otherwise.
         """
-        n_atoms=len(self.coords)
-        self.kirchhoff = numpy.zeros((n_atoms, n_atoms), float)
-        distance_mat = numpy.ones((n_atoms, n_atoms), float)
-        for i in range(len(self.coords)):
-            diff = self.coords[i+1:, :] - self.coords[i]
-            squared_diff = diff**2
-            for j, s_ij in enumerate(squared_diff.sum(1)):
-                if s_ij <= self.dr**2:
-                    diff_coords = diff[j]
-                    j = j + i + 1
-                    self.kirchhoff[i, j] = - gamma
-                    self.kirchhoff[j, i] = - gamma
-                    self.kirchhoff[i, i] = self.kirchhoff[i, i] + gamma
-                    self.kirchhoff[j, j] = self.kirchhoff[j, j] + gamma
-        
+        self.network = get_network(self.coords, self.dr, share=self.share)
+        self.kirchhoff = self.network.get_kirchhoff(gamma=gamma, sparse=sparse)
         return True
     
-    def calculate_decomposition(self):
-        """Decompose the Hessian Matrix of the ANM model.
+    def calculate_decomposition(self, n_modes=None, method='eigsh', cache=None):
+        """Decompose the Kirchhoff Matrix of the GNM model.
+
+        All the modes are calculated by default. If n_modes is provided, only the trivial (zero) mode and the n_modes slowest non-trivial modes are calculated from the (sparse) Kirchhoff matrix; the trivial mode is still the first one, so the mode indices are the same as for the full decomposition.
         
         Note:
-            Eigen values and Eigen Vectors are calculated. use ANM().get_eigenvalues() and ANM().get_eigenvectors() to obtain them.
+            Eigen values and Eigen Vectors are calculated. use GNM().get_eigenvalues() and GNM().get_eigenvectors() to obtain them.
+
+        Args:
+            n_modes (int, optional): Number of the slowest non-trivial modes to be calculated. Defaults to None (All the modes).
+            method (str, optional) : Partial eigensolver; 'eigsh', 'lobpcg' or 'lapack' (See packman.utilities.partial_eigh). Defaults to 'eigsh'.
+            cache (packman.enm.ModeCache/str, optional): Disk cache of the eigenvalues and eigenvectors (or its directory); read from the cache if available, stored otherwise. Defaults to None (No disk cache).
         """
-        self.eigen_values,self.eigen_vectors=numpy.linalg.eigh(self.kirchhoff)
+        n_atoms = self.kirchhoff.shape[0]
+        self.eigen_values,self.eigen_vectors=self.network.get_decomposition(self.kirchhoff, n_modes=n_modes, method=method, trivial_modes=numpy.full((n_atoms, 1), 1.0/numpy.sqrt(n_atoms)), cache=cache)
         return True
 
     def calculate_fluctuations(self, endmode=None):
-        """Calculate the Fluctuations of the ANM model.
+        """Calculate the Fluctuations of the GNM model.
 
-        The fluctualtions/ theoretical b-factors are calculated using this method.
+        The fluctualtions/ theoretical b-factors are calculated using this method; sum of v_k^2/lambda_k over the non-trivial modes (diagonal of the pseudoinverse without forming it).
         
         Note:
-            - Fluctuations are calculated. use ANM().get_fluctuations() to obtain the fluctuations.
-            - Endmode needs to be put in the code if and when required.
+            - Fluctuations are calculated. use GNM().get_fluctuations() to obtain the fluctuations.
+            - Modes 1 to endmode-1 are used (All the non-trivial modes by default).
+
+        Args:
+            endmode (int, optional): Mode number (exclusive) up to which the fluctuations are calculated. Defaults to None (All the calculated modes).
         """
-        '''
-            inverse=inverse+(float(1)/eigen_values[i])*eigen_vectors[:,i]*eigen_vectors[:,i].transpose()
-        return inverse.diagonal()
-        '''
         #Initiate
         if(endmode==None):
             stop_at = len(self.eigen_values)
@@ -184,25 +208,43 @@ class GNM:
                 stop_at = int(endmode)
             except:
                 logging.warning('Please provide valid input for the "endmode" parameter.')
+                return None
 
-
-        self.pseduinverse = numpy.zeros(shape=(len(self.eigen_values),len(self.eigen_values)))
-        for i in range(1, stop_at):
-            self.pseduinverse = self.pseduinverse + ( (float(1) / self.eigen_values[i])*self.eigen_vectors[:,i]*self.eigen_vectors[:,i].transpose() )
-
-        self.fluctuations = self.pseduinverse.diagonal()
+        self.fluctuations = numpy.dot( self.eigen_vectors[:,1:stop_at]**2 , 1.0/self.eigen_values[1:stop_at] )
         return True
     
-    def calculate_crosscorrelation(self):
+    def calculate_crosscorrelation(self, chunk_size=None, out=None):
         """Calculate the cross-correlation. (Read the paper for more details)
+
+        The cross-correlation is the pseudoinverse of the Kirchhoff matrix (from the non-trivial modes) normalized by its diagonal; C_ij = P_ij/sqrt(P_ii*P_jj).
+
+        Notes:
+            * If chunk_size is provided, the matrix is calculated in the blocks of chunk_size rows, so the working memory besides the output is bounded by chunk_size x N. The pseudoinverse is not stored in that case (GNM().get_pseudoinverse() gives None).
+            * The output can be preallocated by the user (eg... numpy.memmap for very large N)
+
+        Args:
+            chunk_size (int, optional)  : Number of rows calculated at once. Defaults to None (Whole matrix at once).
+            out (numpy.ndarray, optional): N x N array to write the cross-correlation into. Defaults to None (New array).
+
         Returns:
             True if successful; None otherwise.
         """
-        n = len(self.atoms)
-        EVec=self.eigen_vectors.T
-        self.pseduinverse= numpy.matmul( numpy.matmul( EVec[1:].transpose() , numpy.diag(1/self.eigen_values[1:]) ) , EVec[1:] )
-        self.crosscorrelation = numpy.zeros((n , n))
-        for i in range(n):
-            for j in range(n):
-                self.crosscorrelation[i, j] = float(self.pseduinverse[i, j])/numpy.sqrt(self.pseduinverse[i, i]*self.pseduinverse[j, j])        
-        return True
\ No newline at end of file
+        n = len(self.eigen_vectors)
+        EVec = self.eigen_vectors[:,1:]
+        scaled = EVec / self.eigen_values[1:]
+        norm = 1.0 / numpy.sqrt( numpy.einsum('ij,ij->i', scaled, EVec) )
+
+        if(out is None):
+            out = numpy.empty((n, n))
+
+        if(chunk_size is None):
+            self.pseduinverse = numpy.dot(scaled, EVec.T)
+            numpy.multiply( self.pseduinverse, numpy.outer(norm, norm), out=out )
+        else:
+            self.pseduinverse = None
+            for start in range(0, n, int(chunk_size)):
+                stop = min(start+int(chunk_size), n)
+                out[start:stop] = numpy.dot(scaled[start:stop], EVec.T) * norm[start:stop,None] * norm[None,:]
+
+        self.crosscorrelation = out
+        return True
@@ -1,7 +1,10 @@
 from ... import molecule
 from ...anm import ANM, hdANM
+from ... import utilities
 import unittest
 
+import numpy
+
 import logging
 from os import remove as rm
 
@@ -24,12 +27,101 @@ class TestMolecule(unittest.TestCase):
         rm('6.cif')
         rm('6.pdb')
 
+        self.assertTrue( self.Model.calculate_movie([6,7],scale=2,n=8, extrapolation='linear', ftype='pdb') )
+        for i in [6,7]:
+            with open(str(i)+'.pdb') as frames:
+                self.assertEqual( len([j for j in frames if j.startswith('ATOM')]), 9*len(self.calpha) )
+            rm(str(i)+'.pdb')
+
         self.assertIsNotNone( self.Model.get_hessian_pseudoinverse() )
         self.assertIsNotNone( self.Model.get_RT_eigen_vectors() )
 
         #Add corsscorrelation after the publication
         #self.assertIsNotNone( [i for i in self.Model.get_crosscorrelation_matrix()] )
     
+    def test_hdANM_hessian(self):
+        self.Model=hdANM(self.calpha,dr=15,power=0,hng_file='packman/tests/data/1prw.hng')
+        self.assertTrue( self.Model.calculate_hessian() )
+        H_new = self.Model.domain_hessian
+        numpy.testing.assert_allclose( H_new, H_new.T, atol=1e-8 )
+
+        #Hinge-hinge blocks are the ANM hessian blocks; hinge-domain blocks follow the rigid body transformation of the domain atoms
+        n_domains = len(self.Model.domain_info)
+        hinges = [numi for numi,i in enumerate(self.calpha) if i.get_domain_id()[0]=='H']
+        for numi,i in enumerate(hinges[:3]):
+            for numj,j in enumerate(hinges[:3]):
+                numpy.testing.assert_allclose( H_new[6*n_domains+numi*3:6*n_domains+numi*3+3, 6*n_domains+numj*3:6*n_domains+numj*3+3], self.Model.get_hessian_block(i,j), atol=1e-10 )
+        d = list(self.Model.domain_info)[0]
+        numd, COM = self.Model.domain_info[d]
+        expected = numpy.zeros((3,6))
+        for numj,j in enumerate(self.calpha):
+            if(j.get_domain_id()==d):
+                block = self.Model.get_hessian_block(hinges[0],numj)
+                expected[:,0:3] += block
+                expected[:,3:] += numpy.cross( self.Model.coords[numj]-COM, block )
+        numpy.testing.assert_allclose( H_new[6*n_domains:6*n_domains+3, numd*6:numd*6+6], expected, atol=1e-8 )
+
+    def test_hdANM_decomposition(self):
+        self.Model=hdANM(self.calpha,dr=15,power=0,hng_file='packman/tests/data/1prw.hng')
+        self.assertTrue( self.Model.calculate_hessian(mass_type='residue') )
+        H, M = self.Model.domain_hessian, self.Model.domain_mass_matrix.toarray()
+        self.assertTrue( self.Model.calculate_decomposition() )
+        values, vectors = self.Model.get_eigenvalues(), self.Model.get_eigenvectors()
+        self.assertTrue( numpy.isrealobj(values) )
+        self.assertTrue( numpy.all(numpy.diff(values) >= 0) )
+        numpy.testing.assert_allclose( numpy.linalg.norm(vectors, axis=0), 1 )
+        numpy.testing.assert_allclose( H.dot(vectors), M.dot(vectors)*values, atol=1e-6*abs(values).max() )
+
+        self.assertTrue( self.Model.calculate_decomposition(n_modes=5) )
+        numpy.testing.assert_allclose( self.Model.get_eigenvalues(), values[:11], atol=1e-8 )
+        numpy.testing.assert_allclose( abs( numpy.sum(self.Model.get_eigenvectors()[:,6:]*vectors[:,6:11], axis=0) ), 1, atol=1e-6 )
+
+    def test_hdANM_RT_eigen_vectors(self):
+        self.Model=hdANM(self.calpha,dr=15,power=0,hng_file='packman/tests/data/1prw.hng')
+        self.assertTrue( self.Model.calculate_hessian() )
+        self.assertTrue( self.Model.calculate_decomposition() )
+        self.assertTrue( self.Model.calculate_RT_eigen_vectors() )
+        RT, vectors = self.Model.get_RT_eigen_vectors(), self.Model.get_eigenvectors()
+        self.assertEqual( RT.shape, (len(self.calpha)*3, vectors.shape[1]) )
+
+        #Domain atoms follow the domain translation/rotation; hinge atoms are displaced by their own components
+        domain_ids = [i.get_domain_id() for i in self.calpha]
+        numi = domain_ids.index( list(self.Model.domain_info)[0] )
+        numd, COM = self.Model.domain_info[domain_ids[numi]]
+        x, y, z = self.Model.coords[numi]-COM
+        D = vectors[numd*6:numd*6+6, 7]
+        numpy.testing.assert_allclose( RT[numi*3:numi*3+3, 7], D[:3]+numpy.cross(D[3:], [x,y,z]) )
+        numi = [i[0] for i in domain_ids].index('H')
+        numpy.testing.assert_allclose( RT[numi*3:numi*3+3, 7], vectors[6*len(self.Model.domain_info):6*len(self.Model.domain_info)+3, 7] )
+
+        #Eigenvectors are mapped back with the projection of the hdANM hessian
+        numpy.testing.assert_allclose( (self.Model.get_RT_matrix().T @ (self.Model.get_hessian() @ self.Model.get_RT_matrix())).toarray(), self.Model.domain_hessian, atol=1e-10 )
+
+        #Linear movie is the first order of the curvilinear (rigid rotation) movie
+        x0, owners = self.Model.coords, numpy.arange(len(self.calpha))
+        numpy.testing.assert_allclose( self.Model._get_movie_frames(7, 1e-4, 8, 'linear', x0, owners), self.Model._get_movie_frames(7, 1e-4, 8, 'curvilinear', x0, owners), atol=1e-8 )
+
+        self.assertTrue( self.Model.calculate_RT_eigen_vectors(start_mode=6, end_mode=10) )
+        numpy.testing.assert_allclose( self.Model.get_RT_eigen_vectors(), RT[:,6:10] )
+        self.assertTrue( self.Model.calculate_fluctuations() )
+        self.assertEqual( len(self.Model.get_fluctuations()), len(self.calpha) )
+
+    def test_hdANM_crosscorrelation(self):
+        self.Model=hdANM(self.calpha,dr=15,power=0,hng_file='packman/tests/data/1prw.hng')
+        self.assertTrue( self.Model.calculate_hessian() )
+        self.assertTrue( self.Model.calculate_decomposition() )
+        self.assertTrue( self.Model.calculate_fluctuations() )
+        self.assertTrue( self.Model.calculate_cross_correlation() )
+        pseudoinverse = self.Model.get_hessian_pseudoinverse()
+        traces = numpy.array([ [ numpy.trace(pseudoinverse[i*3:i*3+3,j*3:j*3+3]) for j in range(0,len(self.calpha),10) ] for i in range(0,len(self.calpha),10) ])
+        numpy.testing.assert_allclose( self.Model.get_fluctuations()[::10], numpy.diag(traces) )
+        expected = traces / numpy.sqrt( numpy.outer(numpy.diag(traces), numpy.diag(traces)) )
+        numpy.testing.assert_allclose( self.Model.get_crosscorrelation_matrix()[::10,::10], expected, atol=1e-12 )
+
+        full = self.Model.get_crosscorrelation_matrix().copy()
+        self.assertTrue( self.Model.calculate_cross_correlation(chunk_size=16) )
+        numpy.testing.assert_allclose( self.Model.get_crosscorrelation_matrix(), full, atol=1e-12 )
+
     def test_ANM_Compliance(self):
         self.ANM_MODEL = ANM(self.calpha)
 
@@ -45,6 +137,70 @@ class TestMolecule(unittest.TestCase):
         self.assertIsNotNone( self.ANM_MODEL.get_stiffness_profile() )
         self.assertIsNotNone( self.ANM_MODEL.get_compliance_profile() )
 
+    def test_ANM_hessian(self):
+        self.ANM_MODEL = ANM(self.calpha, gamma=2.0, power=1)
+        self.assertTrue( self.ANM_MODEL.calculate_hessian() )
+        hessian = self.ANM_MODEL.get_hessian()
+        self.assertEqual( hessian.format, 'bsr' )
+        self.assertTrue( self.ANM_MODEL.calculate_hessian(sparse=False) )
+        numpy.testing.assert_allclose( self.ANM_MODEL.get_hessian(), hessian.toarray() )
+        numpy.testing.assert_allclose( hessian.toarray(), hessian.toarray().T )
+        #Rigid body motions do not cost energy
+        numpy.testing.assert_allclose( hessian.dot( utilities.rigid_body_modes(self.ANM_MODEL.coords) ), 0, atol=1e-10 )
+        #Single contact super-element
+        i, j = 0, 1
+        diff = self.ANM_MODEL.coords[j]-self.ANM_MODEL.coords[i]
+        numpy.testing.assert_allclose( hessian.toarray()[0:3,3:6], -2.0*numpy.outer(diff,diff)/numpy.linalg.norm(diff)**3 )
+        #Parameter free model divides every spring by the distance
+        PF_MODEL = ANM(self.calpha, gamma=2.0, power=0, pf=1)
+        PF_MODEL.calculate_hessian()
+        numpy.testing.assert_allclose( PF_MODEL.get_hessian().toarray(), hessian.toarray(), atol=1e-12 )
+
+    def test_ANM_stiffness_compliance(self):
+        self.ANM_MODEL = ANM(self.calpha)
+        self.ANM_MODEL.calculate_hessian()
+        self.ANM_MODEL.calculate_decomposition()
+        self.assertTrue( self.ANM_MODEL.calculate_stiffness_compliance(chunk_size=40) )
+        compliance_map = self.ANM_MODEL.get_compliance_map()
+        numpy.testing.assert_allclose( compliance_map, compliance_map.T )
+        #Displacement under the unit pulling forces
+        G = numpy.linalg.pinv( self.ANM_MODEL.get_hessian().toarray(), hermitian=True )
+        for i, j in [(0,5),(10,70),(98,3)]:
+            F = numpy.zeros((len(self.calpha),3))
+            F[j] = (self.ANM_MODEL.coords[j]-self.ANM_MODEL.coords[i])/numpy.linalg.norm(self.ANM_MODEL.coords[j]-self.ANM_MODEL.coords[i])
+            F[i] = -F[j]
+            self.assertAlmostEqual( compliance_map[i,j], numpy.dot(F.ravel(), numpy.dot(G, F.ravel())) )
+            self.assertAlmostEqual( self.ANM_MODEL.get_stiffness_map()[i,j], 1/compliance_map[i,j] )
+        self.assertTrue( self.ANM_MODEL.calculate_stiffness_compliance(pairs=[(0,5),(98,3)]) )
+        self.assertAlmostEqual( self.ANM_MODEL.get_compliance_map()[5,0], compliance_map[0,5] )
+        self.assertAlmostEqual( self.ANM_MODEL.get_compliance_map()[98,3], compliance_map[98,3] )
+        self.assertEqual( self.ANM_MODEL.get_compliance_map().nnz, 4 )
+
+    def test_ANM_fluctuations(self):
+        self.ANM_MODEL = ANM(self.calpha)
+        self.ANM_MODEL.calculate_hessian()
+        self.ANM_MODEL.calculate_decomposition()
+        self.assertTrue( self.ANM_MODEL.calculate_fluctuations() )
+        G = numpy.linalg.pinv( self.ANM_MODEL.get_hessian().toarray(), hermitian=True )
+        blocks = numpy.array( [G[i*3:i*3+3, i*3:i*3+3] for i in range(len(self.calpha))] )
+        numpy.testing.assert_allclose( self.ANM_MODEL.get_anisotropic_fluctuations(), blocks, atol=1e-10 )
+        numpy.testing.assert_allclose( self.ANM_MODEL.get_fluctuations(), numpy.trace(blocks, axis1=1, axis2=2), atol=1e-10 )
+        #Slowest mode only
+        self.assertTrue( self.ANM_MODEL.calculate_fluctuations(endmode=7) )
+        mode = self.ANM_MODEL.get_eigenvectors()[:,6].reshape(-1,3)
+        numpy.testing.assert_allclose( self.ANM_MODEL.get_fluctuations(), numpy.sum(mode**2, axis=1)/self.ANM_MODEL.get_eigenvalues()[6] )
+
+    def test_ANM_partial_decomposition(self):
+        self.ANM_MODEL = ANM(self.calpha)
+        self.ANM_MODEL.calculate_hessian()
+        self.ANM_MODEL.calculate_decomposition()
+        eigen_values = self.ANM_MODEL.get_eigenvalues()
+        for method in ['eigsh','lobpcg','lapack']:
+            self.assertTrue( self.ANM_MODEL.calculate_decomposition(n_modes=10, method=method) )
+            self.assertEqual( self.ANM_MODEL.get_eigenvectors().shape, (3*len(self.calpha), 16) )
+            numpy.testing.assert_allclose( self.ANM_MODEL.get_eigenvalues(), eigen_values[:16], atol=1e-8 )
+        self.assertTrue( self.ANM_MODEL.calculate_fluctuations() )
+
     def tearDown(self):
         logging.info('ANM, hdANM and Compliance Test Done.')
 
@@ -0,0 +1,88 @@
+from ... import molecule
+from ...molecule import Hinge
+from ...apps import scan_hinges, merge_hinges
+from ...apps.scan_hinges import get_hng_lines, hinge_scan_cli
+from ...apps import hinge_cli
+from ...apps.predict_hinge import find_identical_chains
+import unittest
+
+import io
+import argparse
+
+import numpy
+
+import logging
+
+class TestApps(unittest.TestCase):
+
+    def setUp(self):
+        self.mol = molecule.load_structure('packman/tests/data/4hla.cif',ftype='cif')
+
+    def test_merge_hinges(self):
+        residues = [i for i in self.mol[0]['A'].get_residues()]
+        def get_hinge(first, last, p):
+            return Hinge(0, 1.0, [i for i in residues if first <= i.get_id() <= last], [], p)
+        hinges = [get_hinge(10,20,0.01), get_hinge(18,25,0.01), get_hinge(24,30,0.04), get_hinge(50,60,0.01), get_hinge(55,65,0.5), get_hinge(80,90,0.01), get_hinge(85,95,0.02)]
+        self.assertEqual( merge_hinges(hinges), [[10,30],[80,95]] )
+        self.assertEqual( get_hng_lines([[10,30],[80,95]], '4hla_A'), ['4hla_A\tD1\t1:9\n', '4hla_A\tH1\t10:30\n', '4hla_A\tD2\t31:79\n', '4hla_A\tH2\t80:95\n', '4hla_A\tD3\t96:Inf\n'] )
+
+    def test_scan_hinges(self):
+        backbone = [j for i in self.mol[0]['A'].get_backbone() for j in i if j is not None]
+        hinges = scan_hinges( backbone, [0.0, 2.8, 3.0, 4.5], workers=2 )
+        self.assertEqual( hinges, sorted(hinges) )
+        for first, last in hinges:
+            self.assertLessEqual( first, last )
+
+    def test_hinge_scan_cli(self):
+        #Output name keeps the whole stem of the filename
+        args = argparse.Namespace(begin=2.5, end=5.0, step_size=0.5, filename='data/my.4hla.cif', chain='A', workers=1, minhnglen=5, e_clusters=4, outputfile=io.StringIO(), logfile=io.StringIO())
+        self.assertTrue( hinge_scan_cli(args, self.mol) )
+        lines = args.outputfile.getvalue().splitlines()
+        self.assertGreater( len(lines), 0 )
+        self.assertTrue( all(i.startswith('my.4hla_A\t') for i in lines) )
+
+    def test_find_identical_chains(self):
+        backbone_A = [j for i in self.mol[0]['A'].get_backbone() for j in i if j is not None]
+        backbone_B = [j for i in self.mol[0]['B'].get_backbone() for j in i if j is not None]
+        copy = molecule.load_structure('packman/tests/data/4hla.cif',ftype='cif')
+        backbone_C = [j for i in copy[0]['A'].get_backbone() for j in i if j is not None]
+        #Rigid body motion of the copy of the chain A
+        theta = 0.7
+        R = numpy.array([[numpy.cos(theta),-numpy.sin(theta),0],[numpy.sin(theta),numpy.cos(theta),0],[0,0,1]])
+        for i in backbone_C:
+            i.set_location( numpy.dot(R, i.get_location()) + numpy.array([5.0,-3.0,12.0]) )
+        self.assertEqual( find_identical_chains([backbone_A, backbone_B, backbone_C]), [0,1,0] )
+
+        #NCS-like copy (about 0.3 Angstrom RMSD) is only reused with the larger cutoff
+        rng = numpy.random.RandomState(0)
+        for i in backbone_C:
+            i.set_location( i.get_location() + rng.normal(0, 0.17, 3) )
+        self.assertEqual( find_identical_chains([backbone_A, backbone_C]), [0,1] )
+        self.assertEqual( find_identical_chains([backbone_A, backbone_C], rmsd_cutoff=0.5), [0,0] )
+
+    def test_hinge_cli(self):
+        def run(workers, alpha):
+            mol = molecule.load_structure('packman/tests/data/4hla.cif',ftype='cif')
+            args = argparse.Namespace(chain=None, outputfile=io.StringIO(), alpha=alpha, filename='4hla.cif', e_clusters=4, minhnglen=5, generateobj=None, workers=workers, reuse_identical=True, identical_rmsd=0.1, logfile=io.StringIO())
+            hinge_cli(args, mol)
+            hinges = [ [(i.get_id(), [j.get_id() for j in i.get_elements()], i.get_pvalue()) for i in chain.get_hinges()] for chain in mol[0].get_chains() ]
+            domains = [ [i.get_domain_id() for i in chain.get_residues()] for chain in mol[0].get_chains() ]
+            return args.outputfile.getvalue(), hinges, domains
+
+        #Whole prediction in the process pool gives the same reports, hinges and domains as the serial one
+        serial = run(1, 2.8)
+        self.assertGreater( len(serial[1][0]), 0 )
+        self.assertEqual( run(2, 2.8), serial )
+
+        #Disconnected alpha shape graph; chains are reported as warnings only
+        with self.assertLogs(level='WARNING') as logs:
+            report, hinges, _ = run(2, 0.5)
+        self.assertTrue( any('disconnected' in i for i in logs.output) )
+        self.assertNotIn( 'Hinge #', report )
+        self.assertEqual( hinges, [[] for i in hinges] )
+
+    def tearDown(self):
+        logging.info('Apps Test Done.')
+
+if(__name__=='__main__'):
+    unittest.main()
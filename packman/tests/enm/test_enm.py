@@ -0,0 +1,173 @@
+from ... import molecule
+from ...gnm import GNM
+from ...anm import ANM
+from ...enm import CrossCorrelation, ModeCache, EnsembleENM, get_network, clear_networks
+from ...enm import engine
+import unittest
+
+import numpy
+import logging
+import tempfile
+from unittest import mock
+from os import path
+
+class TestENM(unittest.TestCase):
+
+    def setUp(self):
+        self.mol = molecule.load_structure('packman/tests/data/4hla.cif',ftype='cif')
+        self.calpha = [i for i in self.mol[0]['A'].get_calpha() if i is not None]
+
+    def test_CrossCorrelation(self):
+        Model = GNM(self.calpha)
+        Model.calculate_kirchhoff()
+        Model.calculate_decomposition()
+        Model.calculate_crosscorrelation()
+        reference = Model.get_crosscorrelation()
+
+        operator = Model.get_crosscorrelation_operator(dtype=numpy.float64)
+        self.assertIsInstance( operator, CrossCorrelation )
+        numpy.testing.assert_allclose( operator.get_rows(7), reference[7], atol=1e-12 )
+        numpy.testing.assert_allclose( operator.get_block([1,4],[2,3,9]), reference[[1,4]][:,[2,3,9]], atol=1e-12 )
+        numpy.testing.assert_allclose( operator.get_fluctuations(), numpy.diag(Model.get_pseudoinverse()) )
+
+        indices, values = operator.get_top_partners(k=5, chunk_size=64)
+        self.assertNotIn( 0, indices[0] )
+        numpy.testing.assert_allclose( values, numpy.take_along_axis(reference, indices, axis=1), atol=1e-12 )
+        self.assertTrue( numpy.all( numpy.diff(numpy.abs(values), axis=1) <= 1e-12 ) )
+
+        filename = path.join( tempfile.mkdtemp(), 'crosscorrelation.npy' )
+        operator = Model.get_crosscorrelation_operator()
+        operator.get_matrix(filename=filename, chunk_size=64)
+        self.assertEqual( numpy.load(filename, mmap_mode='r').dtype, numpy.float32 )
+        numpy.testing.assert_allclose( numpy.load(filename), reference, atol=1e-5 )
+
+    def test_ANM_CrossCorrelation(self):
+        Model = ANM(self.calpha)
+        Model.calculate_hessian()
+        Model.calculate_decomposition()
+        operator = Model.get_crosscorrelation_operator(n_modes=20, dtype=numpy.float64)
+        EVec = Model.get_eigenvectors()[:,6:26]
+        pseudoinverse = numpy.dot( EVec/Model.get_eigenvalues()[6:26], EVec.T ).reshape(len(self.calpha),3,len(self.calpha),3).trace(axis1=1, axis2=3)
+        diagonal = numpy.sqrt(numpy.diag(pseudoinverse))
+        numpy.testing.assert_allclose( operator.get_matrix(), pseudoinverse/numpy.outer(diagonal, diagonal), atol=1e-12 )
+
+    def test_ElasticNetwork(self):
+        clear_networks()
+        coords = numpy.array([i.get_location() for i in self.calpha])
+        network = get_network(coords, 7.3)
+        self.assertIs( get_network(coords.copy(), 7.3), network )
+        self.assertIsNot( get_network(coords, 8.0), network )
+
+        #Contacts, matrices and eigenbasis are calculated once and shared by the models
+        Model1, Model2 = GNM(self.calpha, share=True), GNM(self.calpha, share=True)
+        Model1.calculate_kirchhoff()
+        Model1.calculate_decomposition()
+        Model2.calculate_kirchhoff()
+        Model2.calculate_decomposition(n_modes=5)
+        self.assertIs( Model1.get_kirchhoff(), Model2.get_kirchhoff() )
+        numpy.testing.assert_allclose( Model2.get_eigenvalues(), Model1.get_eigenvalues()[:6] )
+        self.assertFalse( Model1.get_eigenvectors().flags.writeable )
+
+        pairs, diff, distance = network.get_contacts()
+        self.assertTrue( numpy.all(distance <= 7.3) )
+        self.assertEqual( Model1.get_kirchhoff().nnz, 2*len(pairs)+len(coords) )
+
+        #Hessian of the ANM and hdANM (power 0) is the same matrix
+        Model3 = ANM(self.calpha, share=True)
+        Model3.calculate_hessian()
+        self.assertIs( Model3.get_hessian(), get_network(coords, 15.0).get_hessian() )
+        self.assertIsNot( get_network(coords, 15.0).get_hessian(power=1), Model3.get_hessian() )
+
+        #Models are private (writable arrays) by default
+        Model4 = GNM(self.calpha)
+        Model4.calculate_kirchhoff(sparse=False)
+        Model4.calculate_decomposition()
+        self.assertIsNot( Model4.get_kirchhoff(), get_network(coords, 7.3).get_kirchhoff(sparse=False) )
+        Model4.get_eigenvectors()[:,0] *= -1
+        Model4.get_kirchhoff()[0,0] += 1.0
+        numpy.testing.assert_allclose( Model4.get_eigenvalues(), Model1.get_eigenvalues() )
+
+        #Shared networks are dropped (least recently used first) beyond the size limit
+        with mock.patch.object(engine, 'NETWORK_CACHE_BYTES', network.get_size()):
+            get_network(coords, 15.0).get_hessian(power=2)
+            self.assertNotIn( network, engine._networks.values() )
+            self.assertIs( get_network(coords, 15.0), list(engine._networks.values())[-1] )
+        clear_networks()
+
+    def test_ModeCache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            clear_networks()
+            Model = ANM(self.calpha)
+            Model.calculate_hessian()
+            Model.calculate_decomposition(cache=directory)
+            values, vectors = numpy.array(Model.get_eigenvalues()), numpy.array(Model.get_eigenvectors())
+
+            #Read-through from the disk (memory-mapped) once the in-memory networks are released
+            clear_networks()
+            Model = ANM(self.calpha)
+            Model.calculate_hessian()
+            Model.calculate_decomposition(cache=ModeCache(directory))
+            self.assertIsInstance( Model.get_eigenvectors(), numpy.memmap )
+            numpy.testing.assert_allclose( Model.get_eigenvalues(), values )
+            numpy.testing.assert_allclose( Model.get_eigenvectors(), vectors )
+            clear_networks()
+
+            #Different parameters are different entries; least recently used entry is removed first
+            cache = ModeCache(path.join(directory, 'small'), max_size=3*vectors.nbytes//2)
+            key1, key2 = cache.get_key(Model.coords, model='ANM', gamma=1.0), cache.get_key(Model.coords, model='ANM', gamma=2.0)
+            self.assertNotEqual( key1, key2 )
+            cache.save(key1, values, vectors)
+            cache.save(key2, values, vectors)
+            self.assertIsNone( cache.load(key1) )
+            self.assertIsNotNone( cache.load(key2) )
+
+    def test_EnsembleENM(self):
+        #Small perturbations of the structure as the frames
+        coords = numpy.array([i.get_location() for i in self.calpha])
+        rng = numpy.random.RandomState(0)
+        frames = [coords] + [coords + rng.normal(0, 0.05, coords.shape) for i in range(3)]
+
+        for model, dim, method in [('GNM', 1, 'lobpcg'), ('ANM', 3, 'lobpcg'), ('ANM', 3, 'eigsh')]:
+            Ensemble = EnsembleENM(frames, model=model, n_modes=5)
+            Ensemble.calculate_modes(method=method)
+            self.assertEqual( Ensemble.get_eigenvectors().shape, (4, dim*len(coords), 5) )
+            for coords_f, values in zip(frames, Ensemble.get_eigenvalues()):
+                if(model == 'GNM'):
+                    matrix = get_network(coords_f, 7.3).get_kirchhoff(sparse=False)
+                    n_trivial = 1
+                else:
+                    matrix = get_network(coords_f, 15.0).get_hessian(sparse=False)
+                    n_trivial = 6
+                numpy.testing.assert_allclose( values, numpy.linalg.eigvalsh(matrix)[n_trivial:n_trivial+5], rtol=1e-5, atol=1e-8 )
+            #Slow modes hardly change between the frames
+            self.assertTrue( numpy.all( numpy.diagonal(Ensemble.get_overlaps(), axis1=1, axis2=2) > 0.9 ) )
+            self.assertTrue( Ensemble.get_topology_changes()[0] )
+        clear_networks()
+
+        #Many modes (small gaps between the last modes) over many frames; warm start must not give the wrong modes
+        coords = numpy.array([i.get_location() for i in self.mol[0].get_calpha() if i is not None])
+        rng = numpy.random.RandomState(0)
+        frames = [coords] + [coords + rng.normal(0, 0.05, coords.shape) for i in range(7)]
+        for method in ['eigsh', 'lobpcg']:
+            Ensemble = EnsembleENM(frames, n_modes=20)
+            Ensemble.calculate_modes(method=method)
+            for coords_f, values in zip(frames, Ensemble.get_eigenvalues()):
+                reference = numpy.linalg.eigvalsh( get_network(coords_f, 7.3).get_kirchhoff(sparse=False) )[1:21]
+                numpy.testing.assert_allclose( values, reference, rtol=1e-6 )
+
+        #Models of the 'Protein' object as the frames
+        for chain, calpha in [(None, coords), ('A', numpy.array([i.get_location() for i in self.calpha]))]:
+            Ensemble = EnsembleENM(self.mol, n_modes=5, chain=chain)
+            Ensemble.calculate_modes()
+            self.assertEqual( len(Ensemble.get_eigenvalues()), len(next(self.mol.get_models())) )
+            numpy.testing.assert_allclose( Ensemble.get_eigenvalues()[0], numpy.linalg.eigvalsh( get_network(calpha, 7.3).get_kirchhoff(sparse=False) )[1:6], rtol=1e-6 )
+        clear_networks()
+
+        with self.assertRaises(ValueError):
+            EnsembleENM([coords, coords[:-1]])
+
+    def tearDown(self):
+        logging.info('ENM Test Done.')
+
+if(__name__=='__main__'):
+    unittest.main()
@@ -2,6 +2,8 @@ from networkx.utils.misc import flatten
 from ... import molecule
 from ... import geometry
 import unittest
+import numpy
+import networkx
 
 import logging
 from os import remove as rm
@@ -17,10 +19,57 @@ class TestGeometry(unittest.TestCase):
         self.assertIsInstance( geometry.Circumsphere( [i for i in self.mol[0].get_atoms()][:4] )[0][2], float )
         self.assertIsInstance( geometry.Circumsphere( [i for i in self.mol[0].get_atoms()][:4] )[1], float )
 
+    def test_Circumspheres(self):
+        atoms = [i for i in self.mol[0].get_atoms()][:8]
+        simplices = [[0,1,2,3],[4,5,6,7],[1,3,5,7]]
+        Centres, Radii = geometry.Circumspheres( [i.get_location() for i in atoms], simplices )
+        self.assertEqual( Centres.shape, (3,3) )
+        for numi,i in enumerate(simplices):
+            self.assertAlmostEqual( Radii[numi], geometry.Circumsphere( [atoms[j] for j in i] )[1] )
+            for j in i:
+                self.assertAlmostEqual( Radii[numi], numpy.linalg.norm(atoms[j].get_location()-Centres[numi]) )
+
     def test_AlphaShape(self):
         #Checked only one instance of the atom
         self.assertIsInstance( geometry.AlphaShape( [j for i in self.mol[0].get_backbone() for j in i], 4 )[0][0], molecule.Atom )
+        alpha_shape, graph = geometry.AlphaShape( [j for i in self.mol[0].get_backbone() for j in i], 4, get_graph=True )
+        self.assertEqual( len(graph.edges()), len(geometry.SimplexEdges( [[k.get_id() for k in j] for j in alpha_shape] )) )
+        
+    def test_AlphaFiltration(self):
+        backbone = [j for i in self.mol[0]['A'].get_backbone() for j in i]
+        filtration = geometry.AlphaFiltration( backbone )
+        def get_edges(graph):
+            return set( tuple(sorted(i)) for i in graph.edges() )
+        for alpha, graph in filtration.sweep( [2.8, 4.5, float('Inf')] ):
+            alpha_shape, alpha_graph = geometry.AlphaShape( backbone, alpha, get_graph=True )
+            self.assertEqual( len(filtration.get_alpha_shape(alpha)), len(alpha_shape) )
+            self.assertEqual( get_edges(graph), get_edges(alpha_graph) )
+            self.assertEqual( get_edges(filtration.get_graph(alpha)), get_edges(alpha_graph) )
         
+    def test_Eccentricity(self):
+        backbone = [j for i in self.mol[0]['A'].get_backbone() for j in i]
+        filtration = geometry.AlphaFiltration( backbone )
+        graph = filtration.get_graph( 4.5 )
+        reference = networkx.eccentricity( graph )
+        self.assertEqual( geometry.Eccentricity( graph ), reference )
+        self.assertEqual( geometry.Eccentricity( graph, method='bfs', chunk_size=100 ), reference )
+        self.assertEqual( geometry.Eccentricity( filtration.get_edges( 4.5 ) ), reference )
+        with self.assertRaises( networkx.NetworkXError ):
+            geometry.Eccentricity( filtration.get_graph( 1.5 ) )
+        
+    def test_LeastSquarePlanes(self):
+        backbone = [j for i in self.mol[0]['A'].get_backbone() for j in i]
+        coords = numpy.array( [i.get_location() for i in backbone] )
+        #Degenerate hinges (2 atoms, collinear atoms and points in a vertical plane) still get the (minimum norm) plane
+        line = coords[0] + numpy.outer( numpy.arange(5), [1.0, 2.0, 3.0] )
+        vertical = numpy.column_stack( (coords[:6,0], 2*coords[:6,0]+1, coords[:6,2]) )
+        point_sets = [coords[:20], coords[100:157], coords[300:304], coords[40:42], line, vertical]
+        planes = geometry.LeastSquarePlanes( point_sets )
+        self.assertEqual( planes.shape, (6,3) )
+        for numi,i in enumerate(point_sets):
+            reference = numpy.linalg.lstsq( numpy.column_stack( (i[:,0], i[:,1], numpy.ones(len(i))) ), i[:,2], rcond=None )[0]
+            numpy.testing.assert_allclose( planes[numi], reference, rtol=1e-6, atol=1e-8 )
+
     def tearDown(self):
         logging.info('Molecule Test Done.')
 
@@ -2,6 +2,8 @@ from ... import molecule
 from ...gnm import GNM
 import unittest
 
+import numpy
+
 import logging
 from os import remove as rm
 
@@ -26,6 +28,43 @@ class TestMolecule(unittest.TestCase):
         self.assertIsNotNone( self.Model.get_fluctuations )
         self.assertIsNotNone( self.Model.get_pseudoinverse )
 
+    def test_kirchhoff(self):
+        self.Model=GNM(self.calpha,gamma=1,dr=7.3,power=1)
+        self.assertTrue( self.Model.calculate_kirchhoff(gamma=2.0) )
+        kirchhoff = self.Model.get_kirchhoff()
+        self.assertEqual( kirchhoff.format, 'csr' )
+        numpy.testing.assert_allclose( kirchhoff.sum(1), 0 )
+        #Contacts from the pairwise distances
+        distances = numpy.linalg.norm( self.Model.coords[:,None,:]-self.Model.coords[None,:,:], axis=2 )
+        contacts  = (distances <= 7.3) & ~numpy.eye(len(self.calpha), dtype=bool)
+        numpy.testing.assert_array_equal( kirchhoff.toarray() != 0 , contacts | numpy.eye(len(self.calpha), dtype=bool) )
+        self.assertTrue( self.Model.calculate_kirchhoff(gamma=2.0, sparse=False) )
+        numpy.testing.assert_allclose( self.Model.get_kirchhoff(), kirchhoff.toarray() )
+        numpy.testing.assert_allclose( numpy.diag(self.Model.get_kirchhoff()), 2.0*contacts.sum(1) )
+
+    def test_crosscorrelation(self):
+        self.Model=GNM(self.calpha,gamma=1,dr=7.3,power=1)
+        self.Model.calculate_kirchhoff()
+        self.Model.calculate_decomposition()
+        self.assertTrue( self.Model.calculate_crosscorrelation() )
+        crosscorrelation, pseudoinverse = self.Model.get_crosscorrelation(), self.Model.get_pseudoinverse()
+        numpy.testing.assert_allclose( numpy.diag(crosscorrelation), 1 )
+        self.assertTrue( self.Model.calculate_fluctuations() )
+        numpy.testing.assert_allclose( self.Model.get_fluctuations(), numpy.diag(pseudoinverse) )
+        numpy.testing.assert_allclose( pseudoinverse, numpy.linalg.pinv(self.Model.get_kirchhoff().toarray()), atol=1e-8 )
+        self.assertTrue( self.Model.calculate_crosscorrelation(chunk_size=50) )
+        numpy.testing.assert_allclose( self.Model.get_crosscorrelation(), crosscorrelation, atol=1e-12 )
+
+    def test_partial_decomposition(self):
+        self.Model=GNM(self.calpha,gamma=1,dr=7.3,power=1)
+        self.Model.calculate_kirchhoff()
+        self.Model.calculate_decomposition()
+        eigen_values, eigen_vectors = self.Model.get_eigenvalues(), self.Model.get_eigenvectors()
+        for method in ['eigsh','lobpcg','lapack']:
+            self.assertTrue( self.Model.calculate_decomposition(n_modes=10, method=method) )
+            self.assertEqual( self.Model.get_eigenvectors().shape, (len(self.calpha), 11) )
+            numpy.testing.assert_allclose( self.Model.get_eigenvalues(), eigen_values[:11], atol=1e-8 )
+            numpy.testing.assert_allclose( numpy.abs(numpy.sum(self.Model.get_eigenvectors()[:,1:]*eigen_vectors[:,1:11], 0)), 1, atol=1e-6 )
 
     def tearDown(self):
         logging.info('GNM test Done.')
@@ -0,0 +1,63 @@
+from ... import utilities
+import unittest
+
+import numpy
+import logging
+
+class TestUtilities(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.RandomState(0)
+        self.x = rng.normal(1.0, 1.0, 40)
+        self.y = rng.normal(0.0, 1.0, 300)
+
+    def test_permutation_test(self):
+        p_value = utilities.permutation_test( self.x, self.y, num_rounds=2000 )
+        self.assertEqual( p_value, utilities.permutation_test( self.x, self.y, num_rounds=2000 ) )
+        self.assertAlmostEqual( p_value, 1.0/2001 )
+        self.assertGreater( utilities.permutation_test( numpy.arange(0,100,2), numpy.arange(1,100,2), num_rounds=2000 ), 0.05 )
+        self.assertGreater( utilities.permutation_test( numpy.arange(0,100,2), numpy.arange(1,100,2), num_rounds=2000, early_stop=True ), 0.05 )
+        #Clearly significant difference is decided with the first batch
+        self.assertAlmostEqual( utilities.permutation_test( self.x, self.y, early_stop=True ), 1.0/1001 )
+
+    def test_kmeans_1d(self):
+        values = [9,1,2,9,10,1,5,6,5,2,10]
+        labels, centres = utilities.kmeans_1d( values, 3 )
+        numpy.testing.assert_allclose( centres, [1.5, 5.333333333333333, 9.5] )
+        self.assertEqual( labels.tolist(), [2,0,0,2,2,0,1,1,1,0,2] )
+        labels, centres = utilities.kmeans_1d( [3,3,7], 4 )
+        self.assertEqual( labels.tolist(), [0,0,1] )
+        self.assertEqual( centres.tolist(), [3.0, 7.0] )
+
+    def test_hinge_index(self):
+        HNGinfo = {'my_protein.pdb_A_D1':[1.0,70.0], 'my_protein.pdb_A_H1':[70.0,90.0], 'my_protein.pdb_A_D2':[91.0,float('Inf')], 'my_protein.pdb_B_D1':[5.0,10.0]}
+        index = utilities.get_hinge_index(HNGinfo)
+        self.assertEqual( sorted(index.keys()), ['A','B'] )
+        labels = utilities.get_domain_labels( index, ['A','A','A','A','A','B','B','C'], [0,1,70,90,500,10,11,5] )
+        self.assertEqual( labels, [None,'D1','H1','H1','D2','D1',None,None] )
+
+        hinges = utilities.load_hinges(['packman/tests/data/1prw.hng'])
+        self.assertEqual( hinges['packman/tests/data/1prw.hng'], utilities.load_hinge('packman/tests/data/1prw.hng') )
+
+    def test_cut_dendrogram(self):
+        from scipy.cluster.hierarchy import ward, fcluster
+        rng = numpy.random.RandomState(1)
+        #Rounded data has the tied merge heights
+        for data in [rng.normal(size=(40,4)), numpy.round(rng.normal(size=(30,3)))]:
+            Z = ward(data)
+            counts = range(2, len(data))
+            labels = utilities.cut_dendrogram( Z, counts )
+            scores = utilities.calinski_harabasz_scores( data, Z, counts )
+            for k in counts:
+                self.assertEqual( labels[k].tolist(), fcluster(Z, k, criterion='maxclust').tolist() )
+                centroids = numpy.array([ data[labels[k]==i].mean(0) for i in range(1, labels[k].max()+1) ])
+                within  = numpy.sum( (data-centroids[labels[k]-1])**2 )
+                between = numpy.sum( (centroids[labels[k]-1]-data.mean(0))**2 )
+                if(within > 0):
+                    self.assertAlmostEqual( scores[k] / (between*(len(data)-len(centroids))/(within*(len(centroids)-1))), 1.0 )
+
+    def tearDown(self):
+        logging.info('Utilities Test Done.')
+
+if(__name__=='__main__'):
+    unittest.main()
@@ -4,8 +4,14 @@
 """
 
 import logging
+import warnings
 import numpy
 
+from scipy.linalg import eigh
+from scipy.stats import beta
+from scipy.sparse import issparse, diags
+from scipy.sparse.linalg import eigsh, lobpcg
+
 def superimporse(reference,target,use='calpha',ids=[],change_target=True):
     """This function is used to superimpose the Target Chain(coordinates will be changed) on the Reference Chain(coordinates will change).
 
@@ -142,9 +148,399 @@ def load_hinge(filename):
     HNGinfo={}
     for i in open(filename):
         line=i.strip().split('\t')
+        if(len(line) < 3):
+            continue
         HNGinfo[ line[0]+'_'+line[1] ]=[float(j) for j in line[2].split(':')]
     return HNGinfo
 
+def load_hinges(filenames):
+    """Load the hinge information of many .hng files at once (eg... for the high-throughput hdANM runs).
+
+    The loaded information can be given to the hdANM instead of the .hng filename. (See load_hinge)
+
+    Args:
+        filenames ([string]) : filepaths and names of the .hng files
+
+    Returns:
+        dictionary: HNGinfo (See load_hinge) with the filename as a key.
+    """
+    return {i: load_hinge(i) for i in filenames}
+
+def get_hinge_index(HNGinfo):
+    """Build the per-chain sorted interval index of the hinge and domain information.
+
+    Residue ranges of each chain are split into the sorted non-overlapping segments at all the range boundaries and each segment is labelled with the domain/hinge ID covering it. If the ranges overlap, the later record in the .hng file is used (eg... 1EXR example in the load_hinge; residue 70 is the part of H1).
+
+    Notes:
+        * Keys of the HNGinfo are split from the right (Filename_ChainID_Domain/HingeId), so the filename may contain '_'.
+        * The ranges are inclusive; segment k is [boundaries[k], boundaries[k+1]).
+
+    Args:
+        HNGinfo (dictionary) : residue based hinge and domain information. (See load_hinge)
+
+    Returns:
+        dictionary: (boundaries (numpy.ndarray), labels ([str/None])) with the chain ID as a key; label of the segment not covered by any range is None.
+    """
+    records = {}
+    for i in HNGinfo:
+        _, chain, label = i.rsplit('_', 2)
+        records.setdefault(chain, []).append( (HNGinfo[i][0], HNGinfo[i][1], label.strip()) )
+
+    index = {}
+    for chain in records:
+        starts = numpy.array([i[0] for i in records[chain]], dtype=float)
+        ends = numpy.nextafter( numpy.array([i[1] for i in records[chain]], dtype=float), numpy.inf )
+        boundaries = numpy.unique( numpy.concatenate((starts, ends)) )
+        #Later records overwrite the earlier ones (same as assigning the records one by one)
+        owner = numpy.full(len(boundaries), -1)
+        for numi,(start,end) in enumerate(zip(starts, ends)):
+            owner[(boundaries >= start) & (boundaries < end)] = numi
+        index[chain] = (boundaries, [records[chain][i][2] if i >= 0 else None for i in owner])
+    return index
+
+def get_domain_labels(index, chains, residue_ids):
+    """Domain/hinge IDs of many residues at once from the interval index. (See get_hinge_index)
+
+    Args:
+        index (dictionary)            : per-chain interval index. (See get_hinge_index)
+        chains ([str])                : Chain ID of each residue.
+        residue_ids ([int/float])     : Residue ID of each residue.
+
+    Returns:
+        [str/None]: Domain/hinge ID of each residue; None if the residue is not covered by the index.
+    """
+    chains = numpy.asarray(chains)
+    residue_ids = numpy.asarray(residue_ids, dtype=float)
+    labels = [None]*len(residue_ids)
+    for chain,(boundaries, segment_labels) in index.items():
+        idx = numpy.flatnonzero(chains == chain)
+        segments = numpy.searchsorted(boundaries, residue_ids[idx], side='right') - 1
+        for numi,k in zip(idx, segments):
+            if(k >= 0):
+                labels[numi] = segment_labels[k]
+    return labels
+
+def permutation_test(x, y, num_rounds=10000, seed=0, batch_size=1000, early_stop=False, significance=0.05, confidence=0.999):
+    """Approximate two-sided permutation test for the difference of means of the two samples.
+
+    The permutations are drawn as batches of index matrices (Random subsets of the pooled sample) and the statistic is calculated for the whole batch at once.
+    The p-value is estimated the same way as the mlxtend.evaluate.permutation_test(method='approximate'); (at least as extreme + 1)/(num_rounds + 1)
+
+    Notes:
+        * The output is reproducible for the given seed and batch_size.
+        * If early_stop is True, the Clopper-Pearson interval (at the given confidence) of the p-value is checked after every batch and the test stops as soon as the interval is entirely on one side of the 'significance' (or the p-value of all the rounds can not be below it anymore). The returned p-value is then an early estimate from the rounds drawn so far; it is decided with respect to the significance but less precise than the full test.
+
+    Args:
+        x ([float])                   : First sample (eg... B-factors of the hinge atoms)
+        y ([float])                   : Second sample (eg... B-factors of the non-hinge atoms)
+        num_rounds (int, optional)    : Number of permutations. Defaults to 10000.
+        seed (int, optional)          : Random seed. Defaults to 0.
+        batch_size (int, optional)    : Number of permutations drawn at once. Defaults to 1000.
+        early_stop (bool, optional)   : Stop once the p-value is decided with respect to the significance. Defaults to False.
+        significance (float, optional): Significance level used for the early stopping. Defaults to 0.05.
+        confidence (float, optional)  : Confidence level of the p-value interval used for the early stopping. Defaults to 0.999.
+    
+    Returns:
+        p-value (float): p-value under the null hypothesis.
+    """
+    x, y = numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float)
+    m, n = len(x), len(y)
+    combined = numpy.concatenate((x, y))
+    total = combined.sum()
+    reference_stat = numpy.abs( x.mean() - y.mean() )
+
+    rng = numpy.random.RandomState(seed)
+    at_least_as_extreme, rounds = 0, 0
+    while(rounds < num_rounds):
+        batch = min(batch_size, num_rounds-rounds)
+        #m smallest random keys per row is an uniformly random subset of size m
+        subset = numpy.argpartition( rng.random_sample((batch, m+n)), m-1, axis=1 )[:, :m]
+        sum_x = combined[subset].sum(1)
+        diff = numpy.abs( sum_x/m - (total-sum_x)/n )
+        at_least_as_extreme += int( numpy.count_nonzero( (diff > reference_stat) | numpy.isclose(diff, reference_stat) ) )
+        rounds += batch
+
+        if(early_stop and rounds < num_rounds):
+            #p-value of all the rounds can only grow above the significance from here on
+            if( (at_least_as_extreme+1.0)/(num_rounds+1.0) > significance ):
+                break
+            #Clopper-Pearson interval of the p-value from the rounds so far
+            tail = (1.0-confidence)/2.0
+            lower = beta.ppf(tail, at_least_as_extreme, rounds-at_least_as_extreme+1) if at_least_as_extreme > 0 else 0.0
+            upper = beta.ppf(1.0-tail, at_least_as_extreme+1, rounds-at_least_as_extreme) if at_least_as_extreme < rounds else 1.0
+            if( upper < significance or lower > significance ):
+                break
+
+    return (at_least_as_extreme+1.0)/(rounds+1.0)
+
+def kmeans_1d(values, n_clusters):
+    """Exact k-means clustering of the one dimensional data.
+
+    The optimal clusters of the one dimensional data are contiguous in the sorted order, so the clustering with the minimum within-cluster sum of squares is found by the dynamic programming over the sorted unique values (weighted by their counts); Ckmeans.1d.dp algorithm.
+
+    Notes:
+        * The output is deterministic; unlike the Lloyd's algorithm with the random initializations (eg... sklearn.cluster.KMeans)
+        * If there are less unique values than the n_clusters, every unique value is a cluster.
+        * Please refer to the following paper for the details on the algorithm:
+            Haizhou Wang, Mingzhou Song, Ckmeans.1d.dp: Optimal k-means Clustering in One Dimension by Dynamic Programming, The R Journal, 2011, 3(2), 29-33, https://doi.org/10.32614/RJ-2011-015
+
+    Args:
+        values ([float])  : One dimensional data (eg... eccentricity of the alpha shape graph nodes)
+        n_clusters (int)  : Number of clusters.
+
+    Returns:
+        labels, centres (numpy.ndarray): Cluster label of each value and the cluster centres (in that order); clusters are numbered in the ascending order of their centres.
+    """
+    values = numpy.asarray(values, dtype=float).ravel()
+    unique, inverse, counts = numpy.unique(values, return_inverse=True, return_counts=True)
+    m = len(unique)
+    k = max(1, min(int(n_clusters), m))
+
+    #Prefix sums to get the within-cluster sum of squares of unique[j:i+1] in constant time
+    W  = numpy.concatenate( ([0.0], numpy.cumsum(counts)) )
+    S1 = numpy.concatenate( ([0.0], numpy.cumsum(counts*unique)) )
+    S2 = numpy.concatenate( ([0.0], numpy.cumsum(counts*unique*unique)) )
+    def cost(j, i):
+        s1 = S1[i+1]-S1[j]
+        return numpy.maximum( S2[i+1]-S2[j] - s1*s1/(W[i+1]-W[j]), 0.0 )
+
+    #D[c,i]: minimum cost of c+1 clusters of unique[:i+1]; B[c,i]: start of the last cluster
+    D = numpy.full((k, m), numpy.inf)
+    B = numpy.zeros((k, m), dtype=int)
+    D[0] = cost(numpy.zeros(m, dtype=int), numpy.arange(m))
+    for c in range(1, k):
+        for i in range(c, m):
+            starts = numpy.arange(c, i+1)
+            candidates = D[c-1, starts-1] + cost(starts, i)
+            best = numpy.argmin(candidates)
+            D[c, i], B[c, i] = candidates[best], starts[best]
+
+    #Backtracking the cluster boundaries
+    unique_labels = numpy.zeros(m, dtype=int)
+    centres = numpy.zeros(k)
+    end = m-1
+    for c in range(k-1, -1, -1):
+        start = B[c, end]
+        unique_labels[start:end+1] = c
+        centres[c] = (S1[end+1]-S1[start])/(W[end+1]-W[start])
+        end = start-1
+
+    return unique_labels[inverse], centres
+
+def cut_dendrogram(Z, n_clusters):
+    """Flat clusters of the hierarchical clustering for all the given cluster counts at once.
+
+    Every node of the dendrogram is a contiguous block of its leaves in the traversal order, so the clusters of each count are obtained by splitting that order at the boundaries of the topmost merges; the linkage is traversed only once for all the counts.
+
+    Notes:
+        * Labels are identical to scipy.cluster.hierarchy.fcluster(Z, k, criterion='maxclust') for the monotonic linkages (eg... 'ward', 'complete', 'average'); with the tied merge heights, there can be less than k clusters.
+
+    Args:
+        Z (numpy.ndarray)  : Linkage matrix (See scipy.cluster.hierarchy.linkage)
+        n_clusters ([int]) : Maximum number of clusters of each flat clustering (eg... range(2,21))
+
+    Returns:
+        dict: Cluster labels (1 to number of clusters) of the observations with the cluster count as the key.
+    """
+    Z = numpy.asarray(Z, dtype=float)
+    n_clusters = list(n_clusters)
+    n = len(Z)+1
+    start, boundaries = _get_dendrogram_blocks(Z)
+    order = numpy.empty(n, dtype=int)
+    order[start[:n]] = numpy.arange(n)
+
+    labels = {}
+    for k, m in zip(n_clusters, _get_merge_counts(Z, n_clusters)):
+        if(m == 0):
+            labels[k] = numpy.arange(1, n+1, dtype=numpy.int32)
+            continue
+        #Unapplied (topmost) merges split the traversal order into the clusters
+        cuts = numpy.zeros(n, dtype=numpy.int32)
+        cuts[boundaries[m:]] = 1
+        labels[k] = numpy.empty(n, dtype=numpy.int32)
+        labels[k][order] = 1 + numpy.cumsum(cuts)
+    return labels
+
+def calinski_harabasz_scores(data, Z, n_clusters):
+    """Calinski-Harabasz (CH) scores of the flat clusters of the hierarchical clustering for all the given cluster counts at once. (See cut_dendrogram)
+
+    Splitting a cluster of the dendrogram into its two children increases the between-cluster dispersion by nl*nr/(nl+nr)*|cl-cr|^2 (cl, cr: centroids of the children), so the dispersion of every count is a cumulative sum over the topmost merges. The centroids come from the prefix sums of the data in the traversal order of the dendrogram.
+
+    Notes:
+        * Scores are the same as sklearn.metrics.calinski_harabasz_score(data, labels) of the labels from cut_dendrogram()
+        * The cost does not depend on the number of cluster counts, so the wide ranges of the counts are cheap.
+
+    Args:
+        data (numpy.ndarray) : N x D observations used for the scores (not necessarily the ones used for the linkage)
+        Z (numpy.ndarray)    : Linkage matrix of the N observations (See scipy.cluster.hierarchy.linkage)
+        n_clusters ([int])   : Maximum number of clusters of each flat clustering (eg... range(2,21))
+
+    Returns:
+        dict: CH score with the cluster count as the key.
+    """
+    Z = numpy.asarray(Z, dtype=float)
+    data = numpy.asarray(data, dtype=float)
+    n_clusters = list(n_clusters)
+    n = len(Z)+1
+    start, _ = _get_dendrogram_blocks(Z)
+    counts = _get_merge_counts(Z, n_clusters)
+    first = int(counts.min()) if len(counts) else n-1
+
+    #Data sums of any block of the traversal order from the prefix sums
+    ordered = numpy.empty_like(data)
+    ordered[start[:n]] = data
+    prefix = numpy.concatenate( (numpy.zeros((1, data.shape[1])), numpy.cumsum(ordered, axis=0)) )
+    sizes = numpy.concatenate( (numpy.ones(n), Z[:,3]) ).astype(int)
+    def centroid(nodes):
+        return (prefix[start[nodes]+sizes[nodes]] - prefix[start[nodes]]) / sizes[nodes][:,None]
+
+    #Between-cluster dispersion gained by the topmost merges (only the ones needed)
+    left, right = Z[first:,0].astype(int), Z[first:,1].astype(int)
+    nl, nr = sizes[left], sizes[right]
+    gain = nl*nr/(nl+nr) * numpy.sum( (centroid(left)-centroid(right))**2, axis=1 )
+    between = numpy.concatenate( (numpy.cumsum(gain[::-1])[::-1], [0.0]) )
+    total = numpy.sum( (data-data.mean(0))**2 )
+
+    scores = {}
+    for k, m in zip(n_clusters, counts):
+        c = n-m
+        if(c < 2 or c >= n):
+            raise ValueError("Number of clusters is %d. Valid values are 2 to n_samples - 1 (inclusive)" % c)
+        within = total - between[m-first]
+        #Clusters of the identical observations (zero within-cluster dispersion; up to the rounding)
+        scores[k] = 1.0 if within <= 1e-12*total else between[m-first] * (n-c) / (within * (c-1))
+    return scores
+
+def _get_dendrogram_blocks(Z):
+    """Start of each node (leaves first) in the traversal order of scipy.cluster.hierarchy.fcluster and the boundary (start of the second child) of each merge."""
+    n = len(Z)+1
+    children = Z[:,:2].astype(int)
+    sizes = numpy.concatenate( (numpy.ones(n), Z[:,3]) ).astype(int)
+    start = numpy.zeros(2*n-1, dtype=int)
+    for j in range(n-2, -1, -1):
+        first, second = children[j]
+        #Internal child is visited before the leaf child
+        if(first < n and second >= n):
+            first, second = second, first
+        start[first] = start[n+j]
+        start[second] = start[n+j] + sizes[first]
+    return start, numpy.maximum(start[children[:,0]], start[children[:,1]])
+
+def _get_merge_counts(Z, n_clusters):
+    """Number of merges applied for each maximum cluster count (all the merges tied with the last one are applied; same as 'maxclust')."""
+    n = len(Z)+1
+    k = numpy.asarray(n_clusters, dtype=int)
+    heights = Z[:,2]
+    counts = numpy.searchsorted( heights, heights[numpy.clip(n-k-1, 0, n-2)], side='right' )
+    return numpy.where(k >= n, 0, counts)
+
+def rigid_body_modes(coords):
+    """Orthonormal basis of the rigid body motions (three translations and three rotations) of the points.
+
+    Args:
+        coords ([float]): N x 3 array of the coordinates.
+
+    Returns:
+        numpy.ndarray: 3N x 6 matrix with orthonormal columns (x,y,z of each point are consecutive rows; same as the ANM Hessian)
+    """
+    coords = numpy.asarray(coords, dtype=float)
+    centred = coords - coords.mean(0)
+    n = len(coords)
+    modes = numpy.zeros((n, 3, 6))
+    for i in range(3):
+        modes[:, i, i] = 1.0
+        #Rotation about the i'th axis; e_i x r
+        modes[:, :, i+3] = numpy.cross( numpy.eye(3)[i], centred )
+    Q, R = numpy.linalg.qr( modes.reshape(3*n, 6) )
+    #Points on a line have only two rotations
+    return Q[:, numpy.abs(numpy.diag(R)) > 1e-8*max(1.0, numpy.abs(R).max())]
+
+def partial_eigh(matrix, n_modes, trivial_modes=0, method='eigsh', seed=0, initial=None):
+    """Slowest modes of the symmetric positive semidefinite matrix (eg... Kirchhoff or Hessian matrix of the elastic network models)
+
+    The trivial (zero) modes are deflated; n_modes non-trivial modes are calculated in addition to them and the eigenpairs are returned in ascending order of the eigenvalues, so the trivial modes come first (same indexing as the full decomposition).
+
+    Notes:
+        * 'eigsh'  : ARPACK in the shift-invert mode around a small negative shift (sparse LU factorization of the matrix)
+        * 'lobpcg' : LOBPCG with the Jacobi preconditioner; the trivial modes (if the basis is given) are used as the constraints and returned with zero eigenvalues. The block has the extra (guard) vectors and the residuals are checked; ARPACK is used if it does not converge.
+        * 'lapack' : Dense LAPACK driver for the subset of the eigenpairs (scipy.linalg.eigh with subset_by_index)
+        * Small matrices are always decomposed with 'lapack'.
+        * Initial vectors (eg... modes of the previous frame of the ensemble) warm-start the iterations; the block of LOBPCG is filled with them (random vectors for the rest) and their sum is the starting vector of ARPACK.
+
+    Args:
+        matrix (scipy.sparse.spmatrix/numpy.ndarray): N x N symmetric positive semidefinite matrix.
+        n_modes (int)                               : Number of the non-trivial slowest modes.
+        trivial_modes (int/numpy.ndarray, optional) : Number of the trivial modes or N x T orthonormal basis of them (eg... packman.utilities.rigid_body_modes). Defaults to 0.
+        method (str, optional)                      : 'eigsh', 'lobpcg' or 'lapack'. Defaults to 'eigsh'.
+        seed (int, optional)                        : Random seed for the starting vectors. Defaults to 0.
+        initial (numpy.ndarray, optional)           : N x m approximate non-trivial eigenvectors to start from. Defaults to None (Random).
+
+    Returns:
+        eigen_values, eigen_vectors (numpy.ndarray): T+n_modes eigenvalues and the N x (T+n_modes) eigenvectors (in that order)
+    """
+    basis = None if numpy.isscalar(trivial_modes) else numpy.asarray(trivial_modes, dtype=float)
+    n_trivial = int(trivial_modes) if basis is None else basis.shape[1]
+    n = matrix.shape[0]
+    k = min(n_trivial + int(n_modes), n)
+
+    if(method not in ['eigsh', 'lobpcg', 'lapack']):
+        raise ValueError("method should be 'eigsh', 'lobpcg' or 'lapack'")
+
+    #LOBPCG block has the guard vectors in addition to the wanted modes
+    block = (k-n_trivial if basis is not None else k) + max(5, (k-n_trivial)//2)
+    if(method == 'lapack' or k >= n-1 or (method == 'lobpcg' and 5*(block+n_trivial) >= n)):
+        dense = matrix.toarray() if issparse(matrix) else numpy.asarray(matrix)
+        return eigh(dense, subset_by_index=[0, k-1])
+
+    diagonal = numpy.abs(matrix.diagonal())
+    rng = numpy.random.RandomState(seed)
+
+    if(method == 'lobpcg'):
+        #Warm start first (if given), then the random start; ARPACK if LOBPCG does not converge either way
+        for start in ([initial, None] if initial is not None else [None]):
+            modes = _lobpcg_modes(matrix, k-n_trivial if basis is not None else k, block, basis, diagonal, rng, initial=start)
+            if(modes is not None):
+                break
+        if(modes is None):
+            logging.warning('LOBPCG did not converge; using ARPACK (eigsh) instead.')
+            method = 'eigsh'
+        else:
+            eigen_values, eigen_vectors = modes
+            if(basis is not None):
+                eigen_values  = numpy.concatenate( (numpy.zeros(n_trivial), eigen_values) )
+                eigen_vectors = numpy.concatenate( (basis, eigen_vectors), axis=1 )
+
+    if(method == 'eigsh'):
+        #Shifted matrix is positive definite, so the zero modes do not make the factorization singular
+        sigma = -1e-3*max(diagonal.mean(), 1e-12)
+        v0 = rng.random_sample(n) if initial is None else numpy.asarray(initial, dtype=float).reshape(n, -1).sum(1)
+        eigen_values, eigen_vectors = eigsh(matrix.tocsc() if issparse(matrix) else matrix, k=k, sigma=sigma, which='LM', v0=v0)
+
+    order = numpy.argsort(eigen_values, kind='stable')
+    return eigen_values[order], eigen_vectors[:, order]
+
+def _lobpcg_modes(matrix, n_modes, block, basis, diagonal, rng, initial=None, tol=1e-8):
+    """Slowest n_modes eigenpairs by LOBPCG (See partial_eigh); None if any of them has not converged.
+
+    The block is wider than n_modes (guard vectors), so the wanted modes converge even if the gap after the last one is small; only the n_modes lowest are kept and their residuals ||A v - lambda v|| are checked against tol (relative to the largest diagonal element).
+    """
+    n = matrix.shape[0]
+    X = rng.random_sample((n, block))
+    if(initial is not None):
+        initial = numpy.asarray(initial, dtype=float).reshape(n, -1)[:, :block]
+        X[:, :initial.shape[1]] = initial
+    preconditioner = diags(1.0/diagonal) if numpy.all(diagonal > 0) else None
+    with warnings.catch_warnings():
+        #Convergence is checked below
+        warnings.simplefilter('ignore', UserWarning)
+        eigen_values, eigen_vectors = lobpcg(matrix, X, M=preconditioner, Y=basis, largest=False, tol=tol, maxiter=max(200, 10*block))
+    order = numpy.argsort(eigen_values, kind='stable')[:n_modes]
+    eigen_values, eigen_vectors = eigen_values[order], eigen_vectors[:, order]
+    residuals = numpy.linalg.norm( matrix.dot(eigen_vectors) - eigen_vectors*eigen_values, axis=0 )
+    if(numpy.any(residuals > tol*max(diagonal.max(), 1.0))):
+        return None
+    return eigen_values, eigen_vectors
+
 '''
 ##################################################################################################
 #                                    Non Algorithm Functions                                     #
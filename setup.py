@@ -28,6 +28,7 @@ PACKAGES=['packman',
           'packman.utilities',
           'packman.entropy',
           'packman.geometry',
+          'packman.enm',
           'packman.tests',
           'packman.tests.anm',
           'packman.tests.data',
@@ -71,5 +72,5 @@ setup(name='py-packman',
       entry_points = {
               'console_scripts': SCRIPTS,
                 },
-    install_requires = ['numpy', 'scipy', 'networkx', 'mlxtend', 'scikit-learn'],
+    install_requires = ['numpy', 'scipy', 'networkx', 'scikit-learn'],
       )
\ No newline at end of file